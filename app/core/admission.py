@@ -0,0 +1,241 @@
+"""
+API keys and admission control.
+
+Keys are parsed once into a table keyed by their SHA-256 digest, so a lookup is one
+hash and one dict probe whatever the number of keys. The digest makes the probe
+independent of how much of a guess matches a real key.
+
+AdmissionMiddleware runs before routing, on the event loop, for requests that
+carry a known key. It turns them away with 429 and Retry-After:
+
+- shed: the worker thread pool is backed up; a no-op takes longer than
+  SHED_QUEUE_MS to get a thread (measured by QueueProbe)
+- throttled: the key is at its concurrency cap, or out of rate-limit tokens
+
+A request holds its concurrency slot until the last chunk of its response body is
+sent, or the app returns without one, so a streaming response (the NDJSON batch,
+the dashboard SSE feed) counts for as long as it streams. Requests without a known key pass through: auth errors
+stay with require_api_key, and public routes are never limited.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.ratelimit import TokenBucket
+from app.core.state import METRICS
+from app.schemas.api import AdmissionKeyStatus, AdmissionStatus
+
+
+def fingerprint(key: str) -> str:
+    """How a key is named in API_KEY_LIMITS and in the admission status."""
+    return hashlib.sha256(key.encode("latin-1")).hexdigest()[:12]
+
+
+class ApiKey:
+    def __init__(self, key: str, rate: float, burst: float, max_concurrency: int) -> None:
+        self.fingerprint = fingerprint(key)
+        self.rate = rate
+        self.burst = burst
+        self.bucket = TokenBucket(rate, burst or None) if rate > 0 else None
+        self.max_concurrency = max_concurrency
+        # only touched on the event loop thread
+        self.in_flight = 0
+        self.counts = {"admitted": 0, "throttled": 0, "shed": 0}
+
+    def status(self) -> AdmissionKeyStatus:
+        return AdmissionKeyStatus(
+            key=self.fingerprint,
+            rate_per_second=self.rate,
+            burst=self.bucket.burst if self.bucket else 0.0,
+            max_concurrency=self.max_concurrency,
+            in_flight=self.in_flight,
+            **self.counts,
+        )
+
+
+class KeyTable:
+    def __init__(self, source: str, limits: Optional[str]) -> None:
+        self.source = source
+        overrides: Dict[str, dict] = json.loads(limits) if limits else {}
+        self._keys: Dict[bytes, ApiKey] = {}
+        for key in settings.api_key_set():
+            o = overrides.get(fingerprint(key), {})
+            entry = ApiKey(
+                key,
+                rate=float(o.get("rate", settings.api_key_rate_per_second)),
+                burst=float(o.get("burst", settings.api_key_burst)),
+                max_concurrency=int(o.get("concurrency", settings.api_key_max_concurrency)),
+            )
+            self._keys[hashlib.sha256(key.encode("latin-1")).digest()] = entry
+
+    def get(self, raw: bytes) -> Optional[ApiKey]:
+        return self._keys.get(hashlib.sha256(raw).digest())
+
+    def __iter__(self):
+        return iter(self._keys.values())
+
+
+_KEYS: Optional[KeyTable] = None
+
+
+def keys() -> KeyTable:
+    """The key table, rebuilt only when API_KEYS itself changes."""
+    global _KEYS
+    if _KEYS is None or _KEYS.source is not settings.api_keys:
+        _KEYS = KeyTable(settings.api_keys, settings.api_key_limits)
+    return _KEYS
+
+
+def lookup(key: str) -> Optional[ApiKey]:
+    return keys().get(key.encode("latin-1"))
+
+
+class QueueProbe:
+    """
+    Queue latency of the worker thread pool, where sync handlers wait for a thread:
+    a no-op is sent through it every `interval` seconds. latency() is a moving
+    average, or how long the probe in flight has been waiting if that is longer,
+    so a pool that stops draining shows up before the probe comes back.
+    """
+
+    def __init__(self, interval: float, alpha: float = 0.3) -> None:
+        self.interval = interval
+        self.alpha = alpha
+        self._avg = 0.0
+        self._started: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._started = time.perf_counter()
+            await run_in_threadpool(_noop)
+            waited = time.perf_counter() - self._started
+            self._started = None
+            self._avg += self.alpha * (waited - self._avg)
+            await asyncio.sleep(self.interval)
+
+    def latency(self) -> float:
+        started = self._started
+        return max(self._avg, time.perf_counter() - started if started is not None else 0.0)
+
+
+def _noop() -> None:
+    pass
+
+
+PROBE: Optional[QueueProbe] = None
+
+
+async def start_probe(interval: float) -> None:
+    global PROBE
+    if PROBE is None:
+        PROBE = QueueProbe(interval)
+        PROBE.start()
+
+
+async def stop_probe() -> None:
+    global PROBE
+    if PROBE is not None:
+        await PROBE.stop()
+        PROBE = None
+
+
+def _shedding() -> Tuple[bool, float]:
+    latency = PROBE.latency() if PROBE is not None else 0.0
+    return settings.shed_queue_ms > 0 and latency * 1e3 > settings.shed_queue_ms, latency
+
+
+def _verdict(key: ApiKey) -> Optional[Tuple[str, float]]:
+    """None to admit, else (reason, seconds the client should wait)."""
+    shed, latency = _shedding()
+    if shed:
+        return "shed", latency
+    if key.max_concurrency and key.in_flight >= key.max_concurrency:
+        return "throttled", 1.0
+    if key.bucket is not None:
+        wait = key.bucket.take()
+        if wait:
+            return "throttled", wait
+    return None
+
+
+class AdmissionMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        key = None
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"x-api-key":
+                    key = keys().get(value)
+                    break
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        verdict = _verdict(key)
+        if verdict is not None:
+            reason, wait = verdict
+            key.counts[reason] += 1
+            METRICS.add(f"requests_{reason}")
+            detail = "Server overloaded, retry later" if reason == "shed" else "Rate limit exceeded for this API key"
+            response = JSONResponse({"detail": detail}, status_code=429, headers={"Retry-After": str(max(1, math.ceil(wait)))})
+            await response(scope, receive, send)
+            return
+
+        key.counts["admitted"] += 1
+        METRICS.add("requests_admitted")
+        key.in_flight += 1
+        held = True
+
+        async def send_wrapper(message) -> None:
+            nonlocal held
+            await send(message)
+            # released before background tasks run, which still hold up self.app
+            if held and message["type"] == "http.response.body" and not message.get("more_body", False):
+                held = False
+                key.in_flight -= 1
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if held:
+                key.in_flight -= 1
+
+
+def status() -> AdmissionStatus:
+    shed, latency = _shedding()
+    totals = METRICS.totals()
+    key_status: List[AdmissionKeyStatus] = [k.status() for k in keys()]
+    return AdmissionStatus(
+        queue_latency_ms=round(latency * 1e3, 3),
+        shed_queue_ms=settings.shed_queue_ms,
+        shedding=shed,
+        admitted=totals["requests_admitted"],
+        throttled=totals["requests_throttled"],
+        shed=totals["requests_shed"],
+        keys=key_status,
+    )
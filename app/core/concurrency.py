@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import functools
+import threading
+import weakref
+import zlib
+from typing import Callable, Dict, Iterable
+
+
+class StripedLocks:
+    """
+    A fixed pool of locks shared out by key.
+
+    Work on one call_id always takes the same lock, so it stays serialized, while
+    different calls mostly land on different stripes and proceed in parallel.
+    The locks are not reentrant: never take a second key's lock while holding one.
+    """
+
+    def __init__(self, stripes: int = 64) -> None:
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def for_key(self, key: str) -> threading.Lock:
+        # crc32 rather than hash(): stable across processes and PYTHONHASHSEED
+        return self._locks[zlib.crc32(key.encode()) % len(self._locks)]
+
+
+class _ExitToken:
+    __slots__ = ("__weakref__",)
+
+
+def on_thread_exit(local: threading.local, callback: Callable[[], None]) -> None:
+    """
+    Run `callback` once the calling thread has exited, when its `local` storage is
+    dropped (or when `local` itself is, e.g. replaced after a fork). It runs in the
+    exiting thread, after that thread's last write through `local`.
+    """
+    token = _ExitToken()
+    tokens = getattr(local, "exit_tokens", None)
+    if tokens is None:
+        tokens = local.exit_tokens = []
+    tokens.append(token)
+    weakref.finalize(token, callback)
+
+
+class ShardedCounters:
+    """
+    Named integer counters sharded per thread.
+
+    Each thread increments only its own shard, so writers never take a lock.
+    Readers sum the shards; a total may miss an increment in flight, never
+    double-count one. A thread's shard is folded into a base total when the
+    thread exits, so a churning threadpool does not grow the list readers walk.
+    """
+
+    def __init__(self, names: Iterable[str]) -> None:
+        self.names = tuple(names)
+        self._local = threading.local()
+        self._base = dict.fromkeys(self.names, 0)
+        # id(shard) -> shard, for live threads only
+        self._shards: Dict[int, Dict[str, int]] = {}
+        self._register = threading.Lock()
+
+    def _shard(self) -> Dict[str, int]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = dict.fromkeys(self.names, 0)
+            with self._register:
+                self._shards[id(shard)] = shard
+            on_thread_exit(self._local, functools.partial(self._retire, shard))
+        return shard
+
+    def _retire(self, shard: Dict[str, int]) -> None:
+        with self._register:
+            del self._shards[id(shard)]
+            for name in self.names:
+                self._base[name] += shard[name]
+
+    def add(self, name: str, n: int = 1) -> None:
+        self._shard()[name] += n
+
+    def totals(self) -> Dict[str, int]:
+        # summed under the lock: a shard folded into the base mid-read would count twice
+        with self._register:
+            out = dict(self._base)
+            for shard in self._shards.values():
+                for name in self.names:
+                    out[name] += shard[name]
+        return out
@@ -1,16 +1,69 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
+from typing import Literal
 
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     api_keys: str = Field(..., alias="API_KEYS")
+    # keys for /v1/admin (board deltas, profiler); admin routes refuse every request while unset
+    admin_api_keys: str | None = Field(default=None, alias="ADMIN_API_KEYS")
     fmcsa_webkey: str | None = Field(default=None, alias="FMCSA_WEBKEY")
+    fmcsa_cache_max_entries: int = Field(default=10000, alias="FMCSA_CACHE_MAX_ENTRIES")
+    fmcsa_ttl_eligible_seconds: float = Field(default=6 * 3600, alias="FMCSA_TTL_ELIGIBLE_SECONDS")
+    fmcsa_ttl_ineligible_seconds: float = Field(default=3600, alias="FMCSA_TTL_INELIGIBLE_SECONDS")
+    fmcsa_ttl_not_found_seconds: float = Field(default=600, alias="FMCSA_TTL_NOT_FOUND_SECONDS")
+    fmcsa_timeout_seconds: float = Field(default=10.0, alias="FMCSA_TIMEOUT_SECONDS")
+    fmcsa_deadline_seconds: float = Field(default=4.0, alias="FMCSA_DEADLINE_SECONDS")
+    fmcsa_max_connections: int = Field(default=20, alias="FMCSA_MAX_CONNECTIONS")
+    fmcsa_http2: bool = Field(default=False, alias="FMCSA_HTTP2")
+    fmcsa_rate_limit_per_second: float = Field(default=0.0, alias="FMCSA_RATE_LIMIT_PER_SECOND")
+    fmcsa_rate_limit_burst: float = Field(default=0.0, alias="FMCSA_RATE_LIMIT_BURST")
+    fmcsa_batch_concurrency: int = Field(default=8, alias="FMCSA_BATCH_CONCURRENCY")
+    fmcsa_batch_max_items: int = Field(default=10000, alias="FMCSA_BATCH_MAX_ITEMS")
+    fmcsa_breaker_failures: int = Field(default=5, alias="FMCSA_BREAKER_FAILURES")
+    fmcsa_breaker_reset_seconds: float = Field(default=30.0, alias="FMCSA_BREAKER_RESET_SECONDS")
+    fmcsa_cache_file: str | None = Field(default=None, alias="FMCSA_CACHE_FILE")
     loads_file: str = Field(default="loads.seed.json", alias="LOADS_FILE")
+    load_store: Literal["compact", "objects"] = Field(default="compact", alias="LOAD_STORE")
+    loads_delta_file: str | None = Field(default=None, alias="LOADS_DELTA_FILE")
+    loads_delta_poll_seconds: float = Field(default=1.0, alias="LOADS_DELTA_POLL_SECONDS")
+    loads_delta_batch_size: int = Field(default=5000, alias="LOADS_DELTA_BATCH_SIZE")
+    deadhead_cost_per_mile: float = Field(default=2.0, alias="DEADHEAD_COST_PER_MILE")
+    hide_past_pickups: bool = Field(default=True, alias="HIDE_PAST_PICKUPS")
+    state_backend: Literal["memory", "sql"] = Field(default="memory", alias="STATE_BACKEND")
+    state_database_url: str | None = Field(default=None, alias="STATE_DATABASE_URL")
+    state_sweep_interval_seconds: float = Field(default=30.0, alias="STATE_SWEEP_INTERVAL_SECONDS")
+    state_finished_ttl_seconds: float = Field(default=3600, alias="STATE_FINISHED_TTL_SECONDS")
+    state_idle_ttl_seconds: float = Field(default=6 * 3600, alias="STATE_IDLE_TTL_SECONDS")
+    state_tombstone_ttl_seconds: float = Field(default=24 * 3600, alias="STATE_TOMBSTONE_TTL_SECONDS")
+    state_max_bytes: int = Field(default=256 * 1024 * 1024, alias="STATE_MAX_BYTES")
+    call_write_behind: bool = Field(default=True, alias="CALL_WRITE_BEHIND")
+    call_spool_dir: str = Field(default="spool", alias="CALL_SPOOL_DIR")
+    call_spool_fsync: bool = Field(default=True, alias="CALL_SPOOL_FSYNC")
+    call_flush_batch_size: int = Field(default=500, alias="CALL_FLUSH_BATCH_SIZE")
+    call_flush_interval_seconds: float = Field(default=0.2, alias="CALL_FLUSH_INTERVAL_SECONDS")
+    metrics_dir: str | None = Field(default=None, alias="METRICS_DIR")
+    api_key_rate_per_second: float = Field(default=0.0, alias="API_KEY_RATE_PER_SECOND")
+    api_key_burst: float = Field(default=0.0, alias="API_KEY_BURST")
+    api_key_max_concurrency: int = Field(default=32, alias="API_KEY_MAX_CONCURRENCY")
+    api_key_limits: str | None = Field(default=None, alias="API_KEY_LIMITS")
+    shed_queue_ms: float = Field(default=1000.0, alias="SHED_QUEUE_MS")
+    shed_probe_interval_ms: float = Field(default=100.0, alias="SHED_PROBE_INTERVAL_MS")
+    profiler_enabled: bool = Field(default=False, alias="PROFILER_ENABLED")
+    profiler_slow_ms: float = Field(default=500.0, alias="PROFILER_SLOW_MS")
+    profiler_interval_ms: float = Field(default=5.0, alias="PROFILER_INTERVAL_MS")
+    dashboard_stream_queue_size: int = Field(default=256, alias="DASHBOARD_STREAM_QUEUE_SIZE")
+    dashboard_stream_keepalive_seconds: float = Field(default=15.0, alias="DASHBOARD_STREAM_KEEPALIVE_SECONDS")
+    dashboard_stream_poll_ms: float = Field(default=250.0, alias="DASHBOARD_STREAM_POLL_MS")
+    log_level: str = Field(default="INFO", alias="LOG_LEVEL")
 
     def api_key_set(self) -> set[str]:
         return {k.strip() for k in self.api_keys.split(",") if k.strip()}
 
+    def admin_api_key_set(self) -> set[str]:
+        return {k.strip() for k in (self.admin_api_keys or "").split(",") if k.strip()}
+
 
 settings = Settings()
@@ -0,0 +1,40 @@
+"""
+Response encoding.
+
+orjson when it is installed, otherwise the stdlib encoder with the same compact
+output Starlette's JSONResponse produces. `model_response` sends a pydantic model
+the handler built itself straight through its own serializer, skipping FastAPI's
+response_model pass (dump to dict, validate again, jsonable_encoder, json.dumps).
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: what FastAPI's jsonable_encoder produced, encoded by `dumps`."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """For models of the route's own response_model type, built by the handler: nothing to revalidate."""
+    return Response(model.model_dump_json(by_alias=True).encode(), status_code=status_code, media_type="application/json")
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence
+
+# upper bounds in seconds, roughly x2.5 apart: 1 ms .. 30 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# the same, extended down to 10 us for in-process spans and fast requests
+FINE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005) + DEFAULT_BUCKETS
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram (Prometheus-style `le` upper bounds plus +Inf).
+
+    observe() is a bisect and two additions, so it is cheap enough for every request;
+    quantiles are estimated by linear interpolation inside the bucket that holds them.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds: List[float] = sorted(buckets)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        i = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += seconds
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        return summarize(self.bounds, counts, total)
+
+
+def summarize(bounds: Sequence[float], counts: Sequence[int], sum_seconds: float) -> Dict[str, object]:
+    """Snapshot of per-bucket `counts` (len(bounds) + 1, the last being +Inf): cumulative buckets and quantiles."""
+    n = sum(counts)
+    cumulative = []
+    running = 0
+    for c in counts:
+        running += c
+        cumulative.append(running)
+    return {
+        "count": n,
+        "sum_seconds": round(sum_seconds, 6),
+        "buckets": {("+Inf" if i == len(bounds) else repr(bounds[i])): c for i, c in enumerate(cumulative)},
+        "p50_ms": _ms(_quantile(bounds, counts, n, 0.5)),
+        "p90_ms": _ms(_quantile(bounds, counts, n, 0.9)),
+        "p99_ms": _ms(_quantile(bounds, counts, n, 0.99)),
+    }
+
+
+def _quantile(bounds: Sequence[float], counts: Sequence[int], n: int, q: float) -> Optional[float]:
+    if not n:
+        return None
+    rank = q * n
+    seen = 0
+    for i, c in enumerate(counts):
+        if c and seen + c >= rank:
+            lo = bounds[i - 1] if i else 0.0
+            if i == len(bounds):
+                return lo  # +Inf bucket: the last finite bound is all we know
+            return lo + (bounds[i] - lo) * (rank - seen) / c
+        seen += c
+    return bounds[-1]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1e3, 3)
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import bisect
+import fcntl
+import functools
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from app.core.concurrency import ShardedCounters, on_thread_exit
+from app.core.histogram import Histogram, summarize
+
+Histograms = Mapping[str, Sequence[float]]
+
+
+class LocalMetrics:
+    """Counters and latency histograms for a single worker process."""
+
+    def __init__(self, counters: Iterable[str], histograms: Histograms) -> None:
+        self._counters = ShardedCounters(counters)
+        self._histograms = {name: Histogram(bounds) for name, bounds in histograms.items()}
+
+    def add(self, name: str, n: int = 1) -> None:
+        self._counters.add(name, n)
+
+    def observe(self, name: str, seconds: float) -> None:
+        self._histograms[name].observe(seconds)
+
+    def totals(self) -> Dict[str, int]:
+        return self._counters.totals()
+
+    def histogram(self, name: str) -> Dict[str, object]:
+        return self._histograms[name].snapshot()
+
+    def histograms(self) -> Dict[str, Dict[str, object]]:
+        return {name: h.snapshot() for name, h in self._histograms.items()}
+
+
+# file layout: header, then MAX_THREAD_ROWS rows of int64 slots, one row per live writer thread
+_HEADER = struct.Struct("<4sIIII")  # magic, layout crc, slots per row, rows in use, pid
+_HEADER_SIZE = 64
+_MAGIC = b"MTR1"
+MAX_THREAD_ROWS = 256
+
+
+class MmapMetrics:
+    """
+    Counters and latency histograms shared by every worker process on one host.
+
+    Each process maps its own file in `directory`, with one row of int64 slots per
+    live thread, so every slot has exactly one writer and an increment is a plain
+    8-byte store: no locks, no atomics. When a thread exits, its row, counts and all,
+    goes to the next new thread, so pool threads coming and going reuse a few rows.
+    Threads beyond MAX_THREAD_ROWS - 1 alive at once share the last row under a
+    lock. Readers sum the rows of every file without locking;
+    an aligned 8-byte store is never seen half-written, so a read can miss an
+    increment still in flight but never double-counts or tears one.
+
+    Histograms are bucket-count slots plus a sum in nanoseconds, merged the same way.
+
+    Files outlive their process, so a worker that exits or is killed keeps its counts.
+    At startup each process folds the files of dead processes into a JSON archive,
+    which lists the files it absorbed; readers skip those, so a file that is still
+    on disk while its archive is written is not counted twice. Empty `directory`
+    when the whole service (not a single worker) starts.
+    """
+
+    def __init__(self, counters: Iterable[str], histograms: Histograms, directory: str) -> None:
+        self.counters = tuple(counters)
+        self.bounds = {name: sorted(bounds) for name, bounds in histograms.items()}
+        self.directory = directory
+
+        # slot layout: counters, then per histogram its buckets (+Inf last) and sum_ns
+        self._slot: Dict[str, int] = {name: i for i, name in enumerate(self.counters)}
+        self._hist_slot: Dict[str, int] = {}
+        n = len(self.counters)
+        for name, bounds in self.bounds.items():
+            self._hist_slot[name] = n
+            n += len(bounds) + 2
+        self.slots = n
+        self.layout = zlib.crc32(json.dumps([self.counters, self.bounds], sort_keys=True).encode())
+        self._row_bytes = self.slots * 8
+
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+        self.compact()
+        os.register_at_fork(after_in_child=self._open)
+
+    def _open(self) -> None:
+        """Map a fresh file for this process (also in a forked child, which must not share the parent's)."""
+        self.path = os.path.join(self.directory, f"metrics-{os.getpid()}-{time.time_ns()}.bin")
+        size = _HEADER_SIZE + MAX_THREAD_ROWS * self._row_bytes
+        with open(self.path, "wb") as f:
+            f.truncate(size)
+        with open(self.path, "r+b") as f:
+            self._mm = mmap.mmap(f.fileno(), size)
+        _HEADER.pack_into(self._mm, 0, _MAGIC, self.layout, self.slots, 0, os.getpid())
+        self._register = threading.Lock()
+        self._shared = threading.Lock()
+        self._rows_used = 0
+        # rows of exited threads; a thread's exit appends to the list of the file it wrote to
+        self._free: List[int] = []
+        self._local = threading.local()
+
+    def _row(self) -> Tuple[memoryview, Optional[threading.Lock]]:
+        """This thread's row, and the lock to write it under if it is the shared last row."""
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = self._claim()
+        return row
+
+    def _claim(self) -> Tuple[memoryview, Optional[threading.Lock]]:
+        with self._register:
+            if self._free:
+                index = self._free.pop()
+            else:
+                index = min(self._rows_used, MAX_THREAD_ROWS - 1)
+                self._rows_used = index + 1
+                struct.pack_into("<I", self._mm, 12, self._rows_used)
+        start = _HEADER_SIZE + index * self._row_bytes
+        view = memoryview(self._mm)[start:start + self._row_bytes].cast("q")
+        if index == MAX_THREAD_ROWS - 1:
+            return view, self._shared
+        on_thread_exit(self._local, functools.partial(self._free.append, index))
+        return view, None
+
+    def add(self, name: str, n: int = 1) -> None:
+        row, shared = self._row()
+        if shared is None:
+            row[self._slot[name]] += n
+        else:
+            with shared:
+                row[self._slot[name]] += n
+
+    def observe(self, name: str, seconds: float) -> None:
+        base = self._hist_slot[name]
+        bounds = self.bounds[name]
+        bucket, sum_ns = base + bisect.bisect_left(bounds, seconds), base + len(bounds) + 1
+        row, shared = self._row()
+        if shared is None:
+            row[bucket] += 1
+            row[sum_ns] += int(seconds * 1e9)
+        else:
+            with shared:
+                row[bucket] += 1
+                row[sum_ns] += int(seconds * 1e9)
+
+    # -- reading
+
+    def _read_file(self, path: str) -> Optional[List[int]]:
+        """Per-slot sums over the rows of one process file; None if it has another layout."""
+        with open(path, "rb") as f:
+            try:
+                magic, layout, slots, rows, _pid = _HEADER.unpack(f.read(_HEADER.size))
+            except struct.error:
+                return None
+            if magic != _MAGIC or layout != self.layout:
+                return None
+            f.seek(_HEADER_SIZE)
+            data = array("q")
+            data.frombytes(f.read(rows * slots * 8))
+        return [sum(data[i::slots]) for i in range(slots)]
+
+    def _read_archives(self) -> Tuple[Dict[str, List[int]], Set[str]]:
+        archives = {}
+        for path in glob.glob(os.path.join(self.directory, "archive-*.json")):
+            with open(path, "r", encoding="utf-8") as f:
+                archive = json.load(f)
+            if archive.get("layout") == self.layout:
+                archives[os.path.basename(path)] = archive
+        absorbed = {name for a in archives.values() for name in a["absorbed"]}
+        return {name: a["values"] for name, a in archives.items() if name not in absorbed}, absorbed
+
+    def _collect(self) -> Tuple[Dict[str, List[int]], Dict[str, List[int]], Set[str]]:
+        """Live archives and unabsorbed process files (name -> per-slot values), and the absorbed names."""
+        # process files are listed before the archives are read: a file folded into a
+        # new archive meanwhile is then either skipped as absorbed or gone (and retried)
+        for _ in range(5):
+            paths = glob.glob(os.path.join(self.directory, "metrics-*.bin"))
+            try:
+                archives, absorbed = self._read_archives()
+                files = {}
+                for path in paths:
+                    name = os.path.basename(path)
+                    if name not in absorbed:
+                        values = self._read_file(path)
+                        if values is not None:
+                            files[name] = values
+                return archives, files, absorbed
+            except (FileNotFoundError, ValueError):
+                continue  # raced with a compaction
+        raise RuntimeError(f"metrics directory {self.directory} keeps changing under the reader")
+
+    def _sum(self) -> List[int]:
+        archives, files, _ = self._collect()
+        values = [0] * self.slots
+        for part in list(archives.values()) + list(files.values()):
+            for i, v in enumerate(part):
+                values[i] += v
+        return values
+
+    def totals(self) -> Dict[str, int]:
+        values = self._sum()
+        return {name: values[i] for name, i in self._slot.items()}
+
+    def _summarize(self, values: List[int], name: str) -> Dict[str, object]:
+        base = self._hist_slot[name]
+        bounds = self.bounds[name]
+        return summarize(bounds, values[base:base + len(bounds) + 1], values[base + len(bounds) + 1] / 1e9)
+
+    def histogram(self, name: str) -> Dict[str, object]:
+        return self._summarize(self._sum(), name)
+
+    def histograms(self) -> Dict[str, Dict[str, object]]:
+        values = self._sum()
+        return {name: self._summarize(values, name) for name in self.bounds}
+
+    # -- compaction
+
+    def compact(self) -> int:
+        """Fold the files of processes that are gone into one archive; returns how many were folded."""
+        with open(os.path.join(self.directory, ".lock"), "a+") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            archives, files, absorbed = self._collect()
+            own = os.path.basename(self.path)
+            dead = [name for name in files if name != own and not _alive(int(name.split("-")[1]))]
+            if not dead:
+                return 0
+            # absorbed files left behind by a compaction that died before unlinking them
+            leftover = [name for name in absorbed if os.path.exists(os.path.join(self.directory, name))]
+
+            values = [0] * self.slots
+            for part in list(archives.values()) + [files[name] for name in dead]:
+                for i, v in enumerate(part):
+                    values[i] += v
+            path = os.path.join(self.directory, f"archive-{time.time_ns()}.json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                # everything this archive replaces, so readers never count it twice
+                json.dump({"layout": self.layout, "absorbed": sorted(archives) + dead + leftover, "values": values}, f)
+            os.replace(path + ".tmp", path)
+
+            for name in list(archives) + dead + leftover:
+                _unlink(os.path.join(self.directory, name))
+            return len(dead)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def build_metrics(counters: Iterable[str], histograms: Histograms, directory: Optional[str]):
+    """Shared across processes when METRICS_DIR is set, otherwise per process."""
+    if directory:
+        return MmapMetrics(counters, histograms, directory)
+    return LocalMetrics(counters, histograms)
@@ -0,0 +1,139 @@
+"""
+Request and span latency, and their Prometheus text exposition.
+
+RequestMetricsMiddleware records every HTTP request into a histogram per
+(method, route template, status class): a fixed set of series built from the app's
+routes once they are all included, so it can live in the same shared-memory
+metrics store as METRICS (one slot layout per process). Internal spans go into
+METRICS histograms through `span`.
+"""
+from __future__ import annotations
+
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+from app.core import profiler
+from app.core.config import settings
+from app.core.histogram import FINE_BUCKETS
+from app.core.metrics_store import build_metrics
+from app.core.state import METRICS
+
+STATUS_CLASSES = ("2xx", "3xx", "4xx", "5xx")
+# requests that matched no API route: unknown paths, static files, wrong methods
+OTHER_ROUTE = "other"
+
+# per-route request histograms, set up by install()
+REQUESTS = None
+_SERIES: Dict[Tuple[str, str], str] = {}  # (method, route) -> series name prefix
+
+
+class span:
+    """`with span("load_search_seconds"):` times the block into that METRICS histogram."""
+
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "span":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        METRICS.observe(self.name, time.perf_counter() - self.t0)
+
+
+def route_keys(app: FastAPI) -> List[Tuple[str, str]]:
+    keys = {(method, route.path) for route in app.routes if isinstance(route, APIRoute) for method in route.methods}
+    return sorted(keys) + [("*", OTHER_ROUTE)]
+
+
+def install(app: FastAPI) -> None:
+    """Call after every router is included: the series are fixed from then on."""
+    global REQUESTS
+    keys = route_keys(app)
+    _SERIES.clear()
+    _SERIES.update({key: f"{key[0]} {key[1]}" for key in keys})
+    REQUESTS = build_metrics((), {f"{_SERIES[key]} {c}": FINE_BUCKETS for key in keys for c in STATUS_CLASSES}, settings.metrics_dir)
+    app.add_middleware(RequestMetricsMiddleware)
+
+
+class RequestMetricsMiddleware:
+    """
+    Plain ASGI middleware (no per-request task or body buffering, unlike
+    BaseHTTPMiddleware). Times from the first byte in to the last byte out, so a
+    streaming response counts for as long as it streams.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            # FastAPI leaves the matched APIRoute in the scope
+            route = scope.get("route")
+            key = (scope["method"], route.path) if isinstance(route, APIRoute) else ("*", OTHER_ROUTE)
+            prefix = _SERIES.get(key) or _SERIES[("*", OTHER_ROUTE)]
+            REQUESTS.observe(f"{prefix} {STATUS_CLASSES[min(max(status // 100, 2), 5) - 2]}", elapsed)
+            if profiler.PROFILER is not None:
+                profiler.PROFILER.finish(scope["method"], key[1], status, t0, elapsed)
+
+
+# -- Prometheus text format (version 0.0.4)
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return f"{{{body}}}" if body else ""
+
+
+def _histogram_lines(name: str, labels: List[Tuple[str, str]], snap: dict) -> List[str]:
+    lines = [f"{name}_bucket{_labels(labels + [('le', le)])} {n}" for le, n in snap["buckets"].items()]
+    lines.append(f"{name}_sum{_labels(labels)} {snap['sum_seconds']}")
+    lines.append(f"{name}_count{_labels(labels)} {snap['count']}")
+    return lines
+
+
+def render_prometheus() -> str:
+    out: List[str] = []
+    for name, value in METRICS.totals().items():
+        name = name if name.endswith("_total") else f"{name}_total"
+        out += [f"# TYPE {name} counter", f"{name} {value}"]
+
+    for name, snap in METRICS.histograms().items():
+        out.append(f"# TYPE {name} histogram")
+        out += _histogram_lines(name, [], snap)
+
+    if REQUESTS is not None:
+        out.append("# TYPE http_request_duration_seconds histogram")
+        for series, snap in REQUESTS.histograms().items():
+            if not snap["count"]:
+                continue
+            method, route, status = series.split(" ")
+            out += _histogram_lines("http_request_duration_seconds", [("method", method), ("route", route), ("status", status)], snap)
+    return "\n".join(out) + "\n"
+
+
+def request_latency() -> Dict[str, dict]:
+    """Non-empty per-route request histograms, keyed "METHOD route status-class"."""
+    if REQUESTS is None:
+        return {}
+    return {series: snap for series, snap in REQUESTS.histograms().items() if snap["count"]}
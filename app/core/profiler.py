@@ -0,0 +1,151 @@
+"""
+Opt-in sampling profiler for slow requests.
+
+A background thread snapshots every thread's Python stack (sys._current_frames)
+each `interval` seconds into a short ring buffer, skipping threads parked in a wait.
+When a request finishes over `slow_seconds`, the samples taken while it ran are
+folded into collapsed stacks ("frame;frame;frame count" per line), the input
+format of flamegraph.pl, speedscope and inferno. Samples are not tied to a
+request: with concurrent requests a profile also holds what the others were doing.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.schemas.api import ProfilerStatus, SlowRequestProfile
+
+# ring buffer of (perf_counter, folded stack); at a 5 ms interval and a handful of
+# busy threads this is several seconds of history
+SAMPLE_BUFFER = 20000
+MAX_DEPTH = 128
+PROFILES_KEPT = 50
+
+# leaf frames of a thread that is blocked, not working: lock/condition waits, the
+# event loop's selector, the thread pool's idle workers
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+# kept across profiler restarts, so turning it off does not lose what it caught
+PROFILES: Deque[Tuple[SlowRequestProfile, Dict[str, int]]] = deque(maxlen=PROFILES_KEPT)
+_ids = itertools.count(1)
+
+
+def fold(frame) -> str:
+    names: List[str] = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+def _idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+class SlowRequestProfiler:
+    def __init__(self, interval: float, slow_seconds: float) -> None:
+        self.interval = interval
+        self.slow_seconds = slow_seconds
+        self._samples: Deque[Tuple[float, str]] = deque(maxlen=SAMPLE_BUFFER)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.samples_taken = 0
+        self.sample_seconds = 0.0
+        self.sweeps = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample_once(own)
+
+    def sample_once(self, own: Optional[int] = None) -> None:
+        t0 = time.perf_counter()
+        for ident, frame in sys._current_frames().items():
+            if ident != own and not _idle(frame):
+                self._samples.append((t0, fold(frame)))
+                self.samples_taken += 1
+        self.sweeps += 1
+        self.sample_seconds += time.perf_counter() - t0
+
+    def finish(self, method: str, route: str, status: int, started: float, elapsed: float) -> None:
+        """Called by the request middleware with perf_counter() times; keeps a profile if slow."""
+        if elapsed < self.slow_seconds:
+            return
+        end = started + elapsed
+        stacks: Counter = Counter()
+        for t, stack in reversed(list(self._samples)):
+            if t < started:
+                break
+            if t <= end:
+                stacks[stack] += 1
+        profile = SlowRequestProfile(
+            id=next(_ids),
+            method=method,
+            route=route,
+            status=status,
+            duration_ms=round(elapsed * 1e3, 3),
+            started_at=round(time.time() - (time.perf_counter() - started), 3),
+            samples=sum(stacks.values()),
+        )
+        PROFILES.appendleft((profile, dict(stacks)))
+
+
+def status(slow_ms: float, interval_ms: float) -> ProfilerStatus:
+    p = PROFILER
+    return ProfilerStatus(
+        enabled=p is not None,
+        slow_ms=p.slow_seconds * 1e3 if p else slow_ms,
+        interval_ms=p.interval * 1e3 if p else interval_ms,
+        samples_taken=p.samples_taken if p else 0,
+        sample_cost_ms=round(p.sample_seconds / p.sweeps * 1e3, 4) if p and p.sweeps else 0.0,
+        profiles=[profile for profile, _ in PROFILES],
+    )
+
+
+def folded(profile_id: int) -> Optional[str]:
+    for profile, stacks in PROFILES:
+        if profile.id == profile_id:
+            return "".join(f"{stack} {n}\n" for stack, n in sorted(stacks.items()))
+    return None
+
+
+PROFILER: Optional[SlowRequestProfiler] = None
+
+
+def start_profiler(interval: float, slow_seconds: float) -> None:
+    global PROFILER
+    if PROFILER is None:
+        PROFILER = SlowRequestProfiler(interval, slow_seconds)
+        PROFILER.start()
+
+
+def stop_profiler() -> None:
+    global PROFILER
+    if PROFILER is not None:
+        PROFILER.stop()
+        PROFILER = None
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` tokens per second, holding at most `burst`.
+
+    reserve() always takes a token, letting the balance go negative, and returns how
+    long the caller must wait before using it. Callers therefore proceed in the order
+    they reserved, and nothing needs to be woken up when tokens come back.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait for the reserved token, or None (nothing taken) if that exceeds max_wait."""
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1.0
+            return wait
+
+    def take(self) -> float:
+        """Take a token if one is there and return 0; otherwise take nothing and return seconds until one is."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
@@ -1,13 +1,36 @@
-import hmac
+import hashlib
+from typing import FrozenSet, Optional, Tuple
+
 from fastapi import Header, HTTPException
+
+from app.core import admission
 from app.core.config import settings
 
 
-def require_api_key(x_api_key: str | None = Header(default=None, alias="X-API-Key")) -> None:
-    if not x_api_key or x_api_key not in settings.api_key_set():
+async def require_api_key(x_api_key: str | None = Header(default=None, alias="X-API-Key")) -> None:
+    # async: a dict probe needs no trip through the worker thread pool
+    if not x_api_key or admission.lookup(x_api_key) is None:
         raise HTTPException(status_code=401, detail="Invalid or missing X-API-Key")
-    
-    for k in settings.api_key_set():
-        if hmac.compare_digest(x_api_key, k):
-            return
-    raise HTTPException(status_code=403, detail="Invalid API key")
\ No newline at end of file
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode("latin-1")).digest()
+
+
+_ADMIN: Tuple[Optional[str], FrozenSet[bytes]] = (None, frozenset())
+
+
+def _admin_digests() -> FrozenSet[bytes]:
+    """Digests of ADMIN_API_KEYS, rebuilt only when the setting itself changes."""
+    global _ADMIN
+    source, digests = _ADMIN
+    if source is not settings.admin_api_keys:
+        digests = frozenset(_digest(k) for k in settings.admin_api_key_set())
+        _ADMIN = (settings.admin_api_keys, digests)
+    return digests
+
+
+async def require_admin_key(x_api_key: str | None = Header(default=None, alias="X-API-Key")) -> None:
+    # separate from API_KEYS, so a voice-agent key cannot rewrite the board
+    if not x_api_key or _digest(x_api_key) not in _admin_digests():
+        raise HTTPException(status_code=401, detail="Invalid or missing admin X-API-Key")
@@ -1,18 +1,37 @@
 import json
+import logging
 import time
 from pathlib import Path
-from threading import RLock
-from typing import Dict, List
+from threading import Lock
 
+from app.core.histogram import DEFAULT_BUCKETS, FINE_BUCKETS
+from app.core.metrics_store import build_metrics
 from app.core.config import settings
-from app.schemas.domain import CallState, Load, MetricsState, NegotiationState
+from app.schemas.domain import Load, MetricsState
+from app.services.load_board import LoadBoard
+from app.services.load_store import STORES
 
-LOCK = RLock()
+logger = logging.getLogger(__name__)
 
-LOADS: List[Load] = []
-CALLS: Dict[str, CallState] = {}
-NEGOTIATIONS: Dict[str, NegotiationState] = {}
-METRICS = MetricsState()
+# Readers take `state.BOARD` once and use that snapshot; writers build the next
+# snapshot under BOARD_LOCK and publish it with a single rebind.
+BOARD_LOCK = Lock()
+BOARD: LoadBoard = LoadBoard.build([])
+# latency histograms kept alongside the MetricsState counters
+HISTOGRAMS = {
+    "negotiation_step_seconds": DEFAULT_BUCKETS,
+    "fmcsa_upstream_seconds": DEFAULT_BUCKETS,
+    # internal spans (app.core.observability.span); the FMCSA fetch is fmcsa_upstream_seconds
+    "load_search_seconds": FINE_BUCKETS,
+    "negotiation_decide_seconds": FINE_BUCKETS,
+    "db_upsert_seconds": FINE_BUCKETS,
+}
+# summed over every worker process when METRICS_DIR is set
+METRICS = build_metrics(MetricsState.model_fields, HISTOGRAMS, settings.metrics_dir)
+
+
+def metrics_snapshot() -> MetricsState:
+    return MetricsState(**METRICS.totals())
 
 
 def now_ts() -> float:
@@ -20,7 +39,8 @@ def now_ts() -> float:
 
 
 def init_state() -> None:
-    global LOADS
+    """Load the seed file into a new board snapshot; run once, at startup."""
+    global BOARD
 
     file_name = settings.loads_file
 
@@ -37,7 +57,8 @@ def init_state() -> None:
     with open(seed_path, "r", encoding="utf-8") as f:
         raw = json.load(f)
 
-    LOADS = [Load(**item) for item in raw]
-    print(f"[startup] loaded {len(LOADS)} loads from {seed_path}")
-
-init_state()
+    board = LoadBoard.build((Load(**item) for item in raw), store_cls=STORES[settings.load_store])
+    with BOARD_LOCK:
+        board.version = BOARD.version + 1
+        BOARD = board
+    logger.info("loaded %d loads from %s", len(board), seed_path)
@@ -1,34 +1,97 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 engine = None
 SessionLocal = None
 
+# Sessions for writes. On SQLite this is one dedicated connection, so writers queue
+# in-process instead of contending for the database lock; elsewhere it is SessionLocal.
+write_engine = None
+WriteSessionLocal = None
+
+# applied to every SQLite connection: WAL lets readers run alongside the writer,
+# synchronous=NORMAL is durable across process crashes in WAL mode
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
 
 class Base(DeclarativeBase):
     pass
 
 
+def _sqlite_engine(database_url: str, pool_size: int):
+    eng = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=pool_size,
+        max_overflow=0 if pool_size == 1 else 10,
+        future=True,
+    )
+
+    @event.listens_for(eng, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cur.execute(pragma)
+        cur.close()
+
+    return eng
+
+
 def init_db() -> None:
-    global engine, SessionLocal
+    global engine, SessionLocal, write_engine, WriteSessionLocal
 
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
         return
 
-    engine = create_engine(
-        database_url,
-        pool_pre_ping=True,
-        future=True,
-    )
+    for eng in {engine, write_engine} - {None}:
+        eng.dispose()
+
+    if database_url.startswith("sqlite"):
+        engine = _sqlite_engine(database_url, pool_size=5)
+        write_engine = _sqlite_engine(database_url, pool_size=1)
+    else:
+        engine = create_engine(
+            database_url,
+            pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() != "false",
+            pool_recycle=1800,
+            future=True,
+        )
+        write_engine = engine
+
     SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    WriteSessionLocal = sessionmaker(bind=write_engine, autoflush=False, autocommit=False, future=True)
 
     from app import models  # noqa: F401
 
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=write_engine)
+
+    # create_all skips tables that already exist, so add any indexes declared since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=write_engine, checkfirst=True)
 
 
 def require_db() -> None:
     if SessionLocal is None:
         raise RuntimeError("Database not initialized. Ensure DATABASE_URL is set and init_db() runs on startup.")
+
+
+def insert_for(table, bind=None):
+    """INSERT for the dialect of `bind` (default: the write engine), with its ON CONFLICT upsert clauses."""
+    bind = bind if bind is not None else write_engine
+    dialect = bind.dialect.name if bind is not None else "postgresql"
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    raise RuntimeError(f"Upserts are not supported on the {dialect} dialect")
@@ -1,28 +1,95 @@
+import logging
+
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pathlib import Path
 from fastapi import FastAPI
 
+from app.core import admission, observability, profiler
 from app.core.config import settings
+from app.core.fastjson import FastJSONResponse
 from app.core.state import init_state
 from app.routers.health import router as health_router
 from app.routers.webhooks import router as webhooks_router
 from app.routers.carriers import router as carriers_router
 from app.routers.loads import router as loads_router
 from app.routers.negotiations import router as negotiations_router
-from app.routers.metrics import router as metrics_router
+from app.routers.metrics import router as metrics_router, prometheus_router
+from app.routers.admin import router as admin_router
+import app.db as db
 from app.db import init_db
+from app.services.ingest import DeltaFileWatcher
+from app.services import call_store, fmcsa, retention, rollups, state_store
+from app.services.dashboard import start_feed as start_dashboard_feed, stop_feed as stop_dashboard_feed
+from app.services.fmcsa_cache import CACHE as fmcsa_cache
 
 STATIC_DIR = Path(__file__).parent / "static"
 
-app = FastAPI(title="Inbound Carrier Sales POC", version="0.1.0")
+# the app's own loggers; uvicorn configures only its own
+logging.basicConfig(level=settings.log_level.upper(), format="%(levelname)s:     %(name)s: %(message)s")
+
+app = FastAPI(title="Inbound Carrier Sales POC", version="0.1.0", default_response_class=FastJSONResponse)
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
+_delta_watcher: DeltaFileWatcher | None = None
+
 
 @app.on_event("startup")
 def _startup() -> None:
+    global _delta_watcher
+
+    admission.keys()  # fail at startup on a malformed API_KEY_LIMITS
     init_state()
     init_db()
+    state_store.init_store()
+    if settings.state_sweep_interval_seconds > 0:
+        retention.start_sweeper(settings.state_sweep_interval_seconds)
+    rollups.ensure_built()
+    start_dashboard_feed(settings.dashboard_stream_poll_ms / 1e3)
+    fmcsa_cache.load()
+    if settings.profiler_enabled:
+        profiler.start_profiler(settings.profiler_interval_ms / 1e3, settings.profiler_slow_ms / 1e3)
+
+    if settings.call_write_behind and db.SessionLocal is not None:
+        call_store.start_writer(
+            settings.call_spool_dir,
+            batch_size=settings.call_flush_batch_size,
+            flush_interval=settings.call_flush_interval_seconds,
+            fsync=settings.call_spool_fsync,
+        )
+
+    if settings.loads_delta_file:
+        _delta_watcher = DeltaFileWatcher(
+            settings.loads_delta_file,
+            poll_seconds=settings.loads_delta_poll_seconds,
+            batch_size=settings.loads_delta_batch_size,
+        )
+        _delta_watcher.start()
+
+
+@app.on_event("startup")
+async def _start_loop_services() -> None:
+    # the shared FMCSA client's pool and the queue probe belong to the server's event loop
+    await fmcsa.start_client()
+    if settings.shed_queue_ms > 0:
+        await admission.start_probe(settings.shed_probe_interval_ms / 1e3)
+
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    profiler.stop_profiler()
+    retention.stop_sweeper()
+    call_store.stop_writer()
+    stop_dashboard_feed()
+    fmcsa_cache.save()
+    if _delta_watcher is not None:
+        _delta_watcher.stop()
+
+
+@app.on_event("shutdown")
+async def _stop_loop_services() -> None:
+    await admission.stop_probe()
+    await fmcsa.stop_client()
 
 @app.get("/dashboard")
 def dashboard():
@@ -37,3 +104,11 @@ app.include_router(carriers_router)
 app.include_router(loads_router)
 app.include_router(negotiations_router)
 app.include_router(metrics_router)
+app.include_router(prometheus_router)
+app.include_router(admin_router)
+
+app.add_middleware(admission.AdmissionMiddleware)
+# after every router: the per-route latency series are fixed from here on. Added
+# last, so it is the outermost middleware and also times requests turned away
+observability.install(app)
+
@@ -1,10 +1,17 @@
-from sqlalchemy import String, Float, Integer, Boolean, BigInteger, Text
+from sqlalchemy import String, Float, Integer, Boolean, BigInteger, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db import Base
 
 
 class CallRecord(Base):
     __tablename__ = "calls"
+    __table_args__ = (
+        # keyset pagination of the dashboard call list, optionally filtered
+        Index("ix_calls_ended_at_call_id", "ended_at", "call_id"),
+        Index("ix_calls_outcome_ended_at_call_id", "outcome", "ended_at", "call_id"),
+        Index("ix_calls_sentiment_ended_at_call_id", "sentiment", "ended_at", "call_id"),
+        Index("ix_calls_load_id_ended_at_call_id", "load_id", "ended_at", "call_id"),
+    )
 
     call_id: Mapped[str] = mapped_column(String, primary_key=True)
 
@@ -25,3 +32,65 @@ class CallRecord(Base):
     transfer_to_rep: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
 
     summary: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class CallRollup(Base):
+    """Additive per-day and all-time aggregates of `calls`, kept in step by call_store."""
+
+    __tablename__ = "call_rollups"
+
+    # epoch day of ended_at, or ALL_DAYS for the all-time row
+    day: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    outcome: Mapped[str] = mapped_column(String, primary_key=True)
+    sentiment: Mapped[str] = mapped_column(String, primary_key=True)
+
+    calls: Mapped[int] = mapped_column(BigInteger, default=0)
+    verified_known: Mapped[int] = mapped_column(BigInteger, default=0)
+    verified_true: Mapped[int] = mapped_column(BigInteger, default=0)
+    accepted: Mapped[int] = mapped_column(BigInteger, default=0)
+    transferred: Mapped[int] = mapped_column(BigInteger, default=0)
+    rounds_sum: Mapped[int] = mapped_column(BigInteger, default=0)
+    rounds_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    delta_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    delta_count: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class DataVersion(Base):
+    """One row counting committed writes to `calls` / `call_rollups`, shared by every worker."""
+
+    __tablename__ = "data_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class DataEvent(Base):
+    """What changed at each data version, for the dashboard stream of every worker; `data` NULL means reload."""
+
+    __tablename__ = "data_events"
+
+    version: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    data: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class NegotiationStateRow(Base):
+    """Live negotiation state for the `sql` state backend; `round` and `status` are the compare-and-set key."""
+
+    __tablename__ = "negotiation_state"
+
+    call_id: Mapped[str] = mapped_column(String, primary_key=True)
+    round: Mapped[int] = mapped_column(Integer)
+    status: Mapped[str] = mapped_column(String)
+    updated_at: Mapped[float] = mapped_column(Float)
+    state: Mapped[str] = mapped_column(Text)
+
+
+class CallStateRow(Base):
+    """Live call state for the `sql` state backend."""
+
+    __tablename__ = "call_state"
+
+    call_id: Mapped[str] = mapped_column(String, primary_key=True)
+    ended_at: Mapped[float | None] = mapped_column(Float, nullable=True)
+    updated_at: Mapped[float] = mapped_column(Float)
+    state: Mapped[str] = mapped_column(Text)
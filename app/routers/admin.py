@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core import profiler, state
+from app.core.config import settings
+from app.core.security import require_admin_key
+from app.schemas.api import ProfilerSettings, ProfilerStatus
+from app.schemas.loads import LoadBoardStatus, LoadDeltaBatch, LoadIngestResult
+from app.services import ingest
+
+router = APIRouter(prefix="/v1/admin", tags=["admin"], dependencies=[Depends(require_admin_key)])
+
+
+@router.post("/loads/deltas", response_model=LoadIngestResult)
+def load_deltas(batch: LoadDeltaBatch) -> LoadIngestResult:
+    return ingest.apply_deltas(batch.deltas)
+
+
+@router.get("/loads/board", response_model=LoadBoardStatus)
+def load_board_status() -> LoadBoardStatus:
+    board = state.BOARD
+    return LoadBoardStatus(board_size=len(board), board_version=board.version, last_ingest=ingest.LAST_INGEST)
+
+
+def _profiler_status() -> ProfilerStatus:
+    return profiler.status(settings.profiler_slow_ms, settings.profiler_interval_ms)
+
+
+@router.get("/profiler", response_model=ProfilerStatus)
+def profiler_status() -> ProfilerStatus:
+    return _profiler_status()
+
+
+@router.put("/profiler", response_model=ProfilerStatus)
+def profiler_toggle(body: ProfilerSettings) -> ProfilerStatus:
+    # restart so new thresholds apply; profiles already caught are kept
+    profiler.stop_profiler()
+    if body.enabled:
+        profiler.start_profiler(body.interval_ms / 1e3, body.slow_ms / 1e3)
+    return _profiler_status()
+
+
+@router.get("/profiler/profiles/{profile_id}", response_class=PlainTextResponse)
+def profiler_profile(profile_id: int) -> PlainTextResponse:
+    """Collapsed stacks of one slow request, ready for flamegraph.pl or speedscope."""
+    text = profiler.folded(profile_id)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(text)
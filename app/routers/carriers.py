@@ -1,15 +1,109 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from typing import AsyncIterator, Optional
 
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.security import require_api_key
 from app.schemas.carriers import CarrierVerifyRequest, CarrierVerifyResponse
-from app.services.fmcsa import FmcsaError, verify_carrier
+from app.services.carrier_batch import iter_list, iter_ndjson, verify_stream
+from app.services.fmcsa import MC_NUMBER_ERROR, FmcsaError, new_deadline, valid_mc_number
+from app.services.fmcsa_cache import CACHE
 
-router = APIRouter(prefix="/carriers", tags=["carriers"])
+router = APIRouter(prefix="/carriers", tags=["carriers"], dependencies=[Depends(require_api_key)])
 
 
 @router.post("/verify", response_model=CarrierVerifyResponse)
-async def verify(req: CarrierVerifyRequest):
+async def verify(
+    req: CarrierVerifyRequest,
+    x_deadline_ms: Optional[int] = Header(default=None, ge=0, le=60000),
+):
+    # the caller's remaining time budget, e.g. what is left of the voice agent's tool timeout
+    deadline = new_deadline(None if x_deadline_ms is None else x_deadline_ms / 1000)
+    if not valid_mc_number(req.mc_number.strip()):
+        raise HTTPException(status_code=422, detail=MC_NUMBER_ERROR)
     try:
-        result = await verify_carrier(req.mc_number)
+        result = await CACHE.verify(req.mc_number, deadline)
         return result
     except FmcsaError as e:
         raise HTTPException(status_code=502, detail=str(e))
+
+
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+# a JSON batch is parsed whole, so its body is capped at this much per allowed item
+JSON_BYTES_PER_ITEM = 64
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse that starts while the request body is still being read.
+    Starlette listens for the disconnect on the same receive channel from the start,
+    which would swallow upload chunks; here it waits for `body_done` first.
+    """
+
+    def __init__(self, content, body_done: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_done = body_done
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await self.body_done.wait()
+        await super().listen_for_disconnect(receive)
+
+
+async def _upload(request: Request, done: asyncio.Event) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in request.stream():
+            yield chunk
+    finally:
+        done.set()
+
+
+async def _read_json(request: Request, max_items: int) -> list:
+    limit = max_items * JSON_BYTES_PER_ITEM
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"JSON batch over {limit} bytes; send NDJSON or split it")
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Expected {{\"mc_numbers\": [...]}} or NDJSON: {e}")
+    if isinstance(payload, dict):
+        payload = payload.get("mc_numbers")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=422, detail="Expected {\"mc_numbers\": [...]} or NDJSON")
+    if len(payload) > max_items:
+        raise HTTPException(status_code=413, detail=f"Batch is limited to {max_items} items")
+    return payload
+
+
+@router.post("/verify/batch")
+async def verify_batch(
+    request: Request,
+    concurrency: Optional[int] = Query(default=None, ge=1, le=64),
+):
+    """
+    Verify many MC numbers: a JSON body {"mc_numbers": [...]} (or a bare list), or an
+    NDJSON upload with one MC number per line. Results stream back as NDJSON in
+    completion order, one line per input with its "index"; per-item failures are
+    reported inline as {"index", "mc_number", "error"}.
+
+    At most FMCSA_BATCH_MAX_ITEMS items are taken: a larger JSON batch is refused with
+    413, an NDJSON upload ends with an error line at the item past the limit.
+    """
+    max_items = settings.fmcsa_batch_max_items
+    concurrency = concurrency or settings.fmcsa_batch_concurrency
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_TYPES:
+        # read while verifying, a line at a time: memory stays flat whatever the upload size
+        body_done = asyncio.Event()
+        items = iter_ndjson(_upload(request, body_done), max_items)
+        return UploadStreamingResponse(
+            verify_stream(items, concurrency), body_done, media_type="application/x-ndjson"
+        )
+
+    items = iter_list(await _read_json(request, max_items))
+    return StreamingResponse(verify_stream(items, concurrency), media_type="application/x-ndjson")
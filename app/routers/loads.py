@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends
+from typing import List, Optional
 
+from fastapi import APIRouter, Depends, Response
+
+from app.core.fastjson import dumps
 from app.core.security import require_api_key
-from app.core.state import LOCK, CALLS
 from app.schemas.loads import LoadSearchRequest, LoadSearchResponse
-from app.services.loads import search
+from app.services.loads import search_json, search_nearby_json, time_window
+from app.services.matching import Resolution
 
 router = APIRouter(prefix="/v1/loads", tags=["loads"], dependencies=[Depends(require_api_key)])
 
@@ -14,11 +17,34 @@ def _fmt_city_state(city: str | None, state: str | None) -> str | None:
     return f"{city.strip()}, {state.strip().upper()}"
 
 
+def _search_response(matches: List[bytes], res: Resolution, deadhead_miles: Optional[List[float]] = None) -> Response:
+    # the body LoadSearchResponse serializes to, joined from each load's cached JSON
+    body = b"".join((
+        b'{"matches":[', b",".join(matches),
+        b'],"deadhead_miles":', dumps(deadhead_miles),
+        b',"match_score":', dumps(res.score),
+        b',"resolved":', dumps(res.rewritten or None), b"}",
+    ))
+    return Response(body, media_type="application/json")
+
+
 @router.post("/search", response_model=LoadSearchResponse)
-def load_search(req: LoadSearchRequest) -> LoadSearchResponse:
+def load_search(req: LoadSearchRequest) -> Response:
     origin = req.origin or _fmt_city_state(req.origin_city, req.origin_state)
     destination = req.destination or _fmt_city_state(req.destination_city, req.destination_state)
-
-    matches = search(origin, destination, req.equipment_type, req.limit)
-
-    return LoadSearchResponse(matches=matches)
+    window = time_window(req.pickup_after, req.pickup_before, req.delivery_after, req.delivery_before)
+
+    if req.origin_radius_miles or req.destination_radius_miles:
+        nearby, res = search_nearby_json(
+            origin,
+            destination,
+            req.equipment_type,
+            req.origin_radius_miles,
+            req.destination_radius_miles,
+            req.limit,
+            window,
+        )
+        return _search_response([l for l, _ in nearby], res, [m for _, m in nearby])
+
+    matches, res = search_json(origin, destination, req.equipment_type, req.limit, window)
+    return _search_response(matches, res)
@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from sqlalchemy import select
 
 import app.db as db
 from app.models import CallRecord
 
+from app.core import admission, observability
+from app.core.config import settings
 from app.core.security import require_api_key
-from app.core.state import LOCK, CALLS
-from app.schemas.api import MetricsOverview
-from app.services.metrics import overview
+from app.schemas.api import AdmissionStatus, CallWriterStatus, MetricsOverview, StateRetentionStatus
+from app.schemas.carriers import FmcsaCacheStatus, FmcsaUpstreamStatus
+from app.services.metrics import latency, overview
+from app.services import call_store, dashboard, fmcsa, fmcsa_cache, retention
+from app.services.broadcast import next_event, sse_event
 
 router = APIRouter(prefix="/v1/metrics", tags=["metrics"], dependencies=[Depends(require_api_key)])
+prometheus_router = APIRouter(tags=["metrics"], dependencies=[Depends(require_api_key)])
+
+
+@prometheus_router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(observability.render_prometheus(), media_type="text/plain; version=0.0.4")
 
 
 @router.get("/overview", response_model=MetricsOverview)
@@ -18,109 +31,140 @@ def metrics_overview() -> MetricsOverview:
     return overview()
 
 
-def _dashboard_rows() -> list[dict]:
-    db.require_db()
+@router.get("/latency")
+def metrics_latency() -> dict:
+    return latency()
 
-    with db.SessionLocal() as session:
-        rows = (
-            session.execute(
-                select(CallRecord).order_by(CallRecord.ended_at.desc().nullslast())
-            )
-            .scalars()
-            .all()
-        )
-
-    out: list[dict] = []
-    for r in rows:
-        out.append({
-            "call_id": r.call_id,
-            "ended_at": r.ended_at,
-            "verified": r.verified,
-            "load_id": r.load_id,
-            "loadboard_rate": r.loadboard_rate,
-            "rounds": r.rounds,
-            "carrier_last_offer": r.carrier_last_offer,
-            "final_offer": r.final_offer,
-            "agreed": r.agreed,
-            "transfer_to_rep": r.transfer_to_rep,
-            "outcome": r.outcome,
-            "sentiment": r.sentiment,
-        })
-    return out
 
+@router.get("/latency/routes")
+def metrics_route_latency() -> dict:
+    return observability.request_latency()
 
-@router.get("/dashboard/overview")
-def dashboard_overview():
-    rows = _dashboard_rows()
-    total = len(rows)
-
-    if total == 0:
-        return {
-            "total_calls": 0,
-            "verified_rate": 0.0,
-            "acceptance_rate": 0.0,
-            "transfer_rate": 0.0,
-            "avg_rounds": 0.0,
-            "avg_final_vs_loadboard": 0.0,
-        }
-
-    verified_known = [r for r in rows if r.get("verified") is not None]
-    verified_rate = (
-        sum(1 for r in verified_known if r.get("verified") is True) / len(verified_known)
-        if verified_known
-        else 0.0
-    )
 
-    accepted = [r for r in rows if r.get("outcome") == "ACCEPTED" or r.get("agreed") is True]
-    acceptance_rate = len(accepted) / total
+@router.get("/admission", response_model=AdmissionStatus)
+def admission_status() -> AdmissionStatus:
+    return admission.status()
 
-    transferred = [r for r in rows if r.get("transfer_to_rep") is True]
-    transfer_rate = len(transferred) / total
 
-    rounds_vals = [float(r["rounds"]) for r in rows if r.get("rounds") is not None]
-    avg_rounds = (sum(rounds_vals) / len(rounds_vals)) if rounds_vals else 0.0
+@router.get("/persistence", response_model=CallWriterStatus)
+def persistence_status() -> CallWriterStatus:
+    if call_store.WRITER is None:
+        raise HTTPException(status_code=404, detail="Write-behind persistence is not enabled")
+    return call_store.WRITER.status()
 
-    deltas = []
-    for r in rows:
-        if r.get("final_offer") is not None and r.get("loadboard_rate") is not None:
-            deltas.append(float(r["final_offer"]) - float(r["loadboard_rate"]))
-    avg_final_vs_loadboard = (sum(deltas) / len(deltas)) if deltas else 0.0
 
-    return {
-        "total_calls": total,
-        "verified_rate": round(verified_rate, 3),
-        "acceptance_rate": round(acceptance_rate, 3),
-        "transfer_rate": round(transfer_rate, 3),
-        "avg_rounds": round(avg_rounds, 3),
-        "avg_final_vs_loadboard": round(avg_final_vs_loadboard, 2),
-    }
+@router.get("/state", response_model=StateRetentionStatus)
+def state_retention_status() -> StateRetentionStatus:
+    if retention.SWEEPER is None:
+        raise HTTPException(status_code=404, detail="State retention sweeper is not running")
+    return retention.SWEEPER.status()
+
+
+@router.get("/fmcsa-cache", response_model=FmcsaCacheStatus)
+def fmcsa_cache_status() -> FmcsaCacheStatus:
+    return fmcsa_cache.CACHE.status()
+
+
+@router.get("/fmcsa-upstream", response_model=FmcsaUpstreamStatus)
+def fmcsa_upstream_status() -> FmcsaUpstreamStatus:
+    return fmcsa.upstream_status()
+
+
+@router.get("/dashboard/snapshot")
+def dashboard_snapshot(limit: int = 20, if_none_match: Optional[str] = Header(None)):
+    limit = max(1, min(limit, 500))
+    headers = {"Cache-Control": "no-cache"}
+
+    # unchanged since the client's copy: answer with one primary-key read
+    version = dashboard.current_version()
+    etag = dashboard.snapshot_etag(limit, version)
+    if if_none_match is not None and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+
+    etag, body = dashboard.snapshot(limit, version)
+    return Response(content=body, media_type="application/json", headers={**headers, "ETag": etag})
+
+
+@router.get("/dashboard/stream")
+async def dashboard_stream(request: Request):
+    """
+    Server-sent events: `call` for each committed call write (row plus aggregate
+    deltas, with the snapshot version it produced) and `resync` when this client
+    fell too far behind and should reload the snapshot.
+    """
+    sub = dashboard.EVENTS.subscribe()
+
+    async def events():
+        try:
+            yield b"retry: 3000\n" + sse_event("hello", {"version": dashboard.stream_position()})
+            while not await request.is_disconnected():
+                data = await next_event(sub, settings.dashboard_stream_keepalive_seconds)
+                yield data if data is not None else b": keepalive\n\n"
+        finally:
+            dashboard.EVENTS.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/dashboard/overview")
+def dashboard_overview():
+    return dashboard.overview()
 
 
 @router.get("/dashboard/outcomes")
 def dashboard_outcomes():
-    rows = _dashboard_rows()
-    counts: dict[str, int] = {}
-    for r in rows:
-        key = r.get("outcome") or "UNKNOWN"
-        counts[key] = counts.get(key, 0) + 1
-    return counts
+    return dashboard.outcome_counts()
 
 
 @router.get("/dashboard/sentiment")
 def dashboard_sentiment():
-    rows = _dashboard_rows()
-    counts: dict[str, int] = {}
-    for r in rows:
-        key = r.get("sentiment") or "Unknown"
-        counts[key] = counts.get(key, 0) + 1
-    return counts
+    return dashboard.sentiment_counts()
+
+
+@router.get("/dashboard/daily")
+def dashboard_daily(days: int = 14):
+    days = max(1, min(int(days), 366))
+    return dashboard.daily(days)
 
 
 @router.get("/dashboard/calls")
-def dashboard_calls(limit: int = 50):
-    rows = _dashboard_rows()
+def dashboard_calls(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    outcome: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    load_id: Optional[str] = None,
+    verified: Optional[bool] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+):
     limit = max(1, min(limit, 500))
-    return rows[:limit]
+
+    after = None
+    if cursor:
+        try:
+            after = dashboard.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    rows, next_cursor = dashboard.list_calls(
+        limit,
+        cursor=after,
+        outcome=outcome,
+        sentiment=sentiment,
+        load_id=load_id,
+        verified=verified,
+        since=since,
+        until=until,
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = dashboard.encode_cursor(next_cursor)
+    return rows
 
 
 def _row_to_dashboard_dict(r: CallRecord) -> dict:
@@ -142,6 +186,8 @@ def _row_to_dashboard_dict(r: CallRecord) -> dict:
 
 @router.get("/dashboard/calls/{call_id}")
 def dashboard_call(call_id: str):
+    db.require_db()
+
     with db.SessionLocal() as session:
         row = session.execute(
             select(CallRecord).where(CallRecord.call_id == call_id)
@@ -1,45 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+import time
 
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from app.core.fastjson import model_response
 from app.core.security import require_api_key
-from app.schemas.negotiation import NegotiationStepRequest, NegotiationStepResponse
+from app.core.state import METRICS
+from app.schemas.negotiation import BacktestRequest, BacktestResponse, NegotiationStepRequest, NegotiationStepResponse
+from app.services import backtest as backtest_service
 from app.services.loads import get_by_id
-from app.services.negotiation import (
-    start,
-    counter as do_counter,
-    accept as do_accept,
-    exists as negotiation_exists,
-)
+from app.services.negotiation import step as negotiation_step
 
 router = APIRouter(prefix="/v1/negotiations", tags=["negotiations"], dependencies=[Depends(require_api_key)],)
 
 
 @router.post("/step", response_model=NegotiationStepResponse)
-def step(req: NegotiationStepRequest) -> NegotiationStepResponse:
+def step(req: NegotiationStepRequest) -> Response:
     if not req.call_id:
         raise HTTPException(status_code=400, detail="call_id is required")
 
+    t0 = time.perf_counter()
     load = get_by_id(req.load_id)
 
-    if not negotiation_exists(req.call_id):
-        st, decision, counter_offer = start(
-            call_id=req.call_id,
-            load=load,
-            mc_number=req.mc_number,
-            carrier_initial_offer=req.carrier_offer,
-        )
-    else:
-        st, decision, counter_offer = do_counter(req.call_id, req.carrier_offer)
-
-    transfer = False
-    final_rate = st.final_rate
+    st, decision, counter_offer = negotiation_step(
+        call_id=req.call_id,
+        load=load,
+        mc_number=req.mc_number,
+        carrier_offer=req.carrier_offer,
+    )
+    METRICS.observe("negotiation_step_seconds", time.perf_counter() - t0)
 
-    if decision == "accept":
-        st = do_accept(req.call_id, req.carrier_offer)
-        transfer = True
-        final_rate = st.final_rate
-        counter_offer = None
+    transfer = decision == "accept"
+    final_rate = st.final_rate
 
-    return NegotiationStepResponse(
+    return model_response(NegotiationStepResponse(
         call_id=req.call_id,
         status=st.status,
         round=st.round,
@@ -48,4 +41,13 @@ def step(req: NegotiationStepRequest) -> NegotiationStepResponse:
         final_rate=final_rate,
         policy=st.policy.model_dump() if getattr(st, "policy", None) else None,
         transfer_to_rep=transfer,
-    )
+    ))
+
+
+@router.post("/backtest", response_model=BacktestResponse)
+def backtest(req: BacktestRequest) -> BacktestResponse:
+    """Replay call history under every policy in the grid; see app.services.backtest for the carrier model."""
+    size = len(req.band_low) * len(req.band_high) * len(req.concession_start) * len(req.concession_step) * len(req.max_rounds)
+    if size > backtest_service.MAX_POLICIES:
+        raise HTTPException(status_code=422, detail=f"Grid has {size} policies; at most {backtest_service.MAX_POLICIES}")
+    return backtest_service.run(req)
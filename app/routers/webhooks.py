@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends
 
 from app.core.security import require_api_key
-from app.core.state import LOCK, CALLS, METRICS, NEGOTIATIONS, now_ts
+from app.core.state import METRICS, now_ts
 from app.schemas.api import WebhookCallEnded
 from app.schemas.domain import CallState, NegotiationState
-from app.services.call_store import upsert_call_record
+from app.services import state_store
+from app.services.call_store import submit_call_record, summary_text
 
 router = APIRouter(prefix="/webhooks/happyrobot", tags=["webhooks"], dependencies=[Depends(require_api_key)],)
 
@@ -34,7 +35,7 @@ def _classify_outcome(webhook_outcome: str | None, negotiation: NegotiationState
 
 
 def _build_dashboard_record(call_id: str, payload: WebhookCallEnded) -> dict:
-    negotiation = NEGOTIATIONS.get(call_id)
+    negotiation = state_store.STORE.get_negotiation(call_id)
 
     summary = payload.summary if isinstance(payload.summary, dict) else {}
 
@@ -59,8 +60,8 @@ def _build_dashboard_record(call_id: str, payload: WebhookCallEnded) -> dict:
 
     if negotiation:
         rounds = negotiation.round
-        load_id = negotiation.load.load_id
-        loadboard_rate = negotiation.load.loadboard_rate
+        load_id = negotiation.load_id
+        loadboard_rate = negotiation.loadboard_rate
 
         carrier_last_offer = negotiation.last_carrier_offer
 
@@ -98,38 +99,26 @@ def _build_dashboard_record(call_id: str, payload: WebhookCallEnded) -> dict:
 
 @router.post("/call-ended")
 def call_ended(payload: WebhookCallEnded):
-    with LOCK:
-        st = CALLS.get(payload.call_id)
+    store = state_store.STORE
+    st = store.get_call(payload.call_id)
+    if st is not None and st.ended_at is not None:
+        return {"ok": True, "call_id": payload.call_id, "idempotent": True}
 
-        if not st:
-            st = CallState(call_id=payload.call_id)
-            CALLS[payload.call_id] = st
-            METRICS.calls_started += 1
+    st = st or CallState(call_id=payload.call_id)
+    st.ended_at = now_ts()
+    st.outcome = payload.outcome
 
-        if st.ended_at is not None:
-            return {"ok": True, "call_id": payload.call_id, "idempotent": True}
+    st.summary = payload.summary or {}
 
-        st.ended_at = now_ts()
-        st.outcome = payload.outcome
+    dash = _build_dashboard_record(payload.call_id, payload)
+    st.summary["dashboard"] = dash
 
-        st.summary = payload.summary or {}
+    # ends the call at most once, whichever worker a retried webhook lands on
+    if not store.end_call(st):
+        return {"ok": True, "call_id": payload.call_id, "idempotent": True}
+    METRICS.add("calls_started")
+    METRICS.add("calls_ended")
 
-        dash = _build_dashboard_record(payload.call_id, payload)
-        st.summary["dashboard"] = dash
-
-        summary_text = None
-        if isinstance(payload.summary, dict):
-            if "summary" in payload.summary:
-                summary_field = payload.summary["summary"]
-                if isinstance(summary_field, dict) and "summary" in summary_field:
-                    summary_text = summary_field["summary"]
-                elif isinstance(summary_field, str):
-                    summary_text = summary_field
-        elif isinstance(payload.summary, str):
-            summary_text = payload.summary
-
-        upsert_call_record(record=dash, summary_text=summary_text,)
-
-        METRICS.calls_ended += 1
+    submit_call_record(record=dash, summary_text=summary_text(payload.summary),)
 
     return {"ok": True, "call_id": payload.call_id}
\ No newline at end of file
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -35,6 +35,81 @@ class MetricsOverview(BaseModel):
     average_rounds_completed: float
 
 
+class CallWriterStatus(BaseModel):
+    queue_depth: int
+    flush_lag_ms: float
+    spool_segments: int
+    submitted: int
+    flushed: int
+    batches: int
+    flush_errors: int
+    replayed: int
+    last_flush_ms: float
+    last_flush_lag_ms: float
+
+
+class StateRetentionStatus(BaseModel):
+    backend: str
+    negotiations: int
+    calls: int
+    tombstones: int
+    bytes: int
+    max_bytes: int
+    sweeps: int
+    expired: int
+    evicted: int
+    archived: int
+    tombstones_expired: int
+    sweep_errors: int
+    last_sweep_ms: float
+
+
+class ProfilerSettings(BaseModel):
+    enabled: bool
+    slow_ms: float = Field(default=500.0, gt=0)
+    interval_ms: float = Field(default=5.0, ge=1)
+
+
+class SlowRequestProfile(BaseModel):
+    id: int
+    method: str
+    route: str
+    status: int
+    duration_ms: float
+    started_at: float
+    samples: int
+
+
+class ProfilerStatus(BaseModel):
+    enabled: bool
+    slow_ms: float
+    interval_ms: float
+    samples_taken: int
+    sample_cost_ms: float
+    profiles: List[SlowRequestProfile] = []
+
+
+class AdmissionKeyStatus(BaseModel):
+    key: str  # fingerprint, as used in API_KEY_LIMITS
+    rate_per_second: float
+    burst: float
+    max_concurrency: int
+    in_flight: int
+    admitted: int
+    throttled: int
+    shed: int
+
+
+class AdmissionStatus(BaseModel):
+    queue_latency_ms: float
+    shed_queue_ms: float
+    shedding: bool
+    admitted: int
+    throttled: int
+    shed: int
+    keys: List[AdmissionKeyStatus] = []
+
+
 class NegotiationResponse(BaseModel):
     call_id: str
     status: str
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Literal
+from typing import Any, Dict, Optional, Literal
 
 
 class CarrierVerifyRequest(BaseModel):
@@ -13,3 +13,34 @@ class CarrierVerifyResponse(BaseModel):
     allowed_to_operate: Optional[Literal["Y", "N"]] = None
     phy_city: Optional[str] = None
     phy_state: Optional[str] = None
+    # where the answer came from; "stale" and "unknown" mean FMCSA could not be asked in time
+    verification: Literal["live", "cached", "stale", "unknown"] = "live"
+
+
+class FmcsaCacheStatus(BaseModel):
+    entries: int
+    max_entries: int
+    in_flight: int
+    hits: int
+    negative_hits: int
+    misses: int
+    coalesced: int
+    expired: int
+    evictions: int
+    upstream_requests: int
+    upstream_errors: int
+    deadline_exceeded: int
+    stale_served: int
+    unknown_served: int
+    loaded_from_disk: int
+
+
+class FmcsaUpstreamStatus(BaseModel):
+    http2: bool
+    circuit_state: Literal["closed", "open", "half_open"]
+    consecutive_failures: int
+    circuit_opened: int
+    short_circuited: int
+    timeouts: int
+    rate_limited: int
+    latency: Dict[str, Any]
@@ -39,13 +39,19 @@ class NegotiationPolicy(BaseModel):
     min: float
     max: float
     max_rounds: int = 3
+    # share of the gap between the carrier's offer and target conceded in round k:
+    # min(1, concession_start + concession_step * (k - 1))
+    concession_start: float = 0.25
+    concession_step: float = 0.25
 
 
 class NegotiationState(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
     call_id: Optional[str] = None
-    load: Load
+    # reference into the load board rather than a copy of the Load
+    load_id: str
+    loadboard_rate: float
     mc_number: Optional[str] = None
 
     status: str  # "in_progress" | "accepted" | "declined"
@@ -67,6 +73,9 @@ class MetricsState(BaseModel):
     negotiations_declined: int = 0
     completed_rounds_total: int = 0
     completed_count: int = 0
+    requests_admitted: int = 0
+    requests_throttled: int = 0
+    requests_shed: int = 0
 
     def avg_rounds(self) -> float:
         if self.completed_count == 0:
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from datetime import datetime
+
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, Literal, Optional, List
 
 from app.schemas.domain import Load
 
@@ -17,6 +19,63 @@ class LoadSearchRequest(BaseModel):
     equipment_type: Optional[str] = None
     limit: int = 3
 
+    # radius mode: match lanes within N miles of origin/destination (gazetteer cities only)
+    origin_radius_miles: Optional[float] = Field(default=None, ge=0, le=500)
+    destination_radius_miles: Optional[float] = Field(default=None, ge=0, le=500)
+
+    # inclusive time windows; times without an offset are taken as UTC
+    pickup_after: Optional[datetime] = None
+    pickup_before: Optional[datetime] = None
+    delivery_after: Optional[datetime] = None
+    delivery_before: Optional[datetime] = None
+
 
 class LoadSearchResponse(BaseModel):
     matches: List[Load]
+    deadhead_miles: Optional[List[float]] = None
+    # 1.0 when every term was on the board once canonicalized ("ATL", "dry-van"); lower
+    # when one was taken for the most similar board place or equipment type
+    match_score: float = 1.0
+    # term -> board key searched for, for terms not already in that form
+    resolved: Optional[Dict[str, str]] = None
+
+
+
+class LoadDelta(BaseModel):
+    # add/update/upsert all replace by load_id, so replaying a delta file is idempotent
+    op: Literal["add", "update", "upsert", "remove"]
+    load: Optional[Load] = None
+    load_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _check(self) -> "LoadDelta":
+        if self.op == "remove":
+            if not self.load_id and self.load is not None:
+                self.load_id = self.load.load_id
+            if not self.load_id:
+                raise ValueError("remove requires load_id")
+        elif self.load is None:
+            raise ValueError(f"{self.op} requires load")
+        else:
+            self.load_id = self.load.load_id
+        return self
+
+
+class LoadDeltaBatch(BaseModel):
+    deltas: List[LoadDelta]
+
+
+class LoadIngestResult(BaseModel):
+    received: int
+    upserted: int
+    removed: int
+    board_size: int
+    board_version: int
+    apply_ms: float
+    swap_us: float
+
+
+class LoadBoardStatus(BaseModel):
+    board_size: int
+    board_version: int
+    last_ingest: Optional[LoadIngestResult] = None
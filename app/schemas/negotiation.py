@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
 
 from app.schemas.api import NegotiationResponse
 
@@ -13,3 +13,44 @@ class NegotiationStepRequest(BaseModel):
 
 class NegotiationStepResponse(NegotiationResponse):
     transfer_to_rep: bool = False
+
+
+class PolicyParams(BaseModel):
+    """Knobs of the negotiation policy; the defaults are the live policy."""
+
+    band_low: float = Field(default=0.10, ge=0, lt=1)  # accept offers down to target * (1 - band_low)
+    band_high: float = Field(default=0.10, ge=0)  # and up to target * (1 + band_high)
+    concession_start: float = Field(default=0.25, ge=0, le=1)
+    concession_step: float = Field(default=0.25, ge=0, le=1)
+    max_rounds: int = Field(default=3, ge=1, le=20)
+
+
+class BacktestRequest(BaseModel):
+    """Policy grid: every combination of the listed values is evaluated."""
+
+    band_low: List[float] = [0.10]
+    band_high: List[float] = [0.10]
+    concession_start: List[float] = [0.25]
+    concession_step: List[float] = [0.25]
+    max_rounds: List[int] = [3]
+    since: Optional[int] = None
+    until: Optional[int] = None
+    sort_by: Literal["margin_total", "margin_pct", "acceptance_rate", "avg_rounds"] = "margin_total"
+    limit: int = Field(default=50, ge=1, le=10000)
+
+
+class BacktestResult(BaseModel):
+    params: PolicyParams
+    accepted: int
+    acceptance_rate: float
+    margin_total: float  # loadboard minus agreed rate, summed over accepted calls
+    margin_pct: float  # margin_total over the loadboard rates of accepted calls
+    avg_rounds: float
+
+
+class BacktestResponse(BaseModel):
+    calls: int
+    policies: int
+    elapsed_ms: float
+    baseline: Optional[BacktestResult] = None  # the live policy on the same calls
+    results: List[BacktestResult]
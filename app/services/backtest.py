@@ -0,0 +1,268 @@
+"""
+What-if evaluation of negotiation policies against call history.
+
+Carrier model: each call is reduced to the loadboard rate L, the carrier's ask
+(`carrier_last_offer`) and its reservation price, the lowest rate it takes: the
+agreed `final_offer` for calls that closed, else the ask itself. The carrier
+repeats its ask every round and takes the first counter at or above its
+reservation, which it then offers back, closing the deal one round later.
+`replay` plays this out call by call through the live `decide`; `evaluate`
+computes the same outcomes for a whole grid of policies at once.
+
+Prices are handled as fractions of L (x = ask / L, y = reservation / L), so a
+policy only ever compares x, y and the counters 1 + c * (x - 1) against its band
+[1 - band_low, 1 + band_high]. That makes every aggregate a sum over calls on one
+side of a band edge, which `evaluate` answers from prefix sums over the calls
+sorted once by x, and from bincounts bucketed by the grid's band edges: a few
+passes over the calls per concession schedule instead of one per policy.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, case, select
+
+import app.db as db
+from app.models import CallRecord
+from app.schemas.negotiation import BacktestRequest, BacktestResponse, BacktestResult, PolicyParams
+from app.services.negotiation import DEFAULT_POLICY, decide, make_policy
+
+# largest grid the API evaluates in one request
+MAX_POLICIES = 10000
+
+
+class History:
+    """Calls as parallel float64 arrays: loadboard rate, ask and reservation as fractions of it."""
+
+    def __init__(self, loadboard_rate: np.ndarray, ask: np.ndarray, reservation: np.ndarray) -> None:
+        keep = (loadboard_rate > 0) & np.isfinite(ask) & np.isfinite(reservation)
+        self.L = loadboard_rate[keep].astype(np.float64)
+        self.x = ask[keep] / self.L
+        # a carrier never needs more than it asked for
+        self.y = np.minimum(reservation[keep] / self.L, self.x)
+
+    def __len__(self) -> int:
+        return len(self.L)
+
+
+def load_history(since: Optional[int] = None, until: Optional[int] = None) -> History:
+    db.require_db()
+    c = CallRecord
+    reservation = case((and_(c.agreed.is_(True), c.final_offer.is_not(None)), c.final_offer), else_=c.carrier_last_offer)
+    stmt = select(c.loadboard_rate, c.carrier_last_offer, reservation).where(
+        c.loadboard_rate > 0, c.carrier_last_offer.is_not(None)
+    )
+    if since is not None:
+        stmt = stmt.where(c.ended_at >= since)
+    if until is not None:
+        stmt = stmt.where(c.ended_at < until)
+    with db.SessionLocal() as session:
+        rows = np.array(session.execute(stmt).all(), dtype=np.float64).reshape(-1, 3)
+    return History(rows[:, 0], rows[:, 1], rows[:, 2])
+
+
+def replay(params: PolicyParams, loadboard_rate: float, ask: float, reservation: float) -> Tuple[bool, Optional[float], int]:
+    """One call under `params`, through the live decide(): (accepted, agreed rate, rounds)."""
+    policy = make_policy(loadboard_rate, params)
+    offer = ask
+    for round_num in range(1, params.max_rounds + 2):
+        decision, counter = decide(policy, offer, round_num)
+        if decision == "accept":
+            return True, offer, round_num
+        if decision == "decline":
+            return False, None, round_num
+        if counter >= reservation:
+            offer = counter
+    return False, None, params.max_rounds + 1
+
+
+def _cum(values: np.ndarray) -> np.ndarray:
+    """Prefix sums with a leading 0, so sum(values[i:j]) == out[j] - out[i]."""
+    out = np.empty(len(values) + 1)
+    out[0] = 0.0
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _rounds_to_concede(s: np.ndarray, start: float, step: float) -> np.ndarray:
+    """First round k whose concession min(1, start + step * (k - 1)) reaches s (inf if none)."""
+    if step > 0:
+        k = 1 + np.ceil((s - start) / step - 1e-9)
+    else:
+        k = np.where(s <= start, 1.0, np.inf)
+    return np.maximum(k, 1.0)
+
+
+def evaluate(history: History, grid: Sequence[PolicyParams]) -> List[BacktestResult]:
+    """Projected outcome of every policy in `grid` over `history`, in grid order."""
+    n = len(history)
+    order = np.argsort(history.x, kind="stable")
+    x, y, L = history.x[order], history.y[order], history.L[order]
+    cum_L, cum_Lx = _cum(L), _cum(L * x)
+
+    lo = np.array([p.band_low for p in grid])
+    hi = np.array([p.band_high for p in grid])
+    floor, ceiling = 1 - lo, 1 + hi
+
+    # inside the band: accepted as asked, in round 1
+    i = np.searchsorted(x, floor, side="left")
+    j = np.searchsorted(x, ceiling, side="right")
+    accepted = (j - i).astype(np.float64)
+    booked_L = cum_L[j] - cum_L[i]
+    paid = cum_Lx[j] - cum_Lx[i]
+    rounds = accepted.copy()
+
+    # below the band: the round-1 counter max(1 + c1 * (x - 1), floor) is above the ask, so always taken
+    start = np.array([p.concession_start for p in grid])
+    with np.errstate(divide="ignore"):
+        pivot = np.where(start > 0, 1 - lo / np.where(start > 0, start, 1), -np.inf)  # below it the floor binds
+    m = np.minimum(np.searchsorted(x, pivot, side="left"), i)
+    accepted += i
+    booked_L += cum_L[i]
+    paid += floor * cum_L[m] + (cum_L[i] - cum_L[m]) + start * ((cum_Lx[i] - cum_Lx[m]) - (cum_L[i] - cum_L[m]))
+    rounds += 2 * i
+
+    # above the band: counters 1 + c_k * (x - 1) capped at the ceiling. The first round k
+    # with c_k >= s = (y - 1) / (x - 1) wins the carrier at min(u, ceiling), u = 1 + c_k * (x - 1),
+    # provided y <= ceiling and k <= max_rounds. With y <= u <= x, each aggregate is a sum
+    # over {y <= ceiling} minus one over {x <= ceiling} (or over {u <= ceiling}, for the
+    # cap). Only the grid's own ceilings are ever asked about, so calls are bucketed by
+    # ceiling and by k, and summed with one bincount per quantity and schedule.
+    above = np.searchsorted(x, 1.0, side="right")
+    ax, ay, aL = x[above:], y[above:], L[above:]
+    s = (ay - 1) / (ax - 1)
+    edges = np.unique(ceiling)
+    n_edges = len(edges) + 1
+    col = np.searchsorted(edges, ceiling)  # v <= edges[t] <=> bucket(v) <= t
+    bucket_x = np.searchsorted(edges, ax, side="left")
+    bucket_y = np.searchsorted(edges, ay, side="left")
+
+    schedules: Dict[Tuple[float, float], List[int]] = {}
+    for idx, p in enumerate(grid):
+        schedules.setdefault((p.concession_start, p.concession_step), []).append(idx)
+
+    for (c_start, c_step), members in schedules.items():
+        members = np.array(members)
+        rounds_cap = max(grid[idx].max_rounds for idx in members)
+        k = _rounds_to_concede(s, c_start, c_step)
+        keep = k <= rounds_cap
+        k = k[keep].astype(np.int64)
+        kL = aL[keep]
+        u = 1 + np.minimum(1.0, c_start + c_step * (k - 1)) * (ax[keep] - 1)
+        kLu = kL * u
+        row = (k - 1) * n_edges
+        at_x, at_y = row + bucket_x[keep], row + bucket_y[keep]
+        at_u = row + np.searchsorted(edges, u, side="left")
+
+        def table(at: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+            # [r, t]: sum over calls won by round r + 1 or earlier whose value is <= edges[t]
+            sums = np.bincount(at, weights, minlength=rounds_cap * n_edges).reshape(rounds_cap, n_edges)
+            return sums.cumsum(axis=0).cumsum(axis=1)
+
+        r, t = np.array([grid[idx].max_rounds for idx in members]) - 1, col[members]
+        h = ceiling[members]
+        x_n, x_L, x_Lu, x_k = (table(at_x, w)[r, t] for w in (None, kL, kLu, (k + 1).astype(np.float64)))
+        y_n, y_L, y_k = (table(at_y, w)[r, t] for w in (None, kL, (k + 1).astype(np.float64)))
+        u_L, u_Lu = (table(at_u, w)[r, t] for w in (kL, kLu))
+
+        accepted[members] += y_n - x_n
+        booked_L[members] += y_L - x_L
+        paid[members] += (u_Lu - x_Lu) + h * (y_L - u_L)
+        rounds[members] += (y_k - x_k) + (n - accepted[members]) * (r + 2)
+
+    results = []
+    for idx, p in enumerate(grid):
+        margin = booked_L[idx] - paid[idx]
+        results.append(
+            BacktestResult(
+                params=p,
+                accepted=int(round(accepted[idx])),
+                acceptance_rate=round(float(accepted[idx] / n), 6) if n else 0.0,
+                margin_total=round(float(margin), 2),
+                margin_pct=round(float(margin / booked_L[idx]), 6) if booked_L[idx] else 0.0,
+                avg_rounds=round(float(rounds[idx] / n), 4) if n else 0.0,
+            )
+        )
+    return results
+
+
+def policy_grid(req: BacktestRequest) -> List[PolicyParams]:
+    return [
+        PolicyParams(band_low=lo, band_high=hi, concession_start=cs, concession_step=step, max_rounds=k)
+        for lo, hi, cs, step, k in itertools.product(
+            req.band_low, req.band_high, req.concession_start, req.concession_step, req.max_rounds
+        )
+    ]
+
+
+def run(req: BacktestRequest, history: Optional[History] = None) -> BacktestResponse:
+    history = history if history is not None else load_history(req.since, req.until)
+    grid = policy_grid(req)
+    t0 = time.perf_counter()
+    results = evaluate(history, grid + [DEFAULT_POLICY])
+    elapsed = time.perf_counter() - t0
+
+    baseline = results.pop()
+    reverse = req.sort_by != "avg_rounds"
+    results.sort(key=lambda r: getattr(r, req.sort_by), reverse=reverse)
+    return BacktestResponse(
+        calls=len(history),
+        policies=len(grid),
+        elapsed_ms=round(elapsed * 1e3, 3),
+        baseline=baseline,
+        results=results[: req.limit],
+    )
+
+
+def _floats(text: str) -> List[float]:
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.backtest")
+    parser.add_argument("--band-low", default="0.10", help="comma-separated values")
+    parser.add_argument("--band-high", default="0.10")
+    parser.add_argument("--concession-start", default="0.25")
+    parser.add_argument("--concession-step", default="0.25")
+    parser.add_argument("--max-rounds", default="3")
+    parser.add_argument("--since", type=int)
+    parser.add_argument("--until", type=int)
+    parser.add_argument("--sort-by", default="margin_total")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    req = BacktestRequest(
+        band_low=_floats(args.band_low),
+        band_high=_floats(args.band_high),
+        concession_start=_floats(args.concession_start),
+        concession_step=_floats(args.concession_step),
+        max_rounds=[int(v) for v in _floats(args.max_rounds)],
+        since=args.since,
+        until=args.until,
+        sort_by=args.sort_by,
+        limit=args.limit,
+    )
+    db.init_db()
+    out = run(req)
+    if args.json:
+        print(out.model_dump_json(indent=2))
+        return
+
+    print(f"[backtest] {out.calls} calls x {out.policies} policies in {out.elapsed_ms:.0f} ms")
+    print(f"{'low':>5} {'high':>5} {'start':>5} {'step':>5} {'rnds':>4} {'accept':>7} {'margin %':>8} {'margin $':>12} {'avg rnds':>8}")
+    for r in ([out.baseline] if out.baseline else []) + out.results:
+        p = r.params
+        print(
+            f"{p.band_low:>5.2f} {p.band_high:>5.2f} {p.concession_start:>5.2f} {p.concession_step:>5.2f} {p.max_rounds:>4} "
+            f"{r.acceptance_rate:>7.1%} {r.margin_pct:>8.2%} {r.margin_total:>12,.0f} {r.avg_rounds:>8.2f}"
+            + ("  (live)" if r is out.baseline else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
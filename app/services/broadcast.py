@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from typing import Dict, List, Optional, Set
+
+RESYNC = b"event: resync\ndata: {}\n\n"
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=maxsize)
+        self.resyncs = 0
+
+
+class Broadcaster:
+    """
+    In-process fan-out of server-sent events to async subscribers.
+
+    publish() may be called from any thread. Each event is encoded once and handed to
+    every subscriber's event loop. Each subscriber has a bounded queue. A subscriber
+    that falls a full queue behind has its backlog replaced by a single `resync`
+    event, so a slow client costs a bounded amount of memory and reloads the
+    snapshot instead of replaying stale deltas.
+    """
+
+    def __init__(self, queue_size: int = 256) -> None:
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.resyncs = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscriber:
+        """Register a subscriber on the running event loop."""
+        sub = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, event: str, data: dict) -> None:
+        if self._subscribers:
+            self.publish_raw(sse_event(event, data))
+
+    def publish_raw(self, payload: bytes) -> None:
+        """Send an already encoded event (sse_event, RESYNC)."""
+        with self._lock:
+            subs = list(self._subscribers)
+        if not subs:
+            return
+
+        self.published += 1
+
+        by_loop: Dict[asyncio.AbstractEventLoop, List[Subscriber]] = {}
+        for sub in subs:
+            by_loop.setdefault(sub.loop, []).append(sub)
+
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._deliver, group, payload)
+            except RuntimeError:
+                # loop already closed: those subscribers are gone
+                for sub in group:
+                    self.unsubscribe(sub)
+
+    def _deliver(self, subs: List[Subscriber], payload: bytes) -> None:
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._resync(sub)
+
+    def _resync(self, sub: Subscriber) -> None:
+        while True:
+            try:
+                sub.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+        sub.queue.put_nowait(RESYNC)
+        sub.resyncs += 1
+        self.resyncs += 1
+
+
+async def next_event(sub: Subscriber, keepalive_seconds: float) -> Optional[bytes]:
+    """The subscriber's next event, or None once keepalive_seconds pass without one."""
+    try:
+        return await asyncio.wait_for(sub.queue.get(), timeout=keepalive_seconds)
+    except asyncio.TimeoutError:
+        return None
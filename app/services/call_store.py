@@ -1,13 +1,42 @@
-from sqlalchemy.dialects.postgresql import insert
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
 
 import app.db as db
+from app.core.observability import span
 from app.models import CallRecord
+from app.schemas.api import CallWriterStatus
+from app.services import dashboard, rollups
 
+logger = logging.getLogger(__name__)
 
-def upsert_call_record(record: dict, summary_text: str | None,):
-    db.require_db()
+_UPDATE_KEYS = (
+    "ended_at",
+    "outcome",
+    "sentiment",
+    "verified",
+    "load_id",
+    "loadboard_rate",
+    "rounds",
+    "carrier_last_offer",
+    "final_offer",
+    "agreed",
+    "transfer_to_rep",
+)
 
-    values = {
+
+def _row(record: dict, summary_text: str | None) -> dict:
+    return {
         "call_id": record.get("call_id"),
         "ended_at": int(record.get("ended_at")) if record.get("ended_at") is not None else None,
         "outcome": record.get("outcome"),
@@ -23,15 +52,344 @@ def upsert_call_record(record: dict, summary_text: str | None,):
         "summary": summary_text,
     }
 
-    update_values = dict(values)
-    if summary_text is None:
-        update_values.pop("summary", None)
 
-    stmt = insert(CallRecord).values(**values).on_conflict_do_update(
-        index_elements=[CallRecord.call_id],
-        set_=values,
-    )
+def summary_text(summary) -> str | None:
+    """The summary text out of a webhook summary payload (a dict or a plain string)."""
+    if isinstance(summary, dict):
+        if "summary" in summary:
+            field = summary["summary"]
+            if isinstance(field, dict) and "summary" in field:
+                return field["summary"]
+            if isinstance(field, str):
+                return field
+        return None
+    if isinstance(summary, str):
+        return summary
+    return None
+
+
+def _coalesce(rows: Dict[str, dict], row: dict) -> None:
+    """Keep the newest row per call_id; a later write without a summary keeps the earlier one."""
+    previous = rows.get(row["call_id"])
+    if previous is not None and row["summary"] is None:
+        row = dict(row, summary=previous["summary"])
+    rows[row["call_id"]] = row
+
+
+def write_rows(rows: List[dict]) -> None:
+    """
+    Upsert call rows (unique call_ids) and their rollup contributions in one transaction.
+
+    New rows are inserted first. A concurrent first write of the same call_id
+    blocks until the other transaction commits. It then takes the locked read of
+    existing rows, so each call is counted in the rollups exactly once. (SQLite
+    has no row locks; there its single writer connection serializes writes.)
+    """
+    db.require_db()
+    if not rows:
+        return
+
+    c = CallRecord
+    t = CallRecord.__table__
+    with span("db_upsert_seconds"), db.WriteSessionLocal() as session:
+        # Core statements with a parameter list: compiled once and sent as batched
+        # VALUES, bypassing the ORM's per-row bulk insert bookkeeping
+        conn = session.connection()
+
+        stmt = db.insert_for(t).on_conflict_do_nothing(index_elements=[t.c.call_id]).returning(t.c.call_id)
+        inserted = set(conn.execute(stmt, rows).scalars())
+
+        existing = [row for row in rows if row["call_id"] not in inserted]
+        previous: Dict[str, dict] = {}
+        if existing:
+            stmt = select(c.call_id, *rollups.SOURCE_COLUMNS).where(c.call_id.in_([row["call_id"] for row in existing]))
+            previous = {p["call_id"]: dict(p) for p in conn.execute(stmt.with_for_update()).mappings()}
+
+            stmt = db.insert_for(t)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[t.c.call_id],
+                set_={
+                    **{k: getattr(stmt.excluded, k) for k in _UPDATE_KEYS},
+                    "summary": func.coalesce(stmt.excluded.summary, t.c.summary),
+                },
+            )
+            conn.execute(stmt, existing)
+
+        nets = [(row, rollups.net_change([(previous.get(row["call_id"]), row)])) for row in rows]
+        rollups.apply_net(session, rollups.combine(net for _, net in nets))
+        rollups.bump_version(session, dashboard.written_event(nets))
+        session.commit()
+
+
+def upsert_call_record(record: dict, summary_text: str | None,):
+    write_rows([_row(record, summary_text)])
+
+
+class CallWriter:
+    """
+    Write-behind persistence for ended calls.
+
+    submit() appends the row to a local spool file and queues it in memory, coalesced
+    by call_id; once it returns, the call survives a crash. A background thread
+    flushes the queue as multi-row upserts when it reaches batch_size rows or its
+    oldest row is flush_interval old. Each flushed batch owns the spool segment it
+    was written to, and the segment is deleted only after the batch commits.
+
+    Workers can share one spool directory: segment names carry the writer's pid
+    and a boot token, and a writer holds an flock on each of its segments until it
+    deletes it. start() queues again only the segments it can lock, i.e. those
+    left by writers that are gone.
+    """
+
+    def __init__(self, spool_dir: str, batch_size: int = 500, flush_interval: float = 0.2, fsync: bool = True):
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._pending: Dict[str, dict] = {}
+        self._oldest: Optional[float] = None
+        self._owner = f"{os.getpid()}-{secrets.token_hex(3)}"
+        self._segment_no = 0
+        self._spool = None
+        self._unflushed_segments: List[Path] = []
+        # fds holding the flock on each segment this writer owns, until it is deleted
+        self._locks: Dict[Path, int] = {}
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.submitted = 0
+        self.flushed = 0
+        self.batches = 0
+        self.flush_errors = 0
+        self.replayed = 0
+        self.last_flush_ms = 0.0
+        self.last_flush_lag_ms = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self._replay()
+        with self._lock:
+            self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="call-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopping = True
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        with self._lock:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+                path = self._segment_path(self._segment_no)
+                if not self._pending and not self._unflushed_segments and path.stat().st_size == 0:
+                    path.unlink()
+            # segments still unflushed stay behind, unlocked, for the next writer to replay
+            for fd in self._locks.values():
+                os.close(fd)
+            self._locks.clear()
+
+    def submit(self, record: dict, summary_text: str | None) -> None:
+        row = _row(record, summary_text)
+        line = json.dumps(row, separators=(",", ":")).encode() + b"\n"
+
+        with self._lock:
+            self._spool.write(line)
+            self._spool.flush()
+            if self.fsync:
+                os.fsync(self._spool.fileno())
+
+            _coalesce(self._pending, row)
+            self.submitted += 1
+            if self._oldest is None:
+                # start the flush-interval clock
+                self._oldest = time.monotonic()
+                self._wake.notify()
+            elif len(self._pending) >= self.batch_size:
+                self._wake.notify()
+
+    def status(self) -> CallWriterStatus:
+        with self._lock:
+            lag = time.monotonic() - self._oldest if self._oldest is not None else 0.0
+            return CallWriterStatus(
+                queue_depth=len(self._pending),
+                flush_lag_ms=round(lag * 1e3, 3),
+                spool_segments=len(self._unflushed_segments) + 1,
+                submitted=self.submitted,
+                flushed=self.flushed,
+                batches=self.batches,
+                flush_errors=self.flush_errors,
+                replayed=self.replayed,
+                last_flush_ms=self.last_flush_ms,
+                last_flush_lag_ms=self.last_flush_lag_ms,
+            )
+
+    def _segment_path(self, n: int) -> Path:
+        return self.spool_dir / f"calls-{self._owner}-{n:012d}.ndjson"
+
+    def _open_segment(self) -> Path:
+        while True:
+            self._segment_no += 1
+            path = self._segment_path(self._segment_no)
+            spool = open(path, "ab")
+            fd = _lock(path)
+            if fd is not None:
+                break
+            # another writer's replay took it between our open and lock; it is empty, leave it to them
+            spool.close()
+        self._spool = spool
+        self._locks[path] = fd
+        return path
+
+    def _replay(self) -> None:
+        aged = []
+        for path in self.spool_dir.glob("calls-*.ndjson"):
+            try:
+                aged.append((path.stat().st_mtime, path.name, path))
+            except FileNotFoundError:
+                pass
+
+        segments = []
+        for _, _, path in sorted(aged):
+            fd = _lock(path)
+            if fd is None:
+                continue  # a live writer's segment
+            if os.fstat(fd).st_nlink == 0:
+                os.close(fd)  # flushed and deleted by its writer while we looked
+                continue
+            self._locks[path] = fd
+            segments.append(path)
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        # torn final line from a crash mid-append; it was never acknowledged
+                        continue
+                    _coalesce(self._pending, row)
+                    self.replayed += 1
+        self._unflushed_segments = segments
+        if self._pending:
+            self._oldest = time.monotonic()
+            logger.info("replaying %d calls from %d spool segments", len(self._pending), len(segments))
+
+    def _take_batch(self) -> Tuple[Dict[str, dict], float, List[Path]]:
+        """Swap out the queue and the segments backing it (caller holds the lock)."""
+        batch, oldest = self._pending, self._oldest
+        self._pending, self._oldest = {}, None
+
+        self._spool.close()
+        segments = self._unflushed_segments + [self._segment_path(self._segment_no)]
+        self._unflushed_segments = []
+        self._open_segment()
+        return batch, oldest, segments
+
+    def _run(self) -> None:
+        failures = 0
+        while True:
+            with self._lock:
+                while not self._stopping:
+                    if self._pending:
+                        wait = self.flush_interval - (time.monotonic() - self._oldest)
+                        if len(self._pending) >= self.batch_size or wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._wake.wait(wait)
+                if self._stopping and not self._pending:
+                    return
+                batch, oldest, segments = self._take_batch()
+
+            if self._flush(batch, oldest, segments):
+                failures = 0
+            else:
+                failures += 1
+                if self._stopping:
+                    return
+                time.sleep(min(5.0, 0.1 * 2 ** failures))
+
+    def _flush(self, batch: Dict[str, dict], oldest: float, segments: List[Path]) -> bool:
+        rows = list(batch.values())
+        t0 = time.monotonic()
+        done = 0
+        try:
+            for i in range(0, len(rows), self.batch_size):
+                chunk = rows[i:i + self.batch_size]
+                write_rows(chunk)
+                done += len(chunk)
+        except Exception as e:
+            logger.warning("flush of %d calls failed, will retry: %s", len(rows) - done, e)
+            with self._lock:
+                self.flush_errors += 1
+                # requeue under anything submitted since, which is newer
+                requeued: Dict[str, dict] = {}
+                for row in rows[done:]:
+                    _coalesce(requeued, row)
+                for row in self._pending.values():
+                    _coalesce(requeued, row)
+                self._pending = requeued
+                self._oldest = oldest
+                self._unflushed_segments = segments + self._unflushed_segments
+            return False
+
+        t1 = time.monotonic()
+        for path in segments:
+            path.unlink(missing_ok=True)
+
+        with self._lock:
+            for path in segments:
+                fd = self._locks.pop(path, None)
+                if fd is not None:
+                    os.close(fd)
+            self.flushed += len(rows)
+            self.batches += 1
+            self.last_flush_ms = round((t1 - t0) * 1e3, 3)
+            self.last_flush_lag_ms = round((t1 - oldest) * 1e3, 3)
+        return True
+
+
+def _lock(path: Path) -> Optional[int]:
+    """An fd holding an exclusive flock on `path`, or None if another writer holds it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+WRITER: Optional[CallWriter] = None
+
+
+def start_writer(spool_dir: str, batch_size: int, flush_interval: float, fsync: bool) -> None:
+    global WRITER
+    if WRITER is None:
+        WRITER = CallWriter(spool_dir, batch_size=batch_size, flush_interval=flush_interval, fsync=fsync)
+        WRITER.start()
+
+
+def stop_writer() -> None:
+    global WRITER
+    if WRITER is not None:
+        WRITER.stop()
+        WRITER = None
+
 
-    with db.SessionLocal() as session:
-        session.execute(stmt)
-        session.commit()
\ No newline at end of file
+def submit_call_record(record: dict, summary_text: str | None) -> None:
+    """Queue through the write-behind writer when running, else write synchronously."""
+    if WRITER is not None:
+        WRITER.submit(record, summary_text)
+    else:
+        upsert_call_record(record, summary_text)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.services.fmcsa import MC_NUMBER_ERROR, FmcsaError, new_deadline, valid_mc_number
+from app.services.fmcsa_cache import CACHE
+
+logger = logging.getLogger(__name__)
+
+# (index in the input, mc_number, error); exactly one of mc_number / error is set
+BatchItem = Tuple[int, Optional[str], Optional[str]]
+
+# an NDJSON line is one MC number; anything longer is not worth buffering
+MAX_LINE_BYTES = 1024
+
+
+def _mc_from(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = value.get("mc_number")
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def _item(index: int, value: Any, missing: str) -> BatchItem:
+    # refused here, as an error line, rather than sent to FMCSA to fail
+    mc = _mc_from(value)
+    if mc is None:
+        return index, None, missing
+    if not valid_mc_number(mc):
+        return index, None, MC_NUMBER_ERROR
+    return index, mc, None
+
+
+async def iter_list(mc_numbers: Iterable[Any]) -> AsyncIterator[BatchItem]:
+    for index, value in enumerate(mc_numbers):
+        yield _item(index, value, "empty mc_number")
+
+
+async def _lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    pending = b""
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                yield line
+            if len(pending) > MAX_LINE_BYTES:
+                # flush it early: the caller refuses it rather than waiting for its end
+                yield pending
+                pending = b""
+    yield pending
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes], max_items: int) -> AsyncIterator[BatchItem]:
+    """
+    One MC number per line: a JSON string or number, or an object with "mc_number". Blank lines are skipped.
+
+    Lines are parsed as the upload arrives, so no more than a chunk and a partial line
+    are held. Past `max_items` lines, or on a line over MAX_LINE_BYTES, a final error
+    item is yielded and the rest of the upload is left unread.
+    """
+    index = 0
+    async with aclosing(_lines(chunks)) as lines:
+        async for line in lines:
+            if not line.strip():
+                continue
+            if index >= max_items:
+                yield index, None, f"batch is limited to {max_items} items, the rest was not read"
+                return
+            if len(line) > MAX_LINE_BYTES:
+                yield index, None, f"line longer than {MAX_LINE_BYTES} bytes, the rest was not read"
+                return
+            try:
+                value = json.loads(line)
+            except ValueError:
+                value = None
+            yield _item(index, value, "expected an mc_number")
+            index += 1
+
+
+def _line(obj: dict) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode() + b"\n"
+
+
+async def _verify_one(item: BatchItem) -> bytes:
+    index, mc, error = item
+    if error is not None:
+        return _line({"index": index, "error": error})
+    try:
+        # nobody is on the phone: allow the full upstream timeout rather than the voice budget
+        result = await CACHE.verify(mc, new_deadline(settings.fmcsa_timeout_seconds))
+    except FmcsaError as e:
+        return _line({"index": index, "mc_number": mc, "error": str(e)})
+    except Exception as e:
+        # one bad lookup must not take its worker, and with it the stream, down
+        logger.exception("batch lookup of %s failed", mc)
+        return _line({"index": index, "mc_number": mc, "error": "internal error"})
+    return _line({"index": index, **result})
+
+
+async def verify_stream(items: AsyncIterator[BatchItem], concurrency: int) -> AsyncIterator[bytes]:
+    """
+    Verify `items` with `concurrency` workers and yield one NDJSON line per item as it
+    completes, so lines arrive out of input order and carry its index.
+
+    Both queues are bounded, so at most a few dozen items are in memory whatever the
+    batch size; a slow reader holds the workers back instead of piling up results, and
+    full workers hold back `items`, so a streamed upload is read no faster than it is
+    verified.
+    """
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def feed() -> None:
+        try:
+            async for item in items:
+                await inbox.put(item)
+        except Exception as e:
+            # e.g. the upload broke off: finish what was read, the response notices the disconnect
+            logger.warning("batch input ended early: %r", e)
+        for _ in range(concurrency):
+            await inbox.put(None)
+
+    async def work() -> None:
+        while (item := await inbox.get()) is not None:
+            await outbox.put(await _verify_one(item))
+        await outbox.put(None)
+
+    tasks = [asyncio.ensure_future(feed())] + [asyncio.ensure_future(work()) for _ in range(concurrency)]
+    try:
+        running = concurrency
+        while running:
+            line = await outbox.get()
+            if line is None:
+                running -= 1
+            else:
+                yield line
+    finally:
+        # the client went away, or we are done: stop feeding and drop in-flight lookups
+        for task in tasks:
+            task.cancel()
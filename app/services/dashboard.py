@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, tuple_
+
+import app.db as db
+from app.core.config import settings
+from app.models import CallRecord, CallRollup, DataEvent
+from app.services import rollups
+from app.services.broadcast import RESYNC, Broadcaster, sse_event
+
+logger = logging.getLogger(__name__)
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# columns shown in the dashboard call list; `summary` is only loaded for a single call
+LIST_COLUMNS = (
+    CallRecord.call_id,
+    CallRecord.ended_at,
+    CallRecord.verified,
+    CallRecord.load_id,
+    CallRecord.loadboard_rate,
+    CallRecord.rounds,
+    CallRecord.carrier_last_offer,
+    CallRecord.final_offer,
+    CallRecord.agreed,
+    CallRecord.transfer_to_rep,
+    CallRecord.outcome,
+    CallRecord.sentiment,
+)
+LIST_KEYS = tuple(c.key for c in LIST_COLUMNS)
+
+# live dashboard events (see /v1/metrics/dashboard/stream), fed by FEED
+EVENTS = Broadcaster(queue_size=settings.dashboard_stream_queue_size)
+
+# data_events rows kept behind the newest; a viewer further behind gets a resync
+EVENTS_KEEP = 10000
+# data_events rows read per poll
+FEED_BATCH = 500
+
+
+def _all_time_rows(session) -> List[dict]:
+    """All-time rollup totals per (outcome, sentiment): a few dozen rows at most."""
+    r = CallRollup
+    stmt = (
+        select(r.outcome, r.sentiment, *(func.sum(getattr(r, f)).label(f) for f in rollups.FIELDS))
+        .where(r.day == rollups.ALL_DAYS)
+        .group_by(r.outcome, r.sentiment)
+    )
+    return [dict(row._mapping) for row in session.execute(stmt) if row.calls]
+
+
+def _totals(rows: List[dict]) -> dict:
+    return {f: sum(row[f] for row in rows) for f in rollups.FIELDS}
+
+
+def _overview(rows: List[dict]) -> dict:
+    t = _totals(rows)
+    total = t["calls"]
+
+    if not total:
+        return {
+            "total_calls": 0,
+            "verified_rate": 0.0,
+            "acceptance_rate": 0.0,
+            "transfer_rate": 0.0,
+            "avg_rounds": 0.0,
+            "avg_final_vs_loadboard": 0.0,
+        }
+
+    verified_rate = t["verified_true"] / t["verified_known"] if t["verified_known"] else 0.0
+    avg_rounds = t["rounds_sum"] / t["rounds_count"] if t["rounds_count"] else 0.0
+    avg_delta = t["delta_sum"] / t["delta_count"] if t["delta_count"] else 0.0
+
+    return {
+        "total_calls": int(total),
+        "verified_rate": round(verified_rate, 3),
+        "acceptance_rate": round(t["accepted"] / total, 3),
+        "transfer_rate": round(t["transferred"] / total, 3),
+        "avg_rounds": round(float(avg_rounds), 3),
+        "avg_final_vs_loadboard": round(float(avg_delta), 2),
+    }
+
+
+def _counts(rows: List[dict], key: str) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for row in sorted(rows, key=lambda row: row[key]):
+        counts[row[key]] = counts.get(row[key], 0) + int(row["calls"])
+    return counts
+
+
+def _read_rollups() -> List[dict]:
+    db.require_db()
+    with db.SessionLocal() as session:
+        return _all_time_rows(session)
+
+
+def overview() -> dict:
+    return _overview(_read_rollups())
+
+
+def outcome_counts() -> Dict[str, int]:
+    return _counts(_read_rollups(), "outcome")
+
+
+def sentiment_counts() -> Dict[str, int]:
+    return _counts(_read_rollups(), "sentiment")
+
+
+def daily(days: int) -> List[dict]:
+    """Per-day call and acceptance counts for the most recent `days` days with calls."""
+    db.require_db()
+
+    r = CallRollup
+    stmt = (
+        select(r.day, func.sum(r.calls), func.sum(r.accepted))
+        .where(r.day != rollups.ALL_DAYS)
+        .group_by(r.day)
+        .order_by(r.day.desc())
+        .limit(days)
+    )
+
+    with db.SessionLocal() as session:
+        rows = session.execute(stmt).all()
+
+    return [
+        {
+            "date": date.fromordinal(_EPOCH_ORDINAL + day).isoformat(),
+            "calls": int(calls),
+            "accepted": int(accepted),
+        }
+        for day, calls, accepted in reversed(rows)
+        if calls
+    ]
+
+
+CallCursor = Tuple[Optional[int], str]
+
+
+def encode_cursor(cursor: CallCursor) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> CallCursor:
+    """Inverse of encode_cursor; raises ValueError on anything it did not produce."""
+    try:
+        ended_at, call_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(call_id, str) or not (ended_at is None or isinstance(ended_at, int)):
+        raise ValueError("invalid cursor")
+    return ended_at, call_id
+
+
+def list_calls(
+    limit: int,
+    cursor: Optional[CallCursor] = None,
+    outcome: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    load_id: Optional[str] = None,
+    verified: Optional[bool] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+) -> Tuple[List[dict], Optional[CallCursor]]:
+    """
+    One page of calls, newest first, ordered by (ended_at, call_id) descending.
+
+    Pages are keyset-based: `cursor` is the (ended_at, call_id) of the last row of the
+    previous page, so each page is an index range scan however deep it is. Calls
+    without ended_at sort after all others. Returns the rows and the cursor for the
+    next page, or None on the last page.
+    """
+    db.require_db()
+
+    c = CallRecord
+    filters = []
+    if outcome is not None:
+        filters.append(c.outcome == outcome)
+    if sentiment is not None:
+        filters.append(c.sentiment == sentiment)
+    if load_id is not None:
+        filters.append(c.load_id == load_id)
+    if verified is not None:
+        filters.append(c.verified.is_(verified))
+    if since is not None:
+        filters.append(c.ended_at >= since)
+    if until is not None:
+        filters.append(c.ended_at < until)
+
+    with db.SessionLocal() as session:
+        return _list_calls(session, limit, cursor, filters, since is not None or until is not None)
+
+
+def _list_calls(
+    session,
+    limit: int,
+    cursor: Optional[CallCursor],
+    filters: list,
+    time_bounded: bool,
+) -> Tuple[List[dict], Optional[CallCursor]]:
+    c = CallRecord
+
+    rows: List[dict] = []
+    if cursor is None or cursor[0] is not None:
+        stmt = select(*LIST_COLUMNS).where(c.ended_at.is_not(None), *filters)
+        if cursor is not None:
+            stmt = stmt.where(tuple_(c.ended_at, c.call_id) < tuple_(*cursor))
+        stmt = stmt.order_by(c.ended_at.desc(), c.call_id.desc()).limit(limit + 1)
+        rows = [dict(row._mapping) for row in session.execute(stmt)]
+
+    # calls without ended_at come last; a time range excludes them anyway
+    if len(rows) <= limit and not time_bounded:
+        stmt = select(*LIST_COLUMNS).where(c.ended_at.is_(None), *filters)
+        if cursor is not None and cursor[0] is None:
+            stmt = stmt.where(c.call_id < cursor[1])
+        stmt = stmt.order_by(c.call_id.desc()).limit(limit + 1 - len(rows))
+        rows += [dict(row._mapping) for row in session.execute(stmt)]
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]["ended_at"], rows[-1]["call_id"])
+
+
+# Snapshots are cached against the data version in the database (rollups.bump_version),
+# which every worker's writes and `rollups rebuild` advance in their own transaction.
+_snapshots: Dict[int, Tuple[int, str, bytes]] = {}
+
+
+def current_version() -> int:
+    if db.SessionLocal is None:
+        return 0
+    with db.SessionLocal() as session:
+        return rollups.current_version(session)
+
+
+def bump_version() -> int:
+    """Mark the dashboard data changed outside a call write, e.g. after a manual fix-up."""
+    db.require_db()
+    with db.WriteSessionLocal() as session:
+        version = rollups.bump_version(session)
+        session.commit()
+    return version
+
+
+def _call_event(record: dict, net: Dict[rollups.RollupKey, List[float]]) -> dict:
+    totals = dict.fromkeys(rollups.FIELDS, 0)
+    outcomes: Dict[str, int] = {}
+    sentiment: Dict[str, int] = {}
+    for (day, outcome, sent), vec in net.items():
+        if day != rollups.ALL_DAYS:
+            continue
+        for f, v in zip(rollups.FIELDS, vec):
+            totals[f] += v
+        outcomes[outcome] = outcomes.get(outcome, 0) + int(vec[0])
+        sentiment[sent] = sentiment.get(sent, 0) + int(vec[0])
+
+    return {
+        "call": {k: record.get(k) for k in LIST_KEYS},
+        "delta": {
+            "totals": totals,
+            "outcomes": {k: n for k, n in outcomes.items() if n},
+            "sentiment": {k: n for k, n in sentiment.items() if n},
+        },
+    }
+
+
+def written_event(nets: List[Tuple[dict, Dict[rollups.RollupKey, List[float]]]]) -> str:
+    """The data_events payload for a batch of call writes: each row and its net effect on the all-time totals."""
+    return json.dumps([_call_event(record, net) for record, net in nets], separators=(",", ":"))
+
+
+class DashboardFeed:
+    """
+    Background thread that follows data_events and publishes them to this worker's
+    stream viewers, so every worker sees the calls any worker wrote, in version
+    order. A version whose event was pruned, or that carries none (`rollups
+    rebuild`), becomes a `resync`. Also prunes the log to EVENTS_KEEP rows.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.position = current_version()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pruned_at = 0.0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="dashboard-feed", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.warning("feed poll failed: %s", e)
+
+    def poll_once(self) -> None:
+        with db.SessionLocal() as session:
+            if not len(EVENTS):
+                # nobody to tell: just keep up
+                self.position = rollups.current_version(session)
+                rows = []
+            else:
+                stmt = (
+                    select(DataEvent.version, DataEvent.data)
+                    .where(DataEvent.version > self.position)
+                    .order_by(DataEvent.version)
+                    .limit(FEED_BATCH)
+                )
+                rows = session.execute(stmt).all()
+
+        for version, data in rows:
+            if data is None or version != self.position + 1:
+                EVENTS.publish_raw(RESYNC)
+            else:
+                for event in json.loads(data):
+                    EVENTS.publish_raw(sse_event("call", {"version": version, **event}))
+            self.position = version
+
+        now = time.monotonic()
+        if now - self._pruned_at > 60:
+            self._pruned_at = now
+            with db.WriteSessionLocal() as session:
+                session.execute(delete(DataEvent).where(DataEvent.version <= self.position - EVENTS_KEEP))
+                session.commit()
+
+
+FEED: Optional[DashboardFeed] = None
+
+
+def start_feed(interval: float) -> None:
+    global FEED
+    if FEED is None and db.SessionLocal is not None:
+        FEED = DashboardFeed(interval)
+        FEED.start()
+
+
+def stop_feed() -> None:
+    global FEED
+    if FEED is not None:
+        FEED.stop()
+        FEED = None
+
+
+def stream_position() -> int:
+    """Version a new stream viewer starts from: the next `call` event it gets is newer."""
+    return FEED.position if FEED is not None else current_version()
+
+
+def snapshot_etag(limit: int, version: int) -> str:
+    return f'"{version}-{limit}"'
+
+
+def snapshot(limit: int, version: Optional[int] = None) -> Tuple[str, bytes]:
+    """
+    Overview, outcome and sentiment counts, and the first page of calls, as one
+    JSON document with its ETag. Rendered at most once per data version and limit.
+    """
+    if version is None:
+        version = current_version()
+    cached = _snapshots.get(limit)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+
+    db.require_db()
+    with db.SessionLocal() as session:
+        rows = _all_time_rows(session)
+        calls, next_cursor = _list_calls(session, limit, None, [], False)
+
+    body = json.dumps(
+        {
+            "version": version,
+            "totals": _totals(rows),
+            "overview": _overview(rows),
+            "outcomes": _counts(rows, "outcome"),
+            "sentiment": _counts(rows, "sentiment"),
+            "calls": calls,
+            "next_cursor": encode_cursor(next_cursor) if next_cursor is not None else None,
+        },
+        separators=(",", ":"),
+    ).encode()
+
+    etag = snapshot_etag(limit, version)
+    _snapshots[limit] = (version, etag, body)
+    return etag, body
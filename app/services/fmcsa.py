@@ -1,15 +1,183 @@
+import asyncio
+import logging
 import os
+import time
 from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
 
 import httpx
 
+from app.core.config import settings
+from app.core.ratelimit import TokenBucket
+from app.core.state import METRICS
+from app.schemas.carriers import FmcsaUpstreamStatus
+
+logger = logging.getLogger(__name__)
+
 FMCSA_BASE = "https://mobile.fmcsa.dot.gov/qc/services"
 
+# MC docket numbers run to 7 digits today; one spare before they are refused unsent
+MC_NUMBER_MAX_DIGITS = 8
+MC_NUMBER_ERROR = f"mc_number must be 1 to {MC_NUMBER_MAX_DIGITS} digits"
+
+# a caller's budget shorter than this that runs out says nothing about FMCSA's health
+BREAKER_MIN_TIMEOUT_SECONDS = 1.0
+
+
+def _base_url() -> str:
+    # overridable so a local stub can stand in for FMCSA (see benchmarks/fmcsa_stub.py)
+    return os.getenv("FMCSA_BASE_URL", FMCSA_BASE).rstrip("/")
+
+
+def valid_mc_number(mc_number: str) -> bool:
+    """Digits only, since it goes into the lookup URL's path."""
+    return 0 < len(mc_number) <= MC_NUMBER_MAX_DIGITS and mc_number.isascii() and mc_number.isdigit()
+
 
 class FmcsaError(Exception):
     pass
 
 
+class FmcsaUnavailable(FmcsaError):
+    """FMCSA is down, slow or short-circuited; callers may fall back to a cached answer."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: requests flow, failures are counted. After `failure_threshold` failures in a
+    row it opens and every request fails fast for `reset_seconds`. Then it is half-open:
+    one probe request goes through, and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.short_circuited = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                self.short_circuited += 1
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                self.short_circuited += 1
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """A request that ended without saying anything about upstream health."""
+        self._probing = False
+
+
+BREAKER = CircuitBreaker(settings.fmcsa_breaker_failures, settings.fmcsa_breaker_reset_seconds)
+TIMEOUTS = 0
+RATE_LIMITED = 0
+HTTP2 = False
+
+# per-host request rate limits, shared by every caller (FMCSA_RATE_LIMIT_PER_SECOND, 0 = off)
+_limiters: Dict[str, TokenBucket] = {}
+
+_client: Optional[httpx.AsyncClient] = None
+# one slot per pooled connection, so waiting for a connection is timed apart from FMCSA itself
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _new_client() -> httpx.AsyncClient:
+    global HTTP2
+    limits = httpx.Limits(
+        max_connections=settings.fmcsa_max_connections,
+        max_keepalive_connections=settings.fmcsa_max_connections,
+        keepalive_expiry=30.0,
+    )
+    timeout = httpx.Timeout(settings.fmcsa_timeout_seconds, connect=5.0)
+    http2 = settings.fmcsa_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("FMCSA_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+    HTTP2 = http2
+    return httpx.AsyncClient(timeout=timeout, limits=limits, http2=http2)
+
+
+async def start_client() -> None:
+    _get_client()
+
+
+async def stop_client() -> None:
+    global _client, _slots
+    client, _client, _slots = _client, None, None
+    if client is not None:
+        await client.aclose()
+
+
+def _get_client() -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    # created lazily for scripts that never run the app's startup hook
+    global _client, _slots
+    if _client is None:
+        _client = _new_client()
+        _slots = asyncio.Semaphore(settings.fmcsa_max_connections)
+    return _client, _slots
+
+
+def _limiter(url: str) -> Optional[TokenBucket]:
+    if settings.fmcsa_rate_limit_per_second <= 0:
+        return None
+    host = urlsplit(url).netloc
+    bucket = _limiters.get(host)
+    if bucket is None:
+        bucket = _limiters[host] = TokenBucket(
+            settings.fmcsa_rate_limit_per_second,
+            settings.fmcsa_rate_limit_burst or None,
+        )
+    return bucket
+
+
+def upstream_status() -> FmcsaUpstreamStatus:
+    return FmcsaUpstreamStatus(
+        http2=HTTP2,
+        circuit_state=BREAKER.state,
+        consecutive_failures=BREAKER.consecutive_failures,
+        circuit_opened=BREAKER.opened,
+        short_circuited=BREAKER.short_circuited,
+        timeouts=TIMEOUTS,
+        rate_limited=RATE_LIMITED,
+        latency=METRICS.histogram("fmcsa_upstream_seconds"),
+    )
+
+
+def new_deadline(budget_seconds: Optional[float] = None) -> float:
+    """Absolute time.monotonic() deadline for a lookup with the given budget (default: settings)."""
+    if budget_seconds is None:
+        budget_seconds = settings.fmcsa_deadline_seconds
+    return time.monotonic() + budget_seconds
+
+
 def _extract_fields(payload: Dict[str, Any], mc_number: str) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[int]]:
     content = payload.get("content") or []
     if not content:
@@ -23,30 +191,120 @@ def _extract_fields(payload: Dict[str, Any], mc_number: str) -> Tuple[Optional[s
     return allowed, city, state, dot
 
 
-async def fetch_carrier_by_mc(mc_number: str) -> Dict[str, Any]:
+async def fetch_carrier_by_mc(mc_number: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Look up one docket number on the shared client.
+
+    `deadline` is a time.monotonic() value; the request timeout is cut to whatever
+    is left of it, and a rate-limit wait that would not fit in it is not taken.
+    Timeouts, transport errors and 5xx responses count against the circuit breaker
+    and raise FmcsaUnavailable; so does an open circuit, at once.
+    """
+    global TIMEOUTS, RATE_LIMITED
+
+    if not valid_mc_number(mc_number):
+        raise FmcsaError(MC_NUMBER_ERROR)
+
     web_key = os.getenv("FMCSA_WEBKEY")
     if not web_key:
         raise FmcsaError("Missing FMCSA_WEBKEY environment variable")
 
-    url = f"{FMCSA_BASE}/carriers/docket-number/{mc_number}"
+    budget = settings.fmcsa_timeout_seconds
+    if deadline is not None:
+        budget = min(budget, deadline - time.monotonic())
+    if budget <= 0:
+        raise FmcsaUnavailable("FMCSA deadline exceeded before the request was sent")
+
+    url = f"{_base_url()}/carriers/docket-number/{mc_number}"
     params = {"webKey": web_key}
 
-    timeout = httpx.Timeout(10.0, connect=5.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        resp = await client.get(url, params=params)
-        if resp.status_code == 404:
-            return {"content": []}
-        if resp.status_code >= 400:
-            raise FmcsaError(f"FMCSA request failed: {resp.status_code} {resp.text[:200]}")
+    # an open circuit fails fast, before a rate token is spent or waited for
+    if not BREAKER.allow():
+        raise FmcsaUnavailable("FMCSA circuit open")
 
-        try:
-            return resp.json()
-        except Exception as e:
-            raise FmcsaError(f"FMCSA returned non-JSON: {e}") from e
+    limiter = _limiter(url)
+    if limiter is not None:
+        wait = limiter.reserve(max_wait=budget)
+        if wait is None:
+            BREAKER.release()
+            RATE_LIMITED += 1
+            raise FmcsaUnavailable("FMCSA rate limit leaves no time within the deadline")
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                BREAKER.release()
+                raise
+            budget -= wait
+
+    client, slots = _get_client()
+    waited = time.monotonic()
+    try:
+        await asyncio.wait_for(slots.acquire(), budget)
+    except BaseException as e:
+        # queueing behind our own requests is local congestion, not an FMCSA fault
+        BREAKER.release()
+        if isinstance(e, asyncio.TimeoutError):
+            raise FmcsaUnavailable("FMCSA connection pool exhausted") from e
+        raise
+    budget -= time.monotonic() - waited
+
+    t0 = time.perf_counter()
+    try:
+        # httpx timeouts apply per phase (connect, read, ...); wait_for caps the total
+        resp = await asyncio.wait_for(
+            client.get(url, params=params, timeout=httpx.Timeout(budget, connect=min(budget, 5.0))),
+            max(budget, 0.0),
+        )
+    except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+        TIMEOUTS += 1
+        METRICS.observe("fmcsa_upstream_seconds", time.perf_counter() - t0)
+        if budget >= BREAKER_MIN_TIMEOUT_SECONDS:
+            BREAKER.record_failure()
+        else:
+            BREAKER.release()
+        raise FmcsaUnavailable(f"FMCSA timed out after {budget:.2f}s") from e
+    except httpx.HTTPError as e:
+        BREAKER.record_failure()
+        raise FmcsaUnavailable(f"FMCSA request failed: {e!r}") from e
+    except BaseException:
+        BREAKER.release()
+        raise
+    finally:
+        slots.release()
+    METRICS.observe("fmcsa_upstream_seconds", time.perf_counter() - t0)
+
+    if resp.status_code >= 500:
+        BREAKER.record_failure()
+        raise FmcsaUnavailable(f"FMCSA request failed: {resp.status_code} {resp.text[:200]}")
+    BREAKER.record_success()
+
+    if resp.status_code == 404:
+        return {"content": []}
+    if resp.status_code >= 400:
+        raise FmcsaError(f"FMCSA request failed: {resp.status_code} {resp.text[:200]}")
+
+    try:
+        return resp.json()
+    except Exception as e:
+        raise FmcsaError(f"FMCSA returned non-JSON: {e}") from e
+
+
+def unknown_result(mc_number: str) -> Dict[str, Any]:
+    """Answer given when FMCSA can't be asked and nothing is cached: not eligible, status unknown."""
+    return {
+        "eligible": False,
+        "mc_number": mc_number,
+        "dot_number": None,
+        "allowed_to_operate": None,
+        "phy_city": None,
+        "phy_state": None,
+        "verification": "unknown",
+    }
 
 
-async def verify_carrier(mc_number: str) -> Dict[str, Any]:
-    payload = await fetch_carrier_by_mc(mc_number)
+async def verify_carrier(mc_number: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+    payload = await fetch_carrier_by_mc(mc_number, deadline)
     allowed, city, state, dot = _extract_fields(payload, mc_number)
 
     if allowed is None:
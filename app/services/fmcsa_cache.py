@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.schemas.carriers import FmcsaCacheStatus
+from app.services.fmcsa import FmcsaUnavailable, unknown_result, verify_carrier
+
+logger = logging.getLogger(__name__)
+
+# don't rewrite the cache file more often than this while results keep arriving
+SAVE_INTERVAL_SECONDS = 30.0
+
+
+class VerificationCache:
+    """
+    Cache in front of FMCSA carrier verification.
+
+    Results are kept in a bounded LRU with a TTL chosen by outcome: eligible
+    carriers for longest, ineligible ones shorter, unknown MC numbers shortest.
+    Upstream errors are not cached. Concurrent lookups of one MC number share a
+    single upstream request. With a cache file configured, unexpired entries are
+    loaded at startup and written back periodically and at shutdown. That keeps
+    the cache warm across restarts.
+
+    Expired entries stay in the LRU until replaced or evicted: when FMCSA is
+    unavailable or the caller's deadline runs out, the last known answer is served
+    as "stale", and with none on hand an "unknown" answer is, instead of an error.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, Optional[float]], Awaitable[Dict[str, Any]]],
+        max_entries: int = 10000,
+        ttl_eligible: float = 6 * 3600,
+        ttl_ineligible: float = 3600,
+        ttl_not_found: float = 600,
+        path: Optional[str] = None,
+    ) -> None:
+        self._fetch = fetch
+        self.max_entries = max_entries
+        self.ttl_eligible = ttl_eligible
+        self.ttl_ineligible = ttl_ineligible
+        self.ttl_not_found = ttl_not_found
+        self.path = Path(path) if path else None
+
+        # mc_number -> (expires_at as wall-clock time, result)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._dirty = False
+        self._last_save = 0.0
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+        self.upstream_requests = 0
+        self.upstream_errors = 0
+        self.deadline_exceeded = 0
+        self.stale_served = 0
+        self.unknown_served = 0
+        self.loaded_from_disk = 0
+
+    def ttl_for(self, result: Dict[str, Any]) -> float:
+        if result.get("eligible"):
+            return self.ttl_eligible
+        if result.get("allowed_to_operate") is None:
+            return self.ttl_not_found
+        return self.ttl_ineligible
+
+    def _lookup(self, key: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(result, fresh); an expired result is still returned for use as a fallback."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        expires_at, result = entry
+        if expires_at <= time.time():
+            self.expired += 1
+            return result, False
+        self._entries.move_to_end(key)
+        return result, True
+
+    def _store(self, key: str, result: Dict[str, Any]) -> None:
+        self._entries[key] = (time.time() + self.ttl_for(result), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._dirty = True
+
+    async def verify(self, mc_number: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Verification result for `mc_number`, tagged with where it came from in
+        "verification": live, cached, stale or unknown. `deadline` is a time.monotonic()
+        value that bounds this caller's wait. A lookup shared with other callers runs
+        on the upstream request timeout, not on any one caller's deadline, and
+        still fills the cache when it lands after some of them gave up.
+        """
+        key = mc_number.strip()
+
+        cached, fresh = self._lookup(key)
+        if fresh:
+            self.hits += 1
+            if not cached.get("eligible"):
+                self.negative_hits += 1
+            return dict(cached, mc_number=mc_number, verification="cached")
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch_and_store(key))
+            # nobody may be left to await it once every caller's deadline has passed
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._in_flight[key] = task
+
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+        try:
+            # shielded: a caller that goes away must not cancel the lookup the others await
+            result = await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            return self._fallback(key, mc_number)
+        except FmcsaUnavailable:
+            return self._fallback(key, mc_number)
+        return dict(result, mc_number=mc_number, verification="live")
+
+    def _fallback(self, key: str, mc_number: str) -> Dict[str, Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.stale_served += 1
+            return dict(entry[1], mc_number=mc_number, verification="stale")
+        self.unknown_served += 1
+        return unknown_result(mc_number)
+
+    async def _fetch_and_store(self, key: str) -> Dict[str, Any]:
+        self.upstream_requests += 1
+        try:
+            result = await self._fetch(key, None)
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        self._store(key, result)
+        if self.path is not None and time.monotonic() - self._last_save >= SAVE_INTERVAL_SECONDS:
+            self._last_save = time.monotonic()
+            await asyncio.to_thread(self.save)
+        return result
+
+    def status(self) -> FmcsaCacheStatus:
+        return FmcsaCacheStatus(
+            entries=len(self._entries),
+            max_entries=self.max_entries,
+            in_flight=len(self._in_flight),
+            hits=self.hits,
+            negative_hits=self.negative_hits,
+            misses=self.misses,
+            coalesced=self.coalesced,
+            expired=self.expired,
+            evictions=self.evictions,
+            upstream_requests=self.upstream_requests,
+            upstream_errors=self.upstream_errors,
+            deadline_exceeded=self.deadline_exceeded,
+            stale_served=self.stale_served,
+            unknown_served=self.unknown_served,
+            loaded_from_disk=self.loaded_from_disk,
+        )
+
+    def load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)["entries"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("ignoring unreadable cache file %s: %s", self.path, e)
+            return
+
+        now = time.time()
+        for key, expires_at, result in entries[-self.max_entries:]:
+            if expires_at > now:
+                self._entries[key] = (expires_at, result)
+        self.loaded_from_disk = len(self._entries)
+        logger.info("loaded %d verifications from %s", self.loaded_from_disk, self.path)
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        self._dirty = False
+        # LRU order, oldest first, so a smaller cache reloads the most recent entries
+        entries = [[key, expires_at, result] for key, (expires_at, result) in list(self._entries.items())]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": entries}, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+
+CACHE = VerificationCache(
+    verify_carrier,
+    max_entries=settings.fmcsa_cache_max_entries,
+    ttl_eligible=settings.fmcsa_ttl_eligible_seconds,
+    ttl_ineligible=settings.fmcsa_ttl_ineligible_seconds,
+    ttl_not_found=settings.fmcsa_ttl_not_found_seconds,
+    path=settings.fmcsa_cache_file,
+)
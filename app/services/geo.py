@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import csv
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+GAZETTEER_FILE = Path(__file__).resolve().parents[1] / "data" / "gazetteer.csv"
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEG_LAT = 69.0
+
+Point = Tuple[float, float]
+
+
+def place_key(city: str, state: str) -> str:
+    return f"{' '.join(city.strip().lower().split())}, {state.strip().lower()}"
+
+
+@lru_cache(maxsize=1)
+def gazetteer() -> Dict[str, Point]:
+    """Bundled offline "city, st" -> (lat, lon) table, keyed like matching.canonical_place() output."""
+    with open(GAZETTEER_FILE, "r", encoding="utf-8", newline="") as f:
+        return {place_key(r["city"], r["state"]): (float(r["lat"]), float(r["lon"])) for r in csv.DictReader(f)}
+
+
+def resolve(place: Optional[str]) -> Optional[Point]:
+    if not place or "," not in place:
+        return None
+    city, _, state = place.rpartition(",")
+    return gazetteer().get(place_key(city, state))
+
+
+def haversine_miles(a: Point, b: Point) -> float:
+    lat1, lon1 = math.radians(a[0]), math.radians(a[1])
+    lat2, lon2 = math.radians(b[0]), math.radians(b[1])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(h)))
+
+
+class GeoGrid:
+    """
+    Fixed lat/lon grid over named points.
+
+    A radius query visits only the cells overlapping the circle's bounding box and
+    runs haversine on the points found there, never on the whole set.
+    """
+
+    def __init__(self, points: Iterable[Tuple[str, Point]], cell_deg: float = 1.0):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], List[Tuple[str, Point]]] = {}
+        for key, pt in points:
+            self._cells.setdefault(self._cell(pt), []).append((key, pt))
+
+    def _cell(self, pt: Point) -> Tuple[int, int]:
+        return math.floor(pt[0] / self.cell_deg), math.floor(pt[1] / self.cell_deg)
+
+    def within(self, center: Point, radius_miles: float) -> List[Tuple[str, float]]:
+        lat, lon = center
+        dlat = radius_miles / MILES_PER_DEG_LAT
+        dlon = radius_miles / (MILES_PER_DEG_LAT * max(0.01, math.cos(math.radians(lat))))
+
+        lat0, lon0 = self._cell((lat - dlat, lon - dlon))
+        lat1, lon1 = self._cell((lat + dlat, lon + dlon))
+
+        out: List[Tuple[str, float]] = []
+        for i in range(lat0, lat1 + 1):
+            for j in range(lon0, lon1 + 1):
+                for key, pt in self._cells.get((i, j), ()):
+                    d = haversine_miles(center, pt)
+                    if d <= radius_miles:
+                        out.append((key, d))
+        return out
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import ValidationError
+
+from app.core import state
+from app.schemas.domain import Load
+from app.schemas.loads import LoadDelta, LoadIngestResult
+
+logger = logging.getLogger(__name__)
+
+LAST_INGEST: Optional[LoadIngestResult] = None
+
+
+def apply_deltas(deltas: Iterable[LoadDelta]) -> LoadIngestResult:
+    """
+    Apply a batch of deltas to the current board and publish the result.
+
+    The batch is coalesced by load_id (last op wins), the next snapshot is built off
+    to the side, and `state.BOARD` is rebound in one step, so searches never wait on
+    ingestion and never see a partially applied batch.
+    """
+    global LAST_INGEST
+
+    received = 0
+    latest: Dict[str, LoadDelta] = {}
+    for d in deltas:
+        received += 1
+        latest[d.load_id] = d
+
+    upserts: List[Load] = [d.load for d in latest.values() if d.op != "remove"]
+    removals: List[str] = [d.load_id for d in latest.values() if d.op == "remove"]
+
+    with state.BOARD_LOCK:
+        t0 = time.perf_counter()
+        board = state.BOARD.apply(upserts, removals)
+        t1 = time.perf_counter()
+        previous, state.BOARD = state.BOARD, board
+        t2 = time.perf_counter()
+
+    # let the old snapshot's structures be freed outside the measured swap
+    del previous
+
+    LAST_INGEST = LoadIngestResult(
+        received=received,
+        upserted=len(upserts),
+        removed=len(removals),
+        board_size=len(board),
+        board_version=board.version,
+        apply_ms=round((t1 - t0) * 1e3, 3),
+        swap_us=round((t2 - t1) * 1e6, 3),
+    )
+    return LAST_INGEST
+
+
+class DeltaFileWatcher:
+    """
+    Tails an NDJSON file of LoadDelta records and applies new lines as they appear.
+
+    The file is polled by size; only complete lines are consumed. A file that shrinks
+    or is replaced (new inode) is re-read from the start, which is safe because
+    deltas replace by load_id.
+    """
+
+    def __init__(self, path: str, poll_seconds: float = 1.0, batch_size: int = 5000):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="load-delta-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.warning("delta watcher error on %s: %s", self.path, e)
+            self._stop.wait(self.poll_seconds)
+
+    def poll_once(self) -> int:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._inode = st.st_ino
+            self._offset = 0
+        if st.st_size == self._offset:
+            return 0
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+
+        applied = 0
+        batch: List[LoadDelta] = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                batch.append(LoadDelta.model_validate_json(line))
+            except ValidationError as e:
+                logger.warning("skipping bad delta line in %s: %s", self.path, e.errors()[0]["msg"])
+                continue
+            if len(batch) >= self.batch_size:
+                applied += apply_deltas(batch).received
+                batch = []
+        if batch:
+            applied += apply_deltas(batch).received
+
+        self._offset += end
+        return applied
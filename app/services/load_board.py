@@ -0,0 +1,674 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import itertools
+from array import array
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type, TypeVar
+
+from app.schemas.domain import Load
+from app.services import geo
+from app.services.load_store import NO_TIME, CompactLoadStore, LoadStore
+from app.services.matching import EquipmentIndex, Match, PlaceIndex, Resolution, canonical_equipment, canonical_place, resolution
+
+# (origin, destination, equipment) with "" meaning "any"
+BucketKey = Tuple[str, str, str]
+
+# lowest trigram similarity at which a search term is taken for a board place or equipment type
+MIN_MATCH_SCORE = 0.5
+
+# open ends of a TimeWindow; loads whose time did not parse (NO_TIME) fall outside every window
+# unless it lets untimed pickups through
+EARLIEST = NO_TIME + 1
+LATEST = 2 ** 63 - 1
+
+# a row from a time range costs a lane check on top of the time check: about this many posting rows
+_LANE_CHECK_COST = 4
+
+# overlays are folded into a fresh base dict once they hold this share of its size
+_FLATTEN_MIN = 4096
+_FLATTEN_SHIFT = 3
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+_MISSING = object()
+_DELETED = object()
+
+
+def norm(s: Optional[str]) -> str:
+    if not s:
+        return ""
+    return " ".join(s.strip().lower().split())
+
+
+class Matchers(NamedTuple):
+    origins: PlaceIndex
+    destinations: PlaceIndex
+    equipment: EquipmentIndex
+
+
+class Schedule(NamedTuple):
+    """Row numbers sorted by pickup and by delivery time (ties by row)."""
+
+    pickups: array
+    deliveries: array
+
+
+class TimeWindow(NamedTuple):
+    """
+    Inclusive epoch-second bounds on a load's pickup and delivery times. With
+    `untimed`, loads whose pickup time did not parse are let through as well.
+    """
+
+    pickup_from: int = EARLIEST
+    pickup_to: int = LATEST
+    delivery_from: int = EARLIEST
+    delivery_to: int = LATEST
+    untimed: bool = False
+
+
+def bucket_keys(origin: str, destination: str, equipment: str) -> List[BucketKey]:
+    """All 8 full/partial lane keys a load with these normalized fields is reachable from."""
+    return [(o, d, e) for o in (origin, "") for d in (destination, "") for e in (equipment, "")]
+
+
+class _Overlay(Generic[K, V]):
+    """
+    Read-only mapping made of a small dict of recent changes over a shared base dict.
+
+    updated() returns a new overlay without touching either dict of the old one, so
+    successive snapshots share the large base and only copy what changed. When the
+    change dict outgrows ~1/8 of the base, the two are folded into a new base.
+    """
+
+    __slots__ = ("_base", "_top", "_len")
+
+    def __init__(self, base: Dict[K, V], top: Optional[Dict[K, Any]] = None, length: Optional[int] = None):
+        self._base = base
+        self._top = top or {}
+        self._len = len(base) if length is None else length
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        v = self._top.get(key, _MISSING)
+        if v is _MISSING:
+            return self._base.get(key, default)
+        return default if v is _DELETED else v
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return self._len
+
+    def items(self) -> Iterator[Tuple[K, V]]:
+        top = self._top
+        for k, v in self._base.items():
+            if k not in top:
+                yield k, v
+        for k, v in top.items():
+            if v is not _DELETED:
+                yield k, v
+
+    def __iter__(self) -> Iterator[K]:
+        return (k for k, _ in self.items())
+
+    def values(self) -> Iterator[V]:
+        return (v for _, v in self.items())
+
+    def updated(self, changes: Dict[K, Any]) -> "_Overlay[K, V]":
+        """New overlay with `changes` applied; a value of _DELETED removes the key."""
+        length = self._len
+        for k, v in changes.items():
+            length += (v is not _DELETED) - (k in self)
+
+        top = {**self._top, **changes}
+        if len(top) <= max(_FLATTEN_MIN, len(self._base) >> _FLATTEN_SHIFT):
+            return _Overlay(self._base, top, length)
+
+        base = dict(self._base)
+        for k, v in top.items():
+            if v is _DELETED:
+                base.pop(k, None)
+            else:
+                base[k] = v
+        return _Overlay(base)
+
+
+class LoadBoard:
+    """
+    Immutable snapshot of the load board plus its search indexes.
+
+    Every load is posted into the bucket for its exact (origin, destination, equipment)
+    lane and into each partial combination of those fields. Posting lists are int32
+    arrays of row numbers ordered by loadboard_rate descending, so a top-k search is
+    a dict lookup plus a slice. Pickup and delivery windows are answered from the
+    same posting, or, when the window is the more selective filter, by bisecting a
+    Schedule of rows sorted by time and checking those rows' lanes. Lanes are posted under canonical places and
+    equipment types (app.services.matching), and search terms are resolved to those
+    keys first, through trigram indexes over the distinct keys when there is no
+    exact hit. Origins and destinations found in the gazetteer are
+    also placed on a GeoGrid for radius searches. Rows live in a LoadStore and are
+    materialized as Load only for the rows a caller gets back.
+
+    apply() derives the next snapshot copy-on-write: only touched posting lists are
+    copied, the bucket and id maps are layered with _Overlay, and the store is
+    append-only and shared, so a reader holding an older snapshot keeps a consistent
+    view while the new one is built.
+    """
+
+    def __init__(
+        self,
+        store: LoadStore,
+        buckets: _Overlay[BucketKey, array],
+        by_id: _Overlay[str, int],
+        origin_grid: geo.GeoGrid,
+        destination_grid: geo.GeoGrid,
+        matchers: Matchers,
+        schedule: Schedule,
+        version: int = 0,
+    ):
+        self._store = store
+        self._buckets = buckets
+        self._by_id = by_id
+        self._origin_grid = origin_grid
+        self._destination_grid = destination_grid
+        self._matchers = matchers
+        self._schedule = schedule
+        self.version = version
+
+    @classmethod
+    def build(cls, loads: Iterable[Load], version: int = 0, store_cls: Type[LoadStore] = CompactLoadStore) -> "LoadBoard":
+        store = store_cls()
+        by_id: Dict[str, int] = {}
+        for load in loads:
+            # first occurrence of a load_id wins, so every posted row is addressable by id
+            if load.load_id not in by_id:
+                by_id[load.load_id] = store.append(load)
+
+        # stable sort keeps file order for equal rates, same as the old linear scan
+        rates = store.rates
+        order = sorted(range(len(store)), key=lambda i: -rates[i])
+
+        # boards repeat a small set of cities/equipment, so canonicalize each string once
+        places: Dict[str, str] = {}
+        equipment_types: Dict[str, str] = {}
+
+        def place_of(s: str) -> str:
+            k = places.get(s)
+            if k is None:
+                k = places[s] = canonical_place(s)
+            return k
+
+        def equipment_of(s: str) -> str:
+            k = equipment_types.get(s)
+            if k is None:
+                k = equipment_types[s] = canonical_equipment(s)
+            return k
+
+        buckets: Dict[BucketKey, List[int]] = {}
+        for i in order:
+            origin, destination, equipment = store.lane(i)
+            for key in bucket_keys(place_of(origin), place_of(destination), equipment_of(equipment)):
+                posting = buckets.get(key)
+                if posting is None:
+                    buckets[key] = [i]
+                else:
+                    posting.append(i)
+
+        origin_grid, destination_grid = _grids(buckets)
+        postings = {key: array("i", posting) for key, posting in buckets.items()}
+        rows = range(len(store))
+        schedule = Schedule(
+            array("i", sorted(rows, key=store.pickup_ts.__getitem__)),
+            array("i", sorted(rows, key=store.delivery_ts.__getitem__)),
+        )
+
+        return cls(store, _Overlay(postings), _Overlay(by_id), origin_grid, destination_grid, _matchers(buckets), schedule, version)
+
+    def apply(self, upserts: Sequence[Load], removals: Iterable[str]) -> "LoadBoard":
+        """
+        Next snapshot with `upserts` added or replaced (by load_id) and `removals` dropped.
+
+        load_ids must be unique across both arguments. Callers must serialize apply()
+        and only apply to the latest snapshot, since the store is shared forward.
+        """
+        store = self._store
+        rates = store.rates
+        by_id = self._by_id
+
+        # replaced/removed rows stay behind as garbage; rebuild once they dominate
+        dead = len(store) - len(by_id)
+        if dead + len(upserts) > 2 * len(by_id) + 1024:
+            live = {load_id: store.get(i) for load_id, i in by_id.items()}
+            for load_id in removals:
+                live.pop(load_id, None)
+            for load in upserts:
+                live[load.load_id] = load
+            return LoadBoard.build(live.values(), self.version + 1, type(store))
+
+        id_changes: Dict[str, Any] = {}
+        added: Dict[BucketKey, List[int]] = {}
+        dropped: Dict[BucketKey, List[int]] = {}
+        new_rows: List[int] = []
+        old_rows: List[int] = []
+
+        for load_id in removals:
+            i = by_id.get(load_id)
+            if i is not None:
+                id_changes[load_id] = _DELETED
+                old_rows.append(i)
+                for key in _keys(*store.lane(i)):
+                    dropped.setdefault(key, []).append(i)
+
+        for load in upserts:
+            old = by_id.get(load.load_id)
+            if old is not None:
+                old_rows.append(old)
+                for key in _keys(*store.lane(old)):
+                    dropped.setdefault(key, []).append(old)
+            i = store.append(load)
+            id_changes[load.load_id] = i
+            new_rows.append(i)
+            for key in _keys(load.origin, load.destination, load.equipment_type):
+                added.setdefault(key, []).append(i)
+
+        def rank(r: int) -> Tuple[float, int]:
+            return -rates[r], r
+
+        buckets = self._buckets
+        bucket_changes: Dict[BucketKey, Any] = {}
+        keys_changed = False  # a place or equipment type appeared or went away
+        for key in added.keys() | dropped.keys():
+            before = buckets.get(key)
+            posting = _patch(before or array("i"), added.get(key, ()), dropped.get(key, ()), rank)
+            bucket_changes[key] = posting or _DELETED
+            if bool(before) != bool(posting) and (key[1:] == ("", "") or key[::2] == ("", "") or key[:2] == ("", "")):
+                keys_changed = True
+
+        buckets = buckets.updated(bucket_changes)
+        if keys_changed:
+            origin_grid, destination_grid = _grids(buckets)
+            matchers = _matchers(buckets)
+        else:
+            origin_grid, destination_grid = self._origin_grid, self._destination_grid
+            matchers = self._matchers
+
+        pickup, delivery = store.pickup_ts, store.delivery_ts
+        schedule = Schedule(
+            _patch(self._schedule.pickups, new_rows, old_rows, lambda r: (pickup[r], r)),
+            _patch(self._schedule.deliveries, new_rows, old_rows, lambda r: (delivery[r], r)),
+        )
+
+        return LoadBoard(
+            store, buckets, by_id.updated(id_changes), origin_grid, destination_grid, matchers, schedule, self.version + 1
+        )
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def _place(self, place: Optional[str], radius_miles: Optional[float], index: PlaceIndex, field: int) -> Match:
+        if radius_miles:
+            key = canonical_place(place)
+            if geo.resolve(key) is not None:
+                return Match(key, 1.0)  # the radius search finds the board places around it
+        buckets = self._buckets
+        pad = ("", "")
+
+        def weight(key: str) -> int:
+            return len(buckets.get(pad[:field] + (key,) + pad[field:], ()))
+
+        return index.match(place, MIN_MATCH_SCORE, weight)
+
+    def resolve(
+        self,
+        origin: Optional[str],
+        destination: Optional[str],
+        equipment: Optional[str],
+        origin_radius_miles: Optional[float] = None,
+        destination_radius_miles: Optional[float] = None,
+    ) -> Resolution:
+        """The board keys these search terms stand for, with a match score."""
+        m = self._matchers
+        terms = {"origin": origin, "destination": destination, "equipment": equipment}
+        matches = {
+            "origin": self._place(origin, origin_radius_miles, m.origins, 0),
+            "destination": self._place(destination, destination_radius_miles, m.destinations, 1),
+            "equipment": m.equipment.match(equipment, MIN_MATCH_SCORE),
+        }
+        return resolution(terms, matches, norm)
+
+    def _fits(self, window: Optional[TimeWindow]) -> Optional[Callable[[int], bool]]:
+        if window is None:
+            return None
+        pickup, delivery = self._store.pickup_ts, self._store.delivery_ts
+        p_from, p_to, d_from, d_to, untimed = window
+        if untimed:
+
+            def picks_up(r: int) -> bool:
+                t = pickup[r]
+                return p_from <= t <= p_to or t == NO_TIME
+
+        else:
+
+            def picks_up(r: int) -> bool:
+                return p_from <= pickup[r] <= p_to
+
+        if (d_from, d_to) == (EARLIEST, LATEST):
+            return picks_up
+        return lambda r: picks_up(r) and d_from <= delivery[r] <= d_to
+
+    def _time_range(self, window: TimeWindow) -> Tuple[int, Callable[[], Iterable[int]]]:
+        """
+        How many rows the narrower of the window's pickup and delivery ranges spans
+        (an open side spans the board), and a function iterating them.
+        """
+        store = self._store
+        p_from, p_to, d_from, d_to, untimed = window
+        rows = self._schedule.pickups
+        lo, hi = _span(rows, store.pickup_ts, p_from, p_to)
+        # untimed pickups sort ahead of every window: rows[:head] when they are let through
+        head = _span(rows, store.pickup_ts, NO_TIME, NO_TIME)[1] if untimed else 0
+        if (d_from, d_to) != (EARLIEST, LATEST):
+            d_lo, d_hi = _span(self._schedule.deliveries, store.delivery_ts, d_from, d_to)
+            if d_hi - d_lo < head + hi - lo:
+                rows, lo, hi, head = self._schedule.deliveries, d_lo, d_hi, 0
+        return head + hi - lo, lambda: itertools.chain(rows[:head], rows[lo:hi])
+
+    def _search_rows(self, res: Resolution, limit: int, window: Optional[TimeWindow] = None) -> Sequence[int]:
+        posting = self._buckets.get((res.origin, res.destination, res.equipment))
+        if not posting:
+            return ()
+        if window is None:
+            return posting[:limit]
+
+        in_window, time_rows = self._time_range(window)
+        if not in_window:
+            return ()
+        fits = self._fits(window)
+
+        # Walking the rate-ordered posting reads about limit * board / in_window rows
+        # before `limit` fit (times being independent of lane and rate); walking the
+        # narrower time range reads in_window rows. Take whichever reads fewer.
+        expected = limit * len(self) / in_window
+        if min(expected, len(posting)) <= _LANE_CHECK_COST * in_window:
+            step = int(expected) + limit
+            out: List[int] = []
+            for start in range(0, len(posting), step):
+                out += filter(fits, posting[start:start + step])
+                if len(out) >= limit:
+                    break
+            return out[:limit]
+
+        rates = self._store.rates
+        on_lane = self._on_lane(res)
+        return heapq.nsmallest(limit, (r for r in time_rows() if fits(r) and on_lane(r)), key=lambda r: (-rates[r], r))
+
+    def _on_lane(self, res: Resolution) -> Callable[[int], bool]:
+        lane = self._store.lane
+
+        def on_lane(r: int) -> bool:
+            o, d, e = lane(r)
+            return (
+                (not res.origin or canonical_place(o) == res.origin)
+                and (not res.destination or canonical_place(d) == res.destination)
+                and (not res.equipment or canonical_equipment(e) == res.equipment)
+            )
+
+        return on_lane
+
+    def search(
+        self,
+        origin: Optional[str],
+        destination: Optional[str],
+        equipment: Optional[str],
+        limit: int,
+        window: Optional[TimeWindow] = None,
+    ) -> List[Load]:
+        get = self._store.get
+        return [get(i) for i in self._search_rows(self.resolve(origin, destination, equipment), limit, window)]
+
+    def search_json(
+        self,
+        origin: Optional[str],
+        destination: Optional[str],
+        equipment: Optional[str],
+        limit: int,
+        window: Optional[TimeWindow] = None,
+    ) -> Tuple[List[bytes], Resolution]:
+        """search(), as each load's encoded JSON (cached per row by the store), and how the terms resolved."""
+        res = self.resolve(origin, destination, equipment)
+        encode = self._store.json
+        return [encode(i) for i in self._search_rows(res, limit, window)], res
+
+    def search_nearby(
+        self,
+        origin: Optional[str],
+        destination: Optional[str],
+        equipment: Optional[str],
+        origin_radius_miles: Optional[float],
+        destination_radius_miles: Optional[float],
+        limit: int,
+        deadhead_cost_per_mile: float,
+        window: Optional[TimeWindow] = None,
+    ) -> List[Tuple[Load, float]]:
+        """
+        Top `limit` loads whose lane falls inside the given radii, ranked by
+        loadboard_rate minus deadhead_cost_per_mile * (origin + destination miles off).
+        Returns (load, origin deadhead miles) pairs.
+        """
+        res = self.resolve(origin, destination, equipment, origin_radius_miles, destination_radius_miles)
+        get = self._store.get
+        return [(get(i), miles) for i, miles in self._nearby_rows(
+            res, origin_radius_miles, destination_radius_miles, limit, deadhead_cost_per_mile, window
+        )]
+
+    def search_nearby_json(
+        self,
+        origin: Optional[str],
+        destination: Optional[str],
+        equipment: Optional[str],
+        origin_radius_miles: Optional[float],
+        destination_radius_miles: Optional[float],
+        limit: int,
+        deadhead_cost_per_mile: float,
+        window: Optional[TimeWindow] = None,
+    ) -> Tuple[List[Tuple[bytes, float]], Resolution]:
+        """search_nearby(), with each load as its encoded JSON, and how the terms resolved."""
+        res = self.resolve(origin, destination, equipment, origin_radius_miles, destination_radius_miles)
+        encode = self._store.json
+        return [(encode(i), miles) for i, miles in self._nearby_rows(
+            res, origin_radius_miles, destination_radius_miles, limit, deadhead_cost_per_mile, window
+        )], res
+
+    def _nearby_rows(
+        self,
+        res: Resolution,
+        origin_radius_miles: Optional[float],
+        destination_radius_miles: Optional[float],
+        limit: int,
+        deadhead_cost_per_mile: float,
+        window: Optional[TimeWindow] = None,
+    ) -> List[Tuple[int, float]]:
+        origins = _places(res.origin, origin_radius_miles, self._origin_grid)
+        destinations = _places(res.destination, destination_radius_miles, self._destination_grid)
+        equipment_key = res.equipment
+        store = self._store
+        rates = store.rates
+        fits = self._fits(window)
+
+        lanes = []
+        for o, o_miles in origins:
+            for d, d_miles in destinations:
+                posting = self._buckets.get((o, d, equipment_key))
+                if posting:
+                    lanes.append((posting, deadhead_cost_per_mile * (o_miles + d_miles), o_miles))
+
+        if window is not None:
+            in_window, time_rows = self._time_range(window)
+            if not in_window:
+                return []
+            # as in _search_rows: each bucket head skips about board / in_window rows to
+            # its first fit and the merge as many again per result, capped by the
+            # buckets' size; the time range costs in_window rows plus a lane check each
+            expected = (len(lanes) + limit) * len(self) / in_window
+            if min(expected, sum(len(posting) for posting, _, _ in lanes)) > _LANE_CHECK_COST * in_window:
+                return self._nearby_in_window(origins, destinations, equipment_key, limit, deadhead_cost_per_mile, time_rows(), fits)
+
+        def next_fit(posting: array, pos: int) -> int:
+            if fits is not None:
+                while pos < len(posting) and not fits(posting[pos]):
+                    pos += 1
+            return pos
+
+        # Each (origin, destination) bucket is already rate-ordered and its distance
+        # penalty is constant, so a k-way merge of bucket heads yields the best scores.
+        heads = []
+        for posting, penalty, o_miles in lanes:
+            pos = next_fit(posting, 0)
+            if pos < len(posting):
+                score = rates[posting[pos]] - penalty
+                heads.append((-score, len(heads), pos, posting, penalty, o_miles))
+        heapq.heapify(heads)
+
+        out: List[Tuple[int, float]] = []
+        while heads and len(out) < limit:
+            _, tie, pos, posting, penalty, o_miles = heads[0]
+            out.append((posting[pos], round(o_miles, 1)))
+            pos = next_fit(posting, pos + 1)
+            if pos < len(posting):
+                score = rates[posting[pos]] - penalty
+                heapq.heapreplace(heads, (-score, tie, pos, posting, penalty, o_miles))
+            else:
+                heapq.heappop(heads)
+        return out
+
+    def _nearby_in_window(
+        self,
+        origins: List[Tuple[str, float]],
+        destinations: List[Tuple[str, float]],
+        equipment_key: str,
+        limit: int,
+        deadhead_cost_per_mile: float,
+        rows: Iterable[int],
+        fits: Callable[[int], bool],
+    ) -> List[Tuple[int, float]]:
+        """_nearby_rows() for a selective window: score the rows in its time range whose lane is in reach."""
+        origin_miles = dict(origins)
+        destination_miles = dict(destinations)
+        store = self._store
+        rates = store.rates
+        lane = store.lane
+        # "" is the unfiltered side, reached from every place
+        any_origin, any_destination = "" in origin_miles, "" in destination_miles
+
+        def scored() -> Iterator[Tuple[float, int, float]]:
+            for r in rows:
+                if not fits(r):
+                    continue
+                o, d, e = lane(r)
+                o_miles = origin_miles.get("" if any_origin else canonical_place(o))
+                d_miles = destination_miles.get("" if any_destination else canonical_place(d))
+                if o_miles is None or d_miles is None:
+                    continue
+                if equipment_key and canonical_equipment(e) != equipment_key:
+                    continue
+                yield rates[r] - deadhead_cost_per_mile * (o_miles + d_miles), r, o_miles
+
+        best = heapq.nsmallest(limit, scored(), key=lambda t: (-t[0], t[1]))
+        return [(r, round(o_miles, 1)) for _, r, o_miles in best]
+
+    def get(self, load_id: str) -> Optional[Load]:
+        i = self._by_id.get(load_id)
+        return None if i is None else self._store.get(i)
+
+
+def _keys(origin: str, destination: str, equipment: str) -> List[BucketKey]:
+    return bucket_keys(canonical_place(origin), canonical_place(destination), canonical_equipment(equipment))
+
+
+def _patch(
+    posting: array,
+    added: Sequence[int],
+    dropped: Sequence[int],
+    rank: Callable[[int], Tuple[float, int]],
+) -> array:
+    """
+    Copy of a rank-ordered posting list with rows inserted/removed.
+
+    Positions are found by bisection and the result is assembled from slices of the
+    old array, so the per-row Python work is O(changes * log n) and the O(n) part is
+    a memcpy.
+    """
+    cuts = []
+    for r in dropped:
+        pos = bisect.bisect_left(posting, rank(r), key=rank)
+        if pos < len(posting) and posting[pos] == r:
+            cuts.append(pos)
+
+    if cuts:
+        kept = array("i")
+        start = 0
+        for pos in sorted(cuts):
+            kept += posting[start:pos]
+            start = pos + 1
+        kept += posting[start:]
+    else:
+        kept = posting
+
+    if not added:
+        return kept
+
+    out = array("i")
+    start = 0
+    for r in sorted(added, key=rank):
+        pos = bisect.bisect_left(kept, rank(r), lo=start, key=rank)
+        out += kept[start:pos]
+        out.append(r)
+        start = pos
+    out += kept[start:]
+    return out
+
+
+def _span(rows: array, times: array, lo: int, hi: int) -> Tuple[int, int]:
+    """Slice of a Schedule array holding the rows timed within [lo, hi]."""
+    key = times.__getitem__
+    return bisect.bisect_left(rows, lo, key=key), bisect.bisect_right(rows, hi, key=key)
+
+
+def _grid(places: Iterable[str]) -> geo.GeoGrid:
+    points = []
+    for place in places:
+        pt = geo.resolve(place)
+        if pt is not None:
+            points.append((place, pt))
+    return geo.GeoGrid(points)
+
+
+def _grids(buckets: Iterable[BucketKey]) -> Tuple[geo.GeoGrid, geo.GeoGrid]:
+    origins = {o for o, d, e in buckets if o and not d and not e}
+    destinations = {d for o, d, e in buckets if d and not o and not e}
+    return _grid(origins), _grid(destinations)
+
+
+def _matchers(buckets: Iterable[BucketKey]) -> Matchers:
+    origins, destinations, equipment = set(), set(), set()
+    for o, d, e in buckets:
+        if o and not d and not e:
+            origins.add(o)
+        elif d and not o and not e:
+            destinations.add(d)
+        elif e and not o and not d:
+            equipment.add(e)
+    return Matchers(PlaceIndex(origins), PlaceIndex(destinations), EquipmentIndex(equipment))
+
+
+def _places(key: str, radius_miles: Optional[float], grid: geo.GeoGrid) -> List[Tuple[str, float]]:
+    """Board location keys to search for the resolved place `key`, each with its distance in miles."""
+    if not key:
+        return [("", 0.0)]
+    if radius_miles:
+        pt = geo.resolve(key)
+        if pt is not None:
+            return grid.within(pt, radius_miles)
+    return [(key, 0.0)]
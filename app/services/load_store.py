@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import math
+from array import array
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+from app.core.fastjson import dumps
+from app.schemas.domain import Load
+
+_NO_INT = -(2 ** 63)
+# epoch seconds of a timestamp that did not parse; sorts before every real time
+NO_TIME = _NO_INT
+
+# materialized Loads kept per compact store; rows are immutable, so no invalidation
+MATERIALIZED_CACHE_SIZE = 4096
+# encoded JSON kept per store (a few hundred bytes each), for search responses
+ENCODED_CACHE_SIZE = 65536
+
+# Load fields kept as codes into a shared string dictionary
+_STR_FIELDS = (
+    "origin",
+    "destination",
+    "pickup_datetime",
+    "delivery_datetime",
+    "equipment_type",
+    "notes",
+    "commodity_type",
+    "dimensions",
+)
+_LOAD_FIELDS = tuple(Load.model_fields)
+
+
+@lru_cache(maxsize=65536)
+def epoch(s: Optional[str]) -> int:
+    """Epoch seconds for an ISO 8601 timestamp, read as UTC when it has no offset."""
+    try:
+        dt = datetime.fromisoformat(s)
+    except (TypeError, ValueError):
+        return NO_TIME
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+class ObjectLoadStore:
+    """Row store that keeps each load as the pydantic Load it arrived as."""
+
+    def __init__(self) -> None:
+        self.json = lru_cache(maxsize=ENCODED_CACHE_SIZE)(self._encode)
+        self._loads: List[Load] = []
+        self.rates = array("d")
+        self.pickup_ts = array("q")
+        self.delivery_ts = array("q")
+
+    def __len__(self) -> int:
+        return len(self._loads)
+
+    def append(self, load: Load) -> int:
+        self._loads.append(load)
+        self.rates.append(float(load.loadboard_rate))
+        self.pickup_ts.append(epoch(load.pickup_datetime))
+        self.delivery_ts.append(epoch(load.delivery_datetime))
+        return len(self._loads) - 1
+
+    def get(self, row: int) -> Load:
+        return self._loads[row]
+
+    def _encode(self, row: int) -> bytes:
+        return self._loads[row].model_dump_json().encode()
+
+    def lane(self, row: int) -> Tuple[str, str, str]:
+        load = self._loads[row]
+        return load.origin, load.destination, load.equipment_type
+
+
+class _StringPool:
+    """Dictionary encoding: each distinct string is stored once and referenced by code."""
+
+    def __init__(self) -> None:
+        self.values: List[Optional[str]] = [None]
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, s: Optional[str]) -> int:
+        if s is None:
+            return 0
+        code = self._codes.get(s)
+        if code is None:
+            code = self._codes[s] = len(self.values)
+            self.values.append(s)
+        return code
+
+
+class CompactLoadStore:
+    """
+    Column store for loads.
+
+    Repeated strings (cities, equipment, commodity, timestamps, notes) are stored once
+    in a shared pool and referenced by uint32 codes; numeric fields are packed into
+    typed arrays with NaN / a sentinel for missing values, and the pickup and
+    delivery timestamps are also kept parsed, as epoch seconds. A Load is only built by
+    get(), when a row leaves the board, and recently built ones are cached. json()
+    encodes a row straight from the columns, without building the Load.
+    """
+
+    def __init__(self) -> None:
+        self.get = lru_cache(maxsize=MATERIALIZED_CACHE_SIZE)(self._materialize)
+        self.json = lru_cache(maxsize=ENCODED_CACHE_SIZE)(self._encode)
+        self._pool = _StringPool()
+        self.load_ids: List[str] = []
+        self._codes: Dict[str, array] = {f: array("I") for f in _STR_FIELDS}
+        self.rates = array("d")
+        self.pickup_ts = array("q")
+        self.delivery_ts = array("q")
+        self._weight = array("d")
+        self._miles = array("d")
+        self._pieces = array("q")
+
+    def __len__(self) -> int:
+        return len(self.load_ids)
+
+    def append(self, load: Load) -> int:
+        encode = self._pool.encode
+        for f in _STR_FIELDS:
+            self._codes[f].append(encode(getattr(load, f)))
+        self.load_ids.append(load.load_id)
+        self.rates.append(float(load.loadboard_rate))
+        self.pickup_ts.append(epoch(load.pickup_datetime))
+        self.delivery_ts.append(epoch(load.delivery_datetime))
+        self._weight.append(math.nan if load.weight is None else float(load.weight))
+        self._miles.append(math.nan if load.miles is None else float(load.miles))
+        self._pieces.append(_NO_INT if load.num_of_pieces is None else int(load.num_of_pieces))
+        return len(self.load_ids) - 1
+
+    def _fields(self, row: int) -> Dict[str, object]:
+        values = self._pool.values
+        codes = self._codes
+        weight, miles, pieces = self._weight[row], self._miles[row], self._pieces[row]
+        numbers = {
+            "load_id": self.load_ids[row],
+            "loadboard_rate": self.rates[row],
+            "weight": None if math.isnan(weight) else weight,
+            "miles": None if math.isnan(miles) else miles,
+            "num_of_pieces": None if pieces == _NO_INT else pieces,
+        }
+        # in Load's field order, so the JSON matches what pydantic would serialize
+        return {f: numbers[f] if f in numbers else values[codes[f][row]] for f in _LOAD_FIELDS}
+
+    def _materialize(self, row: int) -> Load:
+        # validating already-typed values is cheaper than model_construct in pydantic 2
+        return Load.model_validate(self._fields(row))
+
+    def _encode(self, row: int) -> bytes:
+        return dumps(self._fields(row))
+
+    def lane(self, row: int) -> Tuple[str, str, str]:
+        values = self._pool.values
+        codes = self._codes
+        return (
+            values[codes["origin"][row]],
+            values[codes["destination"][row]],
+            values[codes["equipment_type"][row]],
+        )
+
+
+LoadStore = Union[ObjectLoadStore, CompactLoadStore]
+
+STORES: Dict[str, Type[LoadStore]] = {
+    "objects": ObjectLoadStore,
+    "compact": CompactLoadStore,
+}
@@ -1,46 +1,121 @@
 from __future__ import annotations
 
-from typing import List, Optional
+import math
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
 
-from app.core.state import LOADS
+from app.core import state
+from app.core.config import settings
+from app.core.observability import span
 from app.schemas.domain import Load
+from app.services.load_board import EARLIEST, LATEST, TimeWindow
+from app.services.matching import Resolution
 
 
-def _norm(s: Optional[str]) -> str:
-    if not s:
-        return ""
-    return " ".join(s.strip().lower().split())
+def _epoch(dt: Optional[datetime], default: int, rounding) -> int:
+    if dt is None:
+        return default
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(rounding(dt.timestamp()))
 
 
-def _match_field(actual: str, wanted: Optional[str]) -> bool:
-    if wanted is None or wanted == "":
-        return True
-    return _norm(actual) == _norm(wanted)
+def time_window(
+    pickup_after: Optional[datetime] = None,
+    pickup_before: Optional[datetime] = None,
+    delivery_after: Optional[datetime] = None,
+    delivery_before: Optional[datetime] = None,
+) -> Optional[TimeWindow]:
+    """
+    Board window for the requested bounds, starting no earlier than now when
+    HIDE_PAST_PICKUPS is set. Loads with no pickup time are only left out when the
+    caller asked for a window: they may not have passed.
+    """
+    window = TimeWindow(
+        _epoch(pickup_after, EARLIEST, math.ceil),
+        _epoch(pickup_before, LATEST, math.floor),
+        _epoch(delivery_after, EARLIEST, math.ceil),
+        _epoch(delivery_before, LATEST, math.floor),
+    )
+    if window == TimeWindow():
+        if not settings.hide_past_pickups:
+            return None
+        return window._replace(pickup_from=int(time.time()), untimed=True)
+    if settings.hide_past_pickups:
+        window = window._replace(pickup_from=max(window.pickup_from, int(time.time())))
+    return window
 
 
-def search(origin: Optional[str], destination: Optional[str], equipment: Optional[str], limit: int) -> List[Load]:
-    origin = origin or None
-    destination = destination or None
-    equipment = (equipment or "").strip().lower() or None
+def search(
+    origin: Optional[str],
+    destination: Optional[str],
+    equipment: Optional[str],
+    limit: int,
+    window: Optional[TimeWindow] = None,
+) -> List[Load]:
+    with span("load_search_seconds"):
+        return state.BOARD.search(origin, destination, equipment, max(1, int(limit or 1)), window)
 
-    results: List[Load] = []
-    for load in LOADS:
-        if not _match_field(load.origin, origin):
-            continue
-        if not _match_field(load.destination, destination):
-            continue
-        if equipment and _norm(load.equipment_type) != _norm(equipment):
-            continue
-        results.append(load)
 
-    results.sort(key=lambda l: float(l.loadboard_rate), reverse=True)
+def search_nearby(
+    origin: Optional[str],
+    destination: Optional[str],
+    equipment: Optional[str],
+    origin_radius_miles: Optional[float],
+    destination_radius_miles: Optional[float],
+    limit: int,
+    window: Optional[TimeWindow] = None,
+) -> List[Tuple[Load, float]]:
+    with span("load_search_seconds"):
+        return state.BOARD.search_nearby(
+            origin,
+            destination,
+            equipment,
+            origin_radius_miles,
+            destination_radius_miles,
+            max(1, int(limit or 1)),
+            settings.deadhead_cost_per_mile,
+            window,
+        )
 
-    return results[: max(1, int(limit or 1))]
+
+def search_json(
+    origin: Optional[str],
+    destination: Optional[str],
+    equipment: Optional[str],
+    limit: int,
+    window: Optional[TimeWindow] = None,
+) -> Tuple[List[bytes], Resolution]:
+    with span("load_search_seconds"):
+        return state.BOARD.search_json(origin, destination, equipment, max(1, int(limit or 1)), window)
+
+
+def search_nearby_json(
+    origin: Optional[str],
+    destination: Optional[str],
+    equipment: Optional[str],
+    origin_radius_miles: Optional[float],
+    destination_radius_miles: Optional[float],
+    limit: int,
+    window: Optional[TimeWindow] = None,
+) -> Tuple[List[Tuple[bytes, float]], Resolution]:
+    with span("load_search_seconds"):
+        return state.BOARD.search_nearby_json(
+            origin,
+            destination,
+            equipment,
+            origin_radius_miles,
+            destination_radius_miles,
+            max(1, int(limit or 1)),
+            settings.deadhead_cost_per_mile,
+            window,
+        )
 
 
 def get_by_id(load_id: str) -> Load:
-    for l in LOADS:
-        if l.load_id == load_id:
-            return l
-    raise HTTPException(status_code=404, detail=f"Load not found: {load_id}")
+    load = state.BOARD.get(load_id)
+    if load is None:
+        raise HTTPException(status_code=404, detail=f"Load not found: {load_id}")
+    return load
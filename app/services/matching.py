@@ -0,0 +1,247 @@
+"""
+Location and equipment matching for spoken / typed search terms.
+
+canonical_place() and canonical_equipment() rewrite a term into the form loads are
+indexed under ("atlanta, ga", "dry van"): state names to abbreviations, common city
+shorthands ("ATL", "NYC"), "St"/"Saint", equipment spellings and synonyms. Terms
+still not on the board go to a TrigramIndex over the board's distinct places and
+equipment types, which only scores entries sharing a trigram with the term, so a
+typo costs a few dict lookups however many loads the board holds.
+"""
+from __future__ import annotations
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "district of columbia": "dc",
+    "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il",
+    "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la",
+    "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny",
+    "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or",
+    "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc", "south dakota": "sd",
+    "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va",
+    "washington": "wa", "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+}
+STATE_CODES = set(STATES.values())
+
+# shorthands callers use for a market; airport codes mostly
+CITY_ALIASES = {
+    "atl": "atlanta, ga",
+    "nyc": "new york, ny",
+    "la": "los angeles, ca",
+    "lax": "los angeles, ca",
+    "sf": "san francisco, ca",
+    "san fran": "san francisco, ca",
+    "dfw": "dallas, tx",
+    "chi": "chicago, il",
+    "chi town": "chicago, il",
+    "ord": "chicago, il",
+    "phx": "phoenix, az",
+    "slc": "salt lake city, ut",
+    "okc": "oklahoma city, ok",
+    "kc": "kansas city, mo",
+    "stl": "st. louis, mo",
+    "philly": "philadelphia, pa",
+    "vegas": "las vegas, nv",
+    "nola": "new orleans, la",
+    "jax": "jacksonville, fl",
+    "indy": "indianapolis, in",
+    "msp": "minneapolis, mn",
+    "pdx": "portland, or",
+    "den": "denver, co",
+    "mia": "miami, fl",
+    "hou": "houston, tx",
+    "iah": "houston, tx",
+    "bos": "boston, ma",
+}
+
+EQUIPMENT_SYNONYMS = {
+    "van": "dry van",
+    "dryvan": "dry van",
+    "dv": "dry van",
+    "v": "dry van",
+    "reefer": "reefer",
+    "refer": "reefer",
+    "refrigerated": "reefer",
+    "refrigerated van": "reefer",
+    "temp controlled": "reefer",
+    "r": "reefer",
+    "flat bed": "flatbed",
+    "flat": "flatbed",
+    "fb": "flatbed",
+    "f": "flatbed",
+    "stepdeck": "step deck",
+    "drop deck": "step deck",
+    "sd": "step deck",
+}
+# words that say nothing about the equipment type
+_EQUIPMENT_FILLER = {"trailer", "truck", "load", "loads"}
+
+_SEPARATORS = re.compile(r"[\s_\-/]+")
+_CITY_PREFIXES = (("saint ", "st. "), ("st ", "st. "), ("ft ", "fort "), ("ft. ", "fort "), ("mt ", "mount "), ("mt. ", "mount "))
+
+
+def _words(s: str) -> str:
+    return " ".join(s.strip().lower().split())
+
+
+@lru_cache(maxsize=65536)
+def canonical_equipment(raw: Optional[str]) -> str:
+    if not raw:
+        return ""
+    s = " ".join(w for w in _SEPARATORS.sub(" ", raw.lower()).split() if w not in _EQUIPMENT_FILLER)
+    return EQUIPMENT_SYNONYMS.get(s, s)
+
+
+def _city(city: str) -> str:
+    for prefix, replacement in _CITY_PREFIXES:
+        if city.startswith(prefix):
+            return replacement + city[len(prefix):]
+    return city
+
+
+def split_place(raw: Optional[str]) -> Tuple[str, str]:
+    """(city, two-letter state or "") from "City, ST", "City ST", "City State" or a bare city."""
+    s = _words(raw or "").rstrip(".")
+    if not s:
+        return "", ""
+    if "," in s:
+        city, _, state = s.rpartition(",")
+        state = state.strip().rstrip(".")
+        return _city(city.strip()), STATES.get(state, state)
+    words = s.split()
+    for n in (3, 2, 1):
+        if len(words) > n:
+            tail = " ".join(words[-n:])
+            state = STATES.get(tail) or (tail if n == 1 and tail in STATE_CODES else None)
+            if state:
+                return _city(" ".join(words[:-n])), state
+    return _city(s), ""
+
+
+@lru_cache(maxsize=65536)
+def canonical_place(raw: Optional[str]) -> str:
+    """Board key for a place: "city, st", or just "city" when no state was given."""
+    s = _words(raw or "")
+    alias = CITY_ALIASES.get(s.rstrip("."))
+    if alias:
+        return alias
+    city, state = split_place(s)
+    return f"{city}, {state}" if state else city
+
+
+def trigrams(s: str) -> Set[str]:
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class TrigramIndex:
+    """
+    Strings by trigram (padded, as in pg_trgm). lookup() counts shared trigrams only
+    for strings found in the query's posting lists and scores them by the Dice
+    coefficient 2 |A & B| / (|A| + |B|): 1.0 for identical trigram sets.
+    """
+
+    def __init__(self, items: Iterable[str]) -> None:
+        self.items: List[str] = sorted(set(items))
+        self._sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        for i, item in enumerate(self.items):
+            grams = trigrams(item)
+            self._sizes.append(len(grams))
+            for g in grams:
+                self._postings.setdefault(g, []).append(i)
+
+    def lookup(self, query: str, min_score: float) -> List[Tuple[str, float]]:
+        grams = trigrams(query)
+        shared: Counter = Counter()
+        for g in grams:
+            shared.update(self._postings.get(g, ()))
+        out = []
+        for i, n in shared.items():
+            score = 2 * n / (len(grams) + self._sizes[i])
+            if score >= min_score:
+                out.append((self.items[i], score))
+        out.sort(key=lambda t: (-t[1], t[0]))
+        return out
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class Match(NamedTuple):
+    key: str  # board key searched for; "" for no filter
+    score: float  # 1.0 when the canonical term is on the board
+
+
+class PlaceIndex:
+    """A board's distinct places ("city, st" keys), searchable by city with typos."""
+
+    def __init__(self, places: Iterable[str]) -> None:
+        self.places = set(places)
+        self._by_city: Dict[str, List[str]] = {}
+        for place in self.places:
+            city, _, state = place.rpartition(", ")
+            self._by_city.setdefault(city or place, []).append(place)
+        self._cities = TrigramIndex(self._by_city)
+
+    def match(self, raw: Optional[str], min_score: float, weight: Callable[[str], int]) -> Match:
+        key = canonical_place(raw)
+        if not key or key in self.places:
+            return Match(key, 1.0)
+        city, state = split_place(key)
+        best: Optional[Tuple[float, int, str]] = None
+        for candidate, score in self._cities.lookup(city, min_score):
+            if best is not None and score < best[0]:
+                break
+            for place in self._by_city[candidate]:
+                if state and not place.endswith(f", {state}"):
+                    continue
+                # equal scores (a bare "portland"): the place with more loads
+                ranked = (score, weight(place), place)
+                if best is None or ranked[:2] > best[:2]:
+                    best = ranked
+        if best is None:
+            return Match(key, 0.0)
+        return Match(best[2], round(best[0], 3))
+
+
+class EquipmentIndex:
+    def __init__(self, types: Iterable[str]) -> None:
+        self.types = set(types)
+        self._index = TrigramIndex(self.types)
+
+    def match(self, raw: Optional[str], min_score: float) -> Match:
+        key = canonical_equipment(raw)
+        if not key or key in self.types:
+            return Match(key, 1.0)
+        found = self._index.lookup(key, min_score)
+        if not found:
+            return Match(key, 0.0)
+        return Match(found[0][0], round(found[0][1], 3))
+
+
+class Resolution(NamedTuple):
+    """Board keys a search was run with, and how well the caller's terms matched them."""
+
+    origin: str
+    destination: str
+    equipment: str
+    score: float  # product of the per-term scores
+    rewritten: Dict[str, str]  # term -> key, for terms that were not already in board form
+
+
+def resolution(terms: Dict[str, Optional[str]], matches: Dict[str, Match], normalize: Callable[[Optional[str]], str]) -> Resolution:
+    score = 1.0
+    rewritten = {}
+    for name, m in matches.items():
+        score *= m.score
+        if m.key and m.key != normalize(terms[name]):
+            rewritten[name] = m.key
+    return Resolution(matches["origin"].key, matches["destination"].key, matches["equipment"].key, round(score, 3), rewritten)
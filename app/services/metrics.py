@@ -1,16 +1,23 @@
 from __future__ import annotations
 
-from app.core.state import LOCK, METRICS
+from typing import Dict
+
+from app.core.state import METRICS, metrics_snapshot
 from app.schemas.api import MetricsOverview
 
 
 def overview() -> MetricsOverview:
-    with LOCK:
-        return MetricsOverview(
-            calls_started=METRICS.calls_started,
-            calls_ended=METRICS.calls_ended,
-            negotiations_started=METRICS.negotiations_started,
-            negotiations_accepted=METRICS.negotiations_accepted,
-            negotiations_declined=METRICS.negotiations_declined,
-            average_rounds_completed=round(METRICS.avg_rounds(), 2),
-        )
+    m = metrics_snapshot()
+    return MetricsOverview(
+        calls_started=m.calls_started,
+        calls_ended=m.calls_ended,
+        negotiations_started=m.negotiations_started,
+        negotiations_accepted=m.negotiations_accepted,
+        negotiations_declined=m.negotiations_declined,
+        average_rounds_completed=round(m.avg_rounds(), 2),
+    )
+
+
+def latency() -> Dict[str, dict]:
+    """Latency histograms (counts, cumulative buckets, p50 / p90 / p99) by name."""
+    return METRICS.histograms()
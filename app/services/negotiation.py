@@ -1,26 +1,42 @@
 from __future__ import annotations
 
-from typing import Optional, Tuple, Literal
+from typing import Callable, Optional, Tuple, Literal, TypeVar
 
 from fastapi import HTTPException
 
-from app.core.state import LOCK, NEGOTIATIONS, METRICS, now_ts
+from app.core.observability import span
+from app.core.state import METRICS, now_ts
 from app.schemas.domain import NegotiationPolicy, NegotiationState, Load
+from app.schemas.negotiation import PolicyParams
+from app.services import state_store
 
 Decision = Literal["accept", "counter", "decline"]
 MAX_NEGOTIATION_ROUNDS = 3
+# compare-and-set attempts before a transition gives up on a call that keeps changing
+CAS_RETRIES = 8
 
+T = TypeVar("T")
 
-def make_policy(load_rate: float) -> NegotiationPolicy:
+
+DEFAULT_POLICY = PolicyParams(max_rounds=MAX_NEGOTIATION_ROUNDS)
+
+
+def make_policy(load_rate: float, params: PolicyParams = DEFAULT_POLICY) -> NegotiationPolicy:
     target = float(load_rate)
     return NegotiationPolicy(
         target=target,
-        min=round(target * 0.90, 2),
-        max=round(target * 1.10, 2),
-        max_rounds=MAX_NEGOTIATION_ROUNDS,
+        min=round(target * (1 - params.band_low), 2),
+        max=round(target * (1 + params.band_high), 2),
+        max_rounds=params.max_rounds,
+        concession_start=params.concession_start,
+        concession_step=params.concession_step,
     )
 
 
+def concession(policy: NegotiationPolicy, round_num: int) -> float:
+    return min(1.0, policy.concession_start + policy.concession_step * (round_num - 1))
+
+
 def decide(policy: NegotiationPolicy, carrier_offer: float, round_num: int) -> Tuple[Decision, Optional[float]]:
     offer = float(carrier_offer)
 
@@ -30,36 +46,26 @@ def decide(policy: NegotiationPolicy, carrier_offer: float, round_num: int) -> T
     if round_num > policy.max_rounds:
         return "decline", None
 
-    if round_num == 1:
-        counter = policy.target + 0.25 * (offer - policy.target)
-    elif round_num == 2:
-        counter = policy.target + 0.5 * (offer - policy.target)
-    else:
-        counter = policy.target + 0.75 * (offer - policy.target)
+    counter = policy.target + concession(policy, round_num) * (offer - policy.target)
 
     counter = max(policy.min, min(policy.max, counter))
     return "counter", round(counter, 2)
 
 
-def start(
-    call_id: Optional[str],
+def _new_state(
+    call_id: str,
     load: Load,
     mc_number: Optional[str],
     carrier_initial_offer: float,
 ) -> Tuple[NegotiationState, Decision, Optional[float]]:
-    """
-    Creates negotiation state for round 1 AND computes the round-1 decision.
-    Returns: (state, decision, counter_offer)
-    """
     policy = make_policy(load.loadboard_rate)
-    if not call_id:
-        raise HTTPException(status_code=400, detail="call_id is required for step-based negotiation")
-
-    decision, counter_offer = decide(policy, carrier_initial_offer, 1)
+    with span("negotiation_decide_seconds"):
+        decision, counter_offer = decide(policy, carrier_initial_offer, 1)
 
     st = NegotiationState(
         call_id=call_id,
-        load=load,
+        load_id=load.load_id,
+        loadboard_rate=load.loadboard_rate,
         mc_number=mc_number,
         status="in_progress",
         round=1,
@@ -69,85 +75,166 @@ def start(
         final_rate=None,
         created_at=now_ts(),
     )
+    return st, decision, counter_offer
 
-    with LOCK:
-        NEGOTIATIONS[call_id] = st
-        METRICS.negotiations_started += 1
-
-        if decision == "decline":
-            st.status = "declined"
-            METRICS.negotiations_declined += 1
-            METRICS.completed_rounds_total += st.round
-            METRICS.completed_count += 1
 
-    return st, decision, counter_offer
+def _count_completion(st: NegotiationState) -> None:
+    METRICS.add("negotiations_accepted" if st.status == "accepted" else "negotiations_declined")
+    METRICS.add("completed_rounds_total", st.round)
+    METRICS.add("completed_count")
 
 
-def get(call_id: str) -> NegotiationState:
-    with LOCK:
-        st = NEGOTIATIONS.get(call_id)
+def _open(st: Optional[NegotiationState]) -> NegotiationState:
     if not st:
         raise HTTPException(status_code=404, detail="Negotiation not found")
+    if st.status != "in_progress":
+        raise HTTPException(status_code=409, detail=f"Negotiation already {st.status}")
     return st
 
 
-def counter(call_id: str, carrier_offer: float) -> Tuple[NegotiationState, Decision, Optional[float]]:
-    with LOCK:
-        st = NEGOTIATIONS.get(call_id)
-        if not st:
-            raise HTTPException(status_code=404, detail="Negotiation not found")
-        if st.status != "in_progress":
-            raise HTTPException(status_code=409, detail=f"Negotiation already {st.status}")
+# Transitions work on a copy read from the state store and are published with a
+# compare-and-set on (round, status); a lost race re-reads and tries again. Metrics
+# are only counted for the attempt that wins.
 
-        st.round += 1
-        st.last_carrier_offer = float(carrier_offer)
+def _started(
+    call_id: str,
+    load: Load,
+    mc_number: Optional[str],
+    carrier_initial_offer: float,
+) -> Tuple[NegotiationState, Decision, Optional[float]]:
+    st, decision, counter_offer = _new_state(call_id, load, mc_number, carrier_initial_offer)
+    if decision == "decline":
+        st.status = "declined"
+    return st, decision, counter_offer
+
+
+def _countered(st: NegotiationState, carrier_offer: float) -> Tuple[NegotiationState, Decision, Optional[float]]:
+    st.round += 1
+    st.last_carrier_offer = float(carrier_offer)
 
+    with span("negotiation_decide_seconds"):
         decision, counter_offer = decide(st.policy, carrier_offer, st.round)
-        st.last_counter_offer = counter_offer
+    st.last_counter_offer = counter_offer
 
-        if decision == "decline":
-            st.status = "declined"
-            METRICS.negotiations_declined += 1
-            METRICS.completed_rounds_total += st.round
-            METRICS.completed_count += 1
+    if decision == "decline":
+        st.status = "declined"
+    return st, decision, counter_offer
 
-        return st, decision, counter_offer
 
+def _accepted(st: NegotiationState, final_rate: float) -> NegotiationState:
+    st.final_rate = float(final_rate)
+    st.status = "accepted"
+    return st
 
-def accept(call_id: str, final_rate: float) -> NegotiationState:
-    with LOCK:
-        st = NEGOTIATIONS.get(call_id)
-        if not st:
-            raise HTTPException(status_code=404, detail="Negotiation not found")
-        if st.status != "in_progress":
-            raise HTTPException(status_code=409, detail=f"Negotiation already {st.status}")
 
-        st.status = "accepted"
-        st.final_rate = float(final_rate)
+def _create(st: NegotiationState) -> bool:
+    if not state_store.STORE.create_negotiation(st):
+        return False
+    METRICS.add("negotiations_started")
+    if st.status != "in_progress":
+        _count_completion(st)
+    return True
 
-        METRICS.negotiations_accepted += 1
-        METRICS.completed_rounds_total += st.round
-        METRICS.completed_count += 1
 
-        return st
+def _publish(st: NegotiationState, expected_round: int) -> bool:
+    if not state_store.STORE.cas_negotiation(st, expected_round):
+        return False
+    if st.status != "in_progress":
+        _count_completion(st)
+    return True
 
 
-def decline(call_id: str, reason: str) -> NegotiationState:
-    with LOCK:
-        st = NEGOTIATIONS.get(call_id)
-        if not st:
-            raise HTTPException(status_code=404, detail="Negotiation not found")
-        if st.status != "in_progress":
-            raise HTTPException(status_code=409, detail=f"Negotiation already {st.status}")
+def _conflict() -> HTTPException:
+    return HTTPException(status_code=409, detail="Negotiation is being updated concurrently; retry")
+
+
+def _transition(call_id: str, fn: Callable[[NegotiationState], Tuple[NegotiationState, T]]) -> T:
+    for _ in range(CAS_RETRIES):
+        st = _open(state_store.STORE.get_negotiation(call_id))
+        expected_round = st.round
+        st, result = fn(st)
+        if _publish(st, expected_round):
+            return result
+    raise _conflict()
 
+
+def start(
+    call_id: Optional[str],
+    load: Load,
+    mc_number: Optional[str],
+    carrier_initial_offer: float,
+) -> Tuple[NegotiationState, Decision, Optional[float]]:
+    """
+    Creates negotiation state for round 1 AND computes the round-1 decision.
+    Returns: (state, decision, counter_offer)
+    """
+    if not call_id:
+        raise HTTPException(status_code=400, detail="call_id is required for step-based negotiation")
+
+    st, decision, counter_offer = _started(call_id, load, mc_number, carrier_initial_offer)
+    if not _create(st):
+        raise HTTPException(status_code=409, detail="Negotiation already started")
+    return st, decision, counter_offer
+
+
+def step(
+    call_id: str,
+    load: Load,
+    mc_number: Optional[str],
+    carrier_offer: float,
+) -> Tuple[NegotiationState, Decision, Optional[float]]:
+    """
+    One negotiation step as a single atomic transition: start the negotiation on the
+    first offer, otherwise counter, and accept when the offer lands inside the policy
+    band. Safe across worker processes with a shared state backend.
+    """
+    for _ in range(CAS_RETRIES):
+        current = state_store.STORE.get_negotiation(call_id)
+        if current is None:
+            st, decision, counter_offer = _started(call_id, load, mc_number, carrier_offer)
+        else:
+            expected_round = _open(current).round
+            st, decision, counter_offer = _countered(current, carrier_offer)
+
+        if decision == "accept":
+            st = _accepted(st, carrier_offer)
+            counter_offer = None
+
+        if _create(st) if current is None else _publish(st, expected_round):
+            return st, decision, counter_offer
+    raise _conflict()
+
+
+def get(call_id: str) -> NegotiationState:
+    st = state_store.STORE.get_negotiation(call_id)
+    if not st:
+        raise HTTPException(status_code=404, detail="Negotiation not found")
+    return st
+
+
+def counter(call_id: str, carrier_offer: float) -> Tuple[NegotiationState, Decision, Optional[float]]:
+    def fn(st: NegotiationState):
+        result = _countered(st, carrier_offer)
+        return result[0], result
+
+    return _transition(call_id, fn)
+
+
+def accept(call_id: str, final_rate: float) -> NegotiationState:
+    def fn(st: NegotiationState):
+        st = _accepted(st, final_rate)
+        return st, st
+
+    return _transition(call_id, fn)
+
+
+def decline(call_id: str, reason: str) -> NegotiationState:
+    def fn(st: NegotiationState):
         st.status = "declined"
-        METRICS.negotiations_declined += 1
-        METRICS.completed_rounds_total += st.round
-        METRICS.completed_count += 1
+        return st, st
 
-        return st
+    return _transition(call_id, fn)
 
 
 def exists(call_id: str) -> bool:
-    with LOCK:
-        return call_id in NEGOTIATIONS
+    return state_store.STORE.get_negotiation(call_id) is not None
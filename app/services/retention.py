@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import select
+
+import app.db as db
+from app.core.config import settings
+from app.models import CallRecord
+from app.schemas.api import StateRetentionStatus
+from app.schemas.domain import CallState
+from app.services import call_store, state_store
+
+logger = logging.getLogger(__name__)
+
+# call_ids per IN (...) lookup when archiving
+ARCHIVE_CHUNK = 500
+
+
+def archive_calls(calls: List[CallState]) -> None:
+    """
+    Make sure each ended call has its row in the calls table before its state is dropped.
+
+    The row is normally written when the call ends; this re-submits the dashboard
+    record kept in the call's summary for any call whose write never landed.
+    Without a database there is nothing to archive to.
+    """
+    if db.SessionLocal is None:
+        return
+    for i in range(0, len(calls), ARCHIVE_CHUNK):
+        chunk = calls[i:i + ARCHIVE_CHUNK]
+        with db.SessionLocal() as session:
+            stmt = select(CallRecord.call_id).where(CallRecord.call_id.in_([c.call_id for c in chunk]))
+            present = set(session.execute(stmt).scalars())
+        for c in chunk:
+            record = c.summary.get("dashboard") if isinstance(c.summary, dict) else None
+            if c.call_id not in present and isinstance(record, dict):
+                call_store.submit_call_record(record, call_store.summary_text(c.summary))
+
+
+class StateSweeper:
+    """
+    Background thread that applies the retention settings to the state store:
+    TTL expiry, the memory budget and tombstone expiry, archiving ended calls first.
+    Keeps all of it off the request path.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.sweeps = 0
+        self.sweep_errors = 0
+        self.last_sweep_ms = 0.0
+        self.totals = dict.fromkeys(state_store.SWEEP_COUNTS, 0)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="state-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep_once()
+            except Exception as e:
+                self.sweep_errors += 1
+                logger.exception("sweep failed: %s", e)
+
+    def sweep_once(self) -> dict:
+        t0 = time.perf_counter()
+        counts = state_store.STORE.sweep(
+            time.time(),
+            finished_ttl=settings.state_finished_ttl_seconds,
+            idle_ttl=settings.state_idle_ttl_seconds,
+            tombstone_ttl=settings.state_tombstone_ttl_seconds,
+            max_bytes=settings.state_max_bytes,
+            archive=archive_calls,
+        )
+        self.last_sweep_ms = round((time.perf_counter() - t0) * 1e3, 3)
+        self.sweeps += 1
+        for name, n in counts.items():
+            self.totals[name] += n
+        return counts
+
+    def status(self) -> StateRetentionStatus:
+        store = state_store.STORE
+        return StateRetentionStatus(
+            backend=store.name,
+            max_bytes=settings.state_max_bytes if store.name == "memory" else 0,
+            sweeps=self.sweeps,
+            sweep_errors=self.sweep_errors,
+            last_sweep_ms=self.last_sweep_ms,
+            **store.gauges(),
+            **self.totals,
+        )
+
+
+SWEEPER: Optional[StateSweeper] = None
+
+
+def start_sweeper(interval: float) -> None:
+    global SWEEPER
+    if SWEEPER is None:
+        SWEEPER = StateSweeper(interval)
+        SWEEPER.start()
+
+
+def stop_sweeper() -> None:
+    global SWEEPER
+    if SWEEPER is not None:
+        SWEEPER.stop()
+        SWEEPER = None
@@ -0,0 +1,215 @@
+"""
+Dashboard rollups: additive aggregates of the `calls` table per (day, outcome,
+sentiment), plus an all-time row set under day = ALL_DAYS.
+
+call_store applies each call's contribution in the same transaction as its upsert
+(retracting the previous contribution on re-upsert), and bumps the shared data
+version dashboard snapshots are cached against. `rebuild()` recomputes the
+table from `calls` in bulk:
+
+    DATABASE_URL=... python -m app.services.rollups rebuild
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+import app.db as db
+from app.models import CallRecord, CallRollup, DataEvent, DataVersion
+
+ALL_DAYS = -1
+SECONDS_PER_DAY = 86400
+
+FIELDS = (
+    "calls",
+    "verified_known",
+    "verified_true",
+    "accepted",
+    "transferred",
+    "rounds_sum",
+    "rounds_count",
+    "delta_sum",
+    "delta_count",
+)
+
+# calls columns a contribution is computed from
+SOURCE_COLUMNS = (
+    CallRecord.ended_at,
+    CallRecord.outcome,
+    CallRecord.sentiment,
+    CallRecord.verified,
+    CallRecord.agreed,
+    CallRecord.transfer_to_rep,
+    CallRecord.rounds,
+    CallRecord.final_offer,
+    CallRecord.loadboard_rate,
+)
+
+RollupKey = Tuple[int, str, str]
+
+
+def _contribution(rec: dict) -> Dict[RollupKey, List[float]]:
+    rounds = rec.get("rounds")
+    final_offer = rec.get("final_offer")
+    loadboard_rate = rec.get("loadboard_rate")
+    has_delta = final_offer is not None and loadboard_rate is not None
+
+    vec = [
+        1,
+        int(rec.get("verified") is not None),
+        int(rec.get("verified") is True),
+        int(rec.get("outcome") == "ACCEPTED" or rec.get("agreed") is True),
+        int(rec.get("transfer_to_rep") is True),
+        int(rounds) if rounds is not None else 0,
+        int(rounds is not None),
+        float(final_offer) - float(loadboard_rate) if has_delta else 0.0,
+        int(has_delta),
+    ]
+
+    outcome = rec.get("outcome") or "UNKNOWN"
+    sentiment = rec.get("sentiment") or "Unknown"
+    out = {(ALL_DAYS, outcome, sentiment): vec}
+    if rec.get("ended_at") is not None:
+        out[(int(rec["ended_at"]) // SECONDS_PER_DAY, outcome, sentiment)] = vec
+    return out
+
+
+def net_change(pairs: Iterable[Tuple[Optional[dict], Optional[dict]]]) -> Dict[RollupKey, List[float]]:
+    """Summed effect of replacing each `old` call row by its `new` one (None for absent)."""
+    net: Dict[RollupKey, List[float]] = {}
+    for old, new in pairs:
+        for rec, sign in ((old, -1), (new, 1)):
+            if rec is None:
+                continue
+            for key, vec in _contribution(rec).items():
+                acc = net.setdefault(key, [0] * len(FIELDS))
+                for i, v in enumerate(vec):
+                    acc[i] += sign * v
+    return net
+
+
+def combine(nets: Iterable[Dict[RollupKey, List[float]]]) -> Dict[RollupKey, List[float]]:
+    total: Dict[RollupKey, List[float]] = {}
+    for net in nets:
+        for key, vec in net.items():
+            acc = total.setdefault(key, [0] * len(FIELDS))
+            for i, v in enumerate(vec):
+                acc[i] += v
+    return total
+
+
+def apply(session: Session, old: Optional[dict], new: Optional[dict]) -> Dict[RollupKey, List[float]]:
+    """Retract `old`'s contribution and add `new`'s; returns the net change."""
+    net = net_change([(old, new)])
+    apply_net(session, net)
+    return net
+
+
+def apply_net(session: Session, net: Dict[RollupKey, List[float]]) -> None:
+    """Add a net change to the rollup rows as one multi-row upsert."""
+    rows = [
+        {"day": day, "outcome": outcome, "sentiment": sentiment, **dict(zip(FIELDS, acc))}
+        for (day, outcome, sentiment), acc in net.items()
+        if any(acc)
+    ]
+    if not rows:
+        return
+
+    t = CallRollup.__table__
+    stmt = db.insert_for(t)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[t.c.day, t.c.outcome, t.c.sentiment],
+        set_={f: t.c[f] + stmt.excluded[f] for f in FIELDS},
+    )
+    session.connection().execute(stmt, rows)
+
+
+def bump_version(session: Session, event: Optional[str] = None) -> int:
+    """
+    Advance the data version inside the caller's write transaction, logging `event`
+    (JSON, or None for "reload everything") under it. The row lock this takes is
+    held to commit, so versions follow commit order across workers.
+    """
+    t = DataVersion.__table__
+    conn = session.connection()
+    stmt = update(t).where(t.c.id == 1).values(version=t.c.version + 1).returning(t.c.version)
+    version = conn.execute(stmt).scalar()
+    if version is None:
+        conn.execute(db.insert_for(t).on_conflict_do_nothing(index_elements=[t.c.id]), {"id": 1, "version": 0})
+        version = conn.execute(stmt).scalar_one()
+    conn.execute(insert(DataEvent.__table__), {"version": version, "data": event})
+    return version
+
+
+def current_version(session: Session) -> int:
+    return session.execute(select(DataVersion.version).where(DataVersion.id == 1)).scalar() or 0
+
+
+def _aggregate_select(day_expr):
+    c = CallRecord
+
+    def count_if(cond):
+        return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+    outcome = func.coalesce(func.nullif(c.outcome, ""), "UNKNOWN")
+    sentiment = func.coalesce(func.nullif(c.sentiment, ""), "Unknown")
+    delta = c.final_offer - c.loadboard_rate
+
+    return select(
+        day_expr,
+        outcome,
+        sentiment,
+        func.count(),
+        func.count(c.verified),
+        count_if(c.verified.is_(True)),
+        count_if((c.outcome == "ACCEPTED") | c.agreed.is_(True)),
+        count_if(c.transfer_to_rep.is_(True)),
+        func.coalesce(func.sum(c.rounds), 0),
+        func.count(c.rounds),
+        func.coalesce(func.sum(delta), 0.0),
+        func.count(delta),
+    ).group_by(day_expr, outcome, sentiment)
+
+
+def rebuild() -> None:
+    """Recompute every rollup row from `calls` with two INSERT ... SELECT ... GROUP BY."""
+    db.require_db()
+
+    columns = ["day", "outcome", "sentiment", *FIELDS]
+    per_day = _aggregate_select(CallRecord.ended_at // SECONDS_PER_DAY).where(CallRecord.ended_at.is_not(None))
+    all_time = _aggregate_select(literal(ALL_DAYS))
+
+    with db.WriteSessionLocal() as session:
+        session.execute(delete(CallRollup))
+        session.execute(insert(CallRollup).from_select(columns, per_day))
+        session.execute(insert(CallRollup).from_select(columns, all_time))
+        bump_version(session)
+        session.commit()
+
+
+def ensure_built() -> None:
+    """Populate rollups once for a database that has calls but no rollups yet."""
+    if db.SessionLocal is None:
+        return
+    with db.SessionLocal() as session:
+        has_rollups = session.execute(select(CallRollup.day).limit(1)).first() is not None
+        has_calls = session.execute(select(CallRecord.call_id).limit(1)).first() is not None
+    if has_calls and not has_rollups:
+        rebuild()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    db.init_db()
+    rebuild()
+    print("[rollups] rebuilt call_rollups from calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import create_engine, delete, func, or_, select, update
+
+import app.db as db
+from app.core.concurrency import StripedLocks
+from app.core.config import settings
+from app.schemas.domain import CallState, NegotiationState
+
+logger = logging.getLogger(__name__)
+
+
+Archive = Callable[[List[CallState]], None]
+SWEEP_COUNTS = ("expired", "evicted", "archived", "tombstones_expired")
+# ended calls handed to the archive and deleted per SQL sweep
+SQL_SWEEP_BATCH = 1000
+
+
+class _Entries:
+    """
+    One kind of per-call state: live objects, the tombstones evicted ones leave
+    behind, and the bookkeeping for LRU eviction.
+
+    A tombstone is the state as JSON without its bulky parts, kept until it expires;
+    reads fall back to it, so an evicted call still answers retries the same way.
+    """
+
+    def __init__(self, model) -> None:
+        self.model = model
+        self.live: Dict[str, BaseModel] = {}
+        self.tombstones: Dict[str, Tuple[float, str]] = {}  # call_id -> (expires_at, JSON)
+        # call_id -> last read or write; plain dict stores, so reads stay lock-free
+        self.touched: Dict[str, float] = {}
+        # call_id -> (id of the object sized, estimated bytes); filled in by the sweeper
+        self.sizes: Dict[str, Tuple[int, int]] = {}
+
+    def get(self, call_id: str):
+        st = self.live.get(call_id)
+        if st is not None:
+            self.touched[call_id] = time.time()
+            return st.model_copy()
+        dead = self.tombstones.get(call_id)
+        return self.model.model_validate_json(dead[1]) if dead is not None else None
+
+    def put(self, st) -> None:
+        self.live[st.call_id] = st
+        self.touched[st.call_id] = time.time()
+
+    def size(self, call_id: str, st) -> int:
+        sized = self.sizes.get(call_id)
+        if sized is None or sized[0] != id(st):
+            # stored objects are replaced, never changed, so a new object means a new size
+            sized = self.sizes[call_id] = (id(st), len(st.model_dump_json()))
+        return sized[1]
+
+    def remove(self, call_id: str) -> None:
+        del self.live[call_id]
+        self.touched.pop(call_id, None)
+        self.sizes.pop(call_id, None)
+
+
+def _tombstone(st) -> str:
+    if isinstance(st, CallState):
+        # the webhook summary (transcripts included) lives on in the calls table
+        st = st.model_copy(update={"summary": {}, "metadata": {}})
+    return st.model_dump_json()
+
+
+class MemoryStateStore:
+    """
+    Per-call state in process-local dicts, each call_id guarded by its lock stripe.
+
+    Fastest, but only correct with a single worker process: another worker never
+    sees these entries. Stored objects are never changed in place; readers get a
+    shallow copy to modify and hand back.
+
+    sweep() bounds memory: finished negotiations and ended calls become tombstones
+    after a TTL, or sooner, least recently used first, while the estimated size is
+    over budget. Live negotiations are only dropped once idle for idle_ttl.
+    """
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self._locks = StripedLocks(64)
+        self._negotiations = _Entries(NegotiationState)
+        self._calls = _Entries(CallState)
+        self._bytes = 0
+
+    def get_negotiation(self, call_id: str) -> Optional[NegotiationState]:
+        return self._negotiations.get(call_id)
+
+    def create_negotiation(self, st: NegotiationState) -> bool:
+        with self._locks.for_key(st.call_id):
+            if st.call_id in self._negotiations.live or st.call_id in self._negotiations.tombstones:
+                return False
+            self._negotiations.put(st)
+            return True
+
+    def cas_negotiation(self, st: NegotiationState, expected_round: int) -> bool:
+        with self._locks.for_key(st.call_id):
+            current = self._negotiations.live.get(st.call_id)
+            if current is None or current.round != expected_round or current.status != "in_progress":
+                return False
+            self._negotiations.put(st)
+            return True
+
+    def get_call(self, call_id: str) -> Optional[CallState]:
+        return self._calls.get(call_id)
+
+    def end_call(self, st: CallState) -> bool:
+        with self._locks.for_key(st.call_id):
+            current = self._calls.live.get(st.call_id)
+            if (current is not None and current.ended_at is not None) or st.call_id in self._calls.tombstones:
+                return False
+            self._calls.put(st)
+            return True
+
+    def sweep(
+        self,
+        now: float,
+        finished_ttl: float,
+        idle_ttl: float,
+        tombstone_ttl: float,
+        max_bytes: int,
+        archive: Optional[Archive] = None,
+    ) -> Dict[str, int]:
+        counts = dict.fromkeys(SWEEP_COUNTS, 0)
+        kinds = (self._negotiations, self._calls)
+
+        tomb_bytes = 0
+        for entries in kinds:
+            for call_id, (expires_at, raw) in entries.tombstones.copy().items():
+                if expires_at > now:
+                    tomb_bytes += len(raw)
+                    continue
+                with self._locks.for_key(call_id):
+                    if entries.tombstones.get(call_id, (None,))[0] == expires_at:
+                        del entries.tombstones[call_id]
+                        counts["tombstones_expired"] += 1
+            # stamps left by a read that raced with an eviction
+            for call_id in entries.touched.keys() - entries.live.keys():
+                entries.touched.pop(call_id, None)
+
+        # (entries, call_id, object, bytes, tombstone JSON or None, counted as)
+        expired: List[Tuple[_Entries, str, BaseModel, int, Optional[str], str]] = []
+        lru: List[Tuple[float, _Entries, str, BaseModel, int]] = []
+        live_bytes = 0
+        for entries in kinds:
+            for call_id, st in entries.live.copy().items():
+                size = entries.size(call_id, st)
+                live_bytes += size
+                age = now - entries.touched.get(call_id, now)
+                finished = st.ended_at is not None if entries is self._calls else st.status != "in_progress"
+                if not finished:
+                    if age > idle_ttl:
+                        expired.append((entries, call_id, st, size, None, "expired"))
+                elif age > finished_ttl:
+                    expired.append((entries, call_id, st, size, _tombstone(st), "expired"))
+                else:
+                    lru.append((now - age, entries, call_id, st, size))
+
+        total = live_bytes + tomb_bytes - sum(e[3] - len(e[4] or "") for e in expired)
+        evicted: List[Tuple[_Entries, str, BaseModel, int, Optional[str], str]] = []
+        if max_bytes and total > max_bytes:
+            lru.sort(key=lambda e: e[0])
+            for _, entries, call_id, st, size in lru:
+                if total <= max_bytes:
+                    break
+                raw = _tombstone(st)
+                evicted.append((entries, call_id, st, size, raw, "evicted"))
+                total -= size - len(raw)
+
+        # ended calls reach the calls table before their state goes
+        leaving = expired + evicted
+        calls = [st for entries, _, st, _, raw, _ in leaving if entries is self._calls and raw is not None]
+        if calls and archive is not None:
+            try:
+                archive(calls)
+                counts["archived"] = len(calls)
+            except Exception as e:
+                logger.warning("archiving %d calls failed, keeping them: %s", len(calls), e)
+                leaving = [item for item in leaving if item[0] is not self._calls]
+
+        for entries, call_id, st, size, raw, counted in leaving:
+            with self._locks.for_key(call_id):
+                if entries.live.get(call_id) is not st:
+                    continue  # replaced since it was looked at
+                entries.remove(call_id)
+                live_bytes -= size
+                if raw is not None:
+                    entries.tombstones[call_id] = (now + tombstone_ttl, raw)
+                    tomb_bytes += len(raw)
+            counts[counted] += 1
+
+        self._bytes = live_bytes + tomb_bytes
+        return counts
+
+    def gauges(self) -> Dict[str, int]:
+        return {
+            "negotiations": len(self._negotiations.live),
+            "calls": len(self._calls.live),
+            "tombstones": len(self._negotiations.tombstones) + len(self._calls.tombstones),
+            "bytes": self._bytes,
+        }
+
+
+class SqlStateStore:
+    """
+    Per-call state in SQL tables, shared by every worker process and machine that
+    points at the same database.
+
+    Every transition is one conditional statement: a negotiation is created with
+    INSERT .. ON CONFLICT DO NOTHING and advanced with UPDATE .. WHERE round = :expected
+    AND status = 'in_progress', so of two workers racing on one call exactly one wins
+    and the other re-reads and retries. A call ends once, by the same means.
+    """
+
+    name = "sql"
+
+    def __init__(self, engine) -> None:
+        from app.models import CallStateRow, NegotiationStateRow
+
+        self.engine = engine
+        self._neg = NegotiationStateRow.__table__
+        self._calls = CallStateRow.__table__
+        db.Base.metadata.create_all(bind=engine, tables=[self._neg, self._calls])
+
+    def get_negotiation(self, call_id: str) -> Optional[NegotiationState]:
+        with self.engine.connect() as conn:
+            raw = conn.execute(select(self._neg.c.state).where(self._neg.c.call_id == call_id)).scalar()
+        return NegotiationState.model_validate_json(raw) if raw is not None else None
+
+    def create_negotiation(self, st: NegotiationState) -> bool:
+        stmt = (
+            db.insert_for(self._neg, self.engine)
+            .values(call_id=st.call_id, round=st.round, status=st.status, updated_at=time.time(), state=st.model_dump_json())
+            .on_conflict_do_nothing(index_elements=["call_id"])
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount == 1
+
+    def cas_negotiation(self, st: NegotiationState, expected_round: int) -> bool:
+        t = self._neg
+        stmt = (
+            update(t)
+            .where(t.c.call_id == st.call_id, t.c.round == expected_round, t.c.status == "in_progress")
+            .values(round=st.round, status=st.status, updated_at=time.time(), state=st.model_dump_json())
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount == 1
+
+    def get_call(self, call_id: str) -> Optional[CallState]:
+        with self.engine.connect() as conn:
+            raw = conn.execute(select(self._calls.c.state).where(self._calls.c.call_id == call_id)).scalar()
+        return CallState.model_validate_json(raw) if raw is not None else None
+
+    def end_call(self, st: CallState) -> bool:
+        t = self._calls
+        stmt = db.insert_for(t, self.engine).values(
+            call_id=st.call_id, ended_at=st.ended_at, updated_at=time.time(), state=st.model_dump_json()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["call_id"],
+            set_={"ended_at": stmt.excluded.ended_at, "updated_at": stmt.excluded.updated_at, "state": stmt.excluded.state},
+            where=t.c.ended_at.is_(None),
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount == 1
+
+    def sweep(
+        self,
+        now: float,
+        finished_ttl: float,
+        idle_ttl: float,
+        tombstone_ttl: float,
+        max_bytes: int,
+        archive: Optional[Archive] = None,
+    ) -> Dict[str, int]:
+        """
+        Delete rows past retention. The tables are on disk, so there is no memory
+        budget and no separate tombstone: a finished row is kept whole for
+        finished_ttl + tombstone_ttl, as long as the memory backend keeps some trace.
+        """
+        counts = dict.fromkeys(SWEEP_COUNTS, 0)
+        cutoff = now - finished_ttl - tombstone_ttl
+        n, c = self._neg, self._calls
+        with self.engine.begin() as conn:
+            counts["expired"] += conn.execute(
+                delete(n).where(
+                    or_(
+                        (n.c.status == "in_progress") & (n.c.updated_at < now - idle_ttl),
+                        (n.c.status != "in_progress") & (n.c.updated_at < cutoff),
+                    )
+                )
+            ).rowcount
+
+        with self.engine.connect() as conn:
+            stmt = select(c.c.call_id, c.c.state).where(c.c.ended_at < cutoff).limit(SQL_SWEEP_BATCH)
+            rows = conn.execute(stmt).all()
+        if not rows:
+            return counts
+        if archive is not None:
+            try:
+                archive([CallState.model_validate_json(state) for _, state in rows])
+                counts["archived"] = len(rows)
+            except Exception as e:
+                logger.warning("archiving %d calls failed, keeping them: %s", len(rows), e)
+                return counts
+        with self.engine.begin() as conn:
+            stmt = delete(c).where(c.c.call_id.in_([call_id for call_id, _ in rows]), c.c.ended_at < cutoff)
+            counts["expired"] += conn.execute(stmt).rowcount
+        return counts
+
+    def gauges(self) -> Dict[str, int]:
+        n, c = self._neg, self._calls
+        with self.engine.connect() as conn:
+            negotiations, neg_bytes = conn.execute(select(func.count(), func.coalesce(func.sum(func.length(n.c.state)), 0))).one()
+            calls, call_bytes = conn.execute(select(func.count(), func.coalesce(func.sum(func.length(c.c.state)), 0))).one()
+        return {"negotiations": negotiations, "calls": calls, "tombstones": 0, "bytes": int(neg_bytes + call_bytes)}
+
+
+STORE = MemoryStateStore()
+
+
+def _state_engine():
+    url = settings.state_database_url
+    if not url:
+        db.require_db()
+        return db.engine
+    if url.startswith("sqlite"):
+        return db._sqlite_engine(url, pool_size=5)
+    return create_engine(
+        url,
+        pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() != "false",
+        pool_recycle=1800,
+        future=True,
+    )
+
+
+def init_store() -> None:
+    """Select the backend from STATE_BACKEND; call after init_db()."""
+    global STORE
+    if settings.state_backend == "sql":
+        STORE = SqlStateStore(_state_engine())
+    else:
+        STORE = MemoryStateStore()
+    logger.info("negotiation/call state backend: %s", STORE.name)
@@ -21,7 +21,7 @@ function apiKey() {
   return v || "demo-key";
 }
 
-async function apiGet(path) {
+async function apiFetch(path) {
   const res = await fetch(`${API_BASE}${path}`, {
     headers: { "x-api-key": apiKey() },
   });
@@ -29,7 +29,11 @@ async function apiGet(path) {
     const txt = await res.text();
     throw new Error(`${res.status} ${res.statusText}: ${txt}`);
   }
-  return res.json();
+  return res;
+}
+
+async function apiGet(path) {
+  return (await apiFetch(path)).json();
 }
 
 function fmtPct(x) {
@@ -89,15 +93,33 @@ function renderChart(canvasId, title, dataObj, existingChart) {
   });
 }
 
-async function loadOverview() {
-  clearError();
+// last snapshot and its ETag, reused when the server answers 304
+let snapshotEtag = null;
+let snapshotData = null;
+let snapshotLimit = null;
+
+async function fetchSnapshot(limit) {
+  const headers = { "x-api-key": apiKey() };
+  if (snapshotEtag && snapshotLimit === limit) headers["If-None-Match"] = snapshotEtag;
+
+  const res = await fetch(`${API_BASE}/v1/metrics/dashboard/snapshot?limit=${limit}`, { headers });
+  if (res.status === 304) return snapshotData;
+  if (!res.ok) {
+    const txt = await res.text();
+    throw new Error(`${res.status} ${res.statusText}: ${txt}`);
+  }
 
-  const [ov, outcomes, sentiment] = await Promise.all([
-    apiGet("/v1/metrics/dashboard/overview"),
-    apiGet("/v1/metrics/dashboard/outcomes"),
-    apiGet("/v1/metrics/dashboard/sentiment"),
-  ]);
+  snapshotData = await res.json();
+  snapshotEtag = res.headers.get("ETag");
+  snapshotLimit = limit;
+  return snapshotData;
+}
+
+function callsFiltered() {
+  return ["outcomeFilter", "sentimentFilter", "verifiedFilter"].some(id => $(id).value);
+}
 
+function renderOverview(ov, outcomes, sentiment) {
   $("kpiTotal").textContent = ov.total_calls ?? "—";
   $("kpiVerified").textContent = fmtPct(ov.verified_rate);
   $("kpiAcceptance").textContent = fmtPct(ov.acceptance_rate);
@@ -106,8 +128,127 @@ async function loadOverview() {
 
   outcomesChart = renderChart("chartOutcomes", "Outcomes", outcomes, outcomesChart);
   sentimentChart = renderChart("chartSentiment", "Sentiment", sentiment, sentimentChart);
+}
 
-  await loadCallsTable();
+async function loadOverview() {
+  clearError();
+
+  const limit = $("limitSelect").value || "20";
+  const snap = await fetchSnapshot(limit);
+  renderOverview(snap.overview, snap.outcomes, snap.sentiment);
+
+  // the snapshot already carries the unfiltered first page of calls
+  if (callsFiltered()) {
+    await reloadCallsFromTop();
+  } else {
+    pageCursors = [];
+    showCallsPage(snap.calls, null, snap.next_cursor);
+  }
+}
+
+// same arithmetic as the server's overview, from the raw rollup totals
+function overviewFromTotals(t) {
+  if (!t.calls) {
+    return { total_calls: 0, verified_rate: 0, acceptance_rate: 0, transfer_rate: 0, avg_rounds: 0 };
+  }
+  const round = (x, n) => Math.round(x * 10 ** n) / 10 ** n;
+  return {
+    total_calls: t.calls,
+    verified_rate: t.verified_known ? round(t.verified_true / t.verified_known, 3) : 0,
+    acceptance_rate: round(t.accepted / t.calls, 3),
+    transfer_rate: round(t.transferred / t.calls, 3),
+    avg_rounds: t.rounds_count ? round(t.rounds_sum / t.rounds_count, 3) : 0,
+  };
+}
+
+// mirrors dashboard.encode_cursor on the server
+function encodeCursor(r) {
+  return btoa(JSON.stringify([r.ended_at, r.call_id]))
+    .replace(/\+/g, "-").replace(/\//g, "_").replace(/=+$/, "");
+}
+
+function addCounts(target, delta) {
+  for (const [k, n] of Object.entries(delta)) {
+    target[k] = (target[k] || 0) + n;
+    if (target[k] <= 0) delete target[k];
+  }
+}
+
+function applyCallEvent(ev) {
+  const snap = snapshotData;
+  if (!snap || ev.version <= snap.version) return;
+  if (ev.version !== snap.version + 1) {
+    // missed an event: start again from a fresh snapshot
+    loadOverview().catch(e => showError(e.message));
+    return;
+  }
+
+  for (const [k, n] of Object.entries(ev.delta.totals)) snap.totals[k] = (snap.totals[k] || 0) + n;
+  addCounts(snap.outcomes, ev.delta.outcomes);
+  addCounts(snap.sentiment, ev.delta.sentiment);
+  snap.overview = overviewFromTotals(snap.totals);
+  snap.version = ev.version;
+  snapshotEtag = null;  // local copy has moved past the server's cached one
+
+  renderOverview(snap.overview, snap.outcomes, snap.sentiment);
+
+  // only the newest, unfiltered page changes when a call ends
+  if (currentCursor === null && !callsFiltered()) {
+    const limit = Number($("limitSelect").value || "20");
+    const rows = [ev.call, ...currentRows.filter(r => r.call_id !== ev.call.call_id)];
+    if (rows.length > limit) {
+      const kept = rows.slice(0, limit);
+      showCallsPage(kept, null, encodeCursor(kept[kept.length - 1]));
+    } else {
+      showCallsPage(rows, null, nextCursor);
+    }
+  }
+}
+
+function handleStreamBlock(block) {
+  let event = "message";
+  let data = "";
+  for (const line of block.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data += line.slice(5).trim();
+  }
+  if (!data) return;
+
+  const payload = JSON.parse(data);
+  if (event === "call") applyCallEvent(payload);
+  else if (event === "resync") loadOverview().catch(e => showError(e.message));
+  else if (event === "hello" && (!snapshotData || payload.version !== snapshotData.version)) {
+    loadOverview().catch(e => showError(e.message));
+  }
+}
+
+// EventSource cannot send the API key header, so read the SSE stream with fetch
+async function startLiveStream() {
+  for (;;) {
+    try {
+      const res = await fetch(`${API_BASE}/v1/metrics/dashboard/stream`, {
+        headers: { "x-api-key": apiKey() },
+      });
+      if (res.ok && res.body) {
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buf = "";
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buf += decoder.decode(value, { stream: true });
+          let i;
+          while ((i = buf.indexOf("\n\n")) >= 0) {
+            handleStreamBlock(buf.slice(0, i));
+            buf = buf.slice(i + 2);
+          }
+        }
+      }
+    } catch (e) {
+      // dropped connection; retry below
+    }
+    await new Promise(r => setTimeout(r, 3000));
+  }
 }
 
 function renderCallsRows(rows) {
@@ -155,14 +296,55 @@ function mkCell(text) {
   return td;
 }
 
-async function loadCallsTable() {
-  const limit = Number($("limitSelect").value || "20");
-  const rows = await apiGet(`/v1/metrics/dashboard/calls?limit=${limit}`);
+// cursors of the pages before the current one, and of the page after it
+let pageCursors = [];
+let currentCursor = null;
+let nextCursor = null;
+
+function callsQuery(cursor) {
+  const params = new URLSearchParams({ limit: $("limitSelect").value || "20" });
+  for (const [id, name] of [["outcomeFilter", "outcome"], ["sentimentFilter", "sentiment"], ["verifiedFilter", "verified"]]) {
+    const v = $(id).value;
+    if (v) params.set(name, v);
+  }
+  if (cursor) params.set("cursor", cursor);
+  return `/v1/metrics/dashboard/calls?${params}`;
+}
+
+let currentRows = [];
+
+async function loadCallsTable(cursor = null) {
+  const res = await apiFetch(callsQuery(cursor));
+  showCallsPage(await res.json(), cursor, res.headers.get("X-Next-Cursor"));
+}
+
+function showCallsPage(rows, cursor, next) {
+  currentRows = rows;
+  currentCursor = cursor;
+  nextCursor = next;
 
   const q = $("searchCallId").value.trim().toLowerCase();
   const filtered = q ? rows.filter(r => String(r.call_id).toLowerCase().includes(q)) : rows;
 
   renderCallsRows(filtered);
+  $("olderBtn").disabled = !nextCursor;
+  $("newerBtn").disabled = pageCursors.length === 0;
+}
+
+async function reloadCallsFromTop() {
+  pageCursors = [];
+  await loadCallsTable();
+}
+
+async function loadOlderCalls() {
+  if (!nextCursor) return;
+  pageCursors.push(currentCursor);
+  await loadCallsTable(nextCursor);
+}
+
+async function loadNewerCalls() {
+  if (pageCursors.length === 0) return;
+  await loadCallsTable(pageCursors.pop());
 }
 
 function setText(id, text) {
@@ -227,13 +409,24 @@ function wireUI() {
     catch (e) { showError(e.message); }
   });
 
-  $("limitSelect").addEventListener("change", async () => {
-    try { await loadCallsTable(); }
+  for (const id of ["limitSelect", "outcomeFilter", "sentimentFilter", "verifiedFilter"]) {
+    $(id).addEventListener("change", async () => {
+      try { await reloadCallsFromTop(); }
+      catch (e) { showError(e.message); }
+    });
+  }
+
+  $("searchCallId").addEventListener("input", () => {
+    showCallsPage(currentRows, currentCursor, nextCursor);
+  });
+
+  $("olderBtn").addEventListener("click", async () => {
+    try { await loadOlderCalls(); }
     catch (e) { showError(e.message); }
   });
 
-  $("searchCallId").addEventListener("input", async () => {
-    try { await loadCallsTable(); }
+  $("newerBtn").addEventListener("click", async () => {
+    try { await loadNewerCalls(); }
     catch (e) { showError(e.message); }
   });
 
@@ -250,4 +443,5 @@ function wireUI() {
   wireUI();
   try { await loadOverview(); }
   catch (e) { showError(e.message); }
+  startLiveStream();
 })();
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+Live dashboard fan-out: one publisher thread, many stream subscribers.
+
+    python -m benchmarks.dashboard_fanout [--subscribers 10,100,500] [--events 2000] [--rate 100] [--slow 0.05]
+
+Subscribers are consumer tasks on one event loop, as SSE viewers are in the app;
+a --slow fraction of them stalls for 50 ms after every event. Reports publish()
+cost on the writer thread, publish-to-receive latency across subscribers, and
+how many resyncs the bounded queues issued.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+from typing import List
+
+os.environ.setdefault("API_KEYS", "bench")
+
+from app.services.broadcast import RESYNC, Broadcaster  # noqa: E402
+
+CALL = {
+    "call_id": "call-00000000",
+    "ended_at": 1767225600,
+    "verified": True,
+    "load_id": "SYN-0000001",
+    "loadboard_rate": 2150.0,
+    "rounds": 2,
+    "carrier_last_offer": 2400.0,
+    "final_offer": 2250.0,
+    "agreed": True,
+    "transfer_to_rep": True,
+    "outcome": "ACCEPTED",
+    "sentiment": "Positive",
+}
+
+
+def _version(data: bytes) -> int:
+    start = data.index(b'"version":') + 10
+    return int(data[start:data.index(b",", start)])
+
+
+async def _consume(
+    broadcaster: Broadcaster,
+    sent: List[float],
+    latencies: List[float],
+    slow: bool,
+    done: asyncio.Event,
+    ready: asyncio.Event,
+) -> None:
+    sub = broadcaster.subscribe()
+    ready.set()
+    try:
+        while not done.is_set():
+            try:
+                data = await asyncio.wait_for(sub.queue.get(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            if data != RESYNC:
+                latencies.append(time.perf_counter() - sent[_version(data)])
+            if slow:
+                await asyncio.sleep(0.05)
+    finally:
+        broadcaster.unsubscribe(sub)
+
+
+def _publish(broadcaster: Broadcaster, events: int, rate: float, sent: List[float], costs: List[float]) -> None:
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    for i in range(events):
+        delay = start + i * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t0 = sent[i] = time.perf_counter()
+        broadcaster.publish("call", {"version": i, "call": CALL, "delta": {"totals": {"calls": 1}}})
+        costs.append(time.perf_counter() - t0)
+
+
+async def run_one(subscribers: int, events: int, rate: float, slow_fraction: float, queue_size: int) -> None:
+    broadcaster = Broadcaster(queue_size=queue_size)
+    done = asyncio.Event()
+    latencies: List[float] = []
+    sent = [0.0] * events
+    n_slow = int(subscribers * slow_fraction)
+
+    readies = [asyncio.Event() for _ in range(subscribers)]
+    tasks = [
+        asyncio.create_task(_consume(broadcaster, sent, latencies, i < n_slow, done, readies[i]))
+        for i in range(subscribers)
+    ]
+    await asyncio.gather(*(r.wait() for r in readies))
+
+    costs: List[float] = []
+    publisher = threading.Thread(target=_publish, args=(broadcaster, events, rate, sent, costs))
+    publisher.start()
+    await asyncio.get_running_loop().run_in_executor(None, publisher.join)
+    await asyncio.sleep(0.2)
+    done.set()
+    await asyncio.gather(*tasks)
+
+    latencies.sort()
+    costs.sort()
+    print(
+        f"{subscribers:>6} {n_slow:>5} {len(latencies):>10} "
+        f"{statistics.median(costs) * 1e6:>10.1f} "
+        f"{statistics.median(latencies) * 1e3:>9.2f} {latencies[int(len(latencies) * 0.99) - 1] * 1e3:>9.2f} "
+        f"{broadcaster.resyncs:>8}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", default="10,100,500")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=100.0, help="events per second")
+    parser.add_argument("--slow", type=float, default=0.05, help="fraction of stalled subscribers")
+    parser.add_argument("--queue-size", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'subs':>6} {'slow':>5} {'delivered':>10} {'pub us':>10} {'p50 ms':>9} {'p99 ms':>9} {'resyncs':>8}")
+    for n in [int(s) for s in args.subscribers.split(",")]:
+        asyncio.run(run_one(n, args.events, args.rate, args.slow, args.queue_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Dashboard endpoint query cost against a populated `calls` table.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.dashboard_queries [--rows 1000000] [--seed]
+
+With --seed, the table is filled with synthetic call rows first (appending to any
+rows already present) and the rollups are rebuilt. Then each dashboard aggregation
+is timed via the dashboard service and, for comparison, via the previous
+load-every-row-and-aggregate path.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import statistics
+import time
+from typing import Callable
+
+os.environ.setdefault("API_KEYS", "bench")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+import app.db as db  # noqa: E402
+from app.models import CallRecord  # noqa: E402
+from app.services import dashboard, rollups  # noqa: E402
+from benchmarks.synthetic import iter_call_records  # noqa: E402
+
+
+def legacy_rows() -> list:
+    with db.SessionLocal() as session:
+        rows = session.execute(select(CallRecord).order_by(CallRecord.ended_at.desc().nullslast())).scalars().all()
+    return [
+        {k: getattr(r, k) for k in ("call_id", "ended_at", "verified", "outcome", "sentiment", "agreed", "transfer_to_rep", "rounds", "final_offer", "loadboard_rate")}
+        for r in rows
+    ]
+
+
+def legacy_overview() -> dict:
+    rows = legacy_rows()
+    total = len(rows)
+    known = [r for r in rows if r["verified"] is not None]
+    rounds = [r["rounds"] for r in rows if r["rounds"] is not None]
+    return {
+        "total_calls": total,
+        "verified_rate": sum(1 for r in known if r["verified"]) / len(known) if known else 0.0,
+        "acceptance_rate": sum(1 for r in rows if r["outcome"] == "ACCEPTED" or r["agreed"]) / total if total else 0.0,
+        "avg_rounds": sum(rounds) / len(rounds) if rounds else 0.0,
+    }
+
+
+def seed(n: int, offset: int) -> None:
+    rows = iter_call_records(n + offset)
+    for _ in range(offset):
+        next(rows)
+    with db.engine.begin() as conn:
+        while True:
+            chunk = list(itertools.islice(rows, 10000))
+            if not chunk:
+                break
+            conn.execute(insert(CallRecord), chunk)
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    db.init_db()
+    db.require_db()
+
+    with db.SessionLocal() as session:
+        existing = session.execute(select(func.count()).select_from(CallRecord)).scalar_one()
+    if args.seed:
+        seed(args.rows, existing)
+        existing += args.rows
+        t0 = time.perf_counter()
+        rollups.rebuild()
+        print(f"rollups rebuild: {(time.perf_counter() - t0) * 1e3:.0f} ms")
+    print(f"calls rows: {existing}")
+
+    # a cursor from near the oldest end of the table: keyset pages cost the same there
+    with db.SessionLocal() as session:
+        oldest = session.execute(
+            select(CallRecord.ended_at, CallRecord.call_id)
+            .where(CallRecord.ended_at.is_not(None))
+            .order_by(CallRecord.ended_at, CallRecord.call_id)
+            .offset(100)
+            .limit(1)
+        ).first()
+    deep_cursor = tuple(oldest) if oldest else None
+
+    cases = {
+        "overview": dashboard.overview,
+        "outcomes": dashboard.outcome_counts,
+        "sentiment": dashboard.sentiment_counts,
+        "daily(30)": lambda: dashboard.daily(30),
+        "snapshot(cold)": lambda: (dashboard.bump_version(), dashboard.snapshot(20)),
+        "snapshot(warm)": lambda: dashboard.snapshot(20),
+        "calls(50)": lambda: dashboard.list_calls(50),
+        "calls(50,deep)": lambda: dashboard.list_calls(50, cursor=deep_cursor),
+        "calls(outcome)": lambda: dashboard.list_calls(50, cursor=deep_cursor, outcome="ACCEPTED"),
+    }
+    for name, fn in cases.items():
+        print(f"{name:<15} service {_time(fn, args.repeat):>10.2f} ms")
+    if not args.skip_legacy:
+        print(f"{'overview':<15} legacy  {_time(legacy_overview, 1):>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
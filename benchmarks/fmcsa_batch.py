@@ -0,0 +1,108 @@
+"""
+Batch carrier verification against the local FMCSA stub.
+
+    python -m benchmarks.fmcsa_batch [--items 5000] [--concurrency 8,32] [--rate 0] [--latency-ms 50]
+
+Streams an NDJSON upload of --items fresh MC numbers through /carriers/verify/batch
+at each concurrency and reports wall time, throughput, time to the first result
+line and peak RSS. The "sequential" row is one /carriers/verify call per MC number
+(first 200 only), which is what the onboarding job did before. --rate sets
+FMCSA_RATE_LIMIT_PER_SECOND for the stub host.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import threading
+import time
+
+PORT = 8095
+APP_PORT = 8096
+os.environ.setdefault("API_KEYS", "bench")
+os.environ.setdefault("FMCSA_WEBKEY", "stub")
+os.environ["FMCSA_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+
+
+def _serve(app, port: int) -> None:
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--concurrency", default="8,32")
+    parser.add_argument("--rate", type=float, default=0.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    os.environ["FMCSA_RATE_LIMIT_PER_SECOND"] = str(args.rate)
+    os.environ.setdefault("FMCSA_BATCH_MAX_ITEMS", str(args.items))
+
+    import httpx
+
+    from app.main import app
+    from benchmarks import fmcsa_stub as stub
+
+    stub.LATENCY_SECONDS = args.latency_ms / 1e3
+    _serve(stub.app, PORT)
+    # a real server: the test client would buffer the streamed response
+    _serve(app, APP_PORT)
+
+    print(f"{'mode':<12} {'items':>6} {'wall s':>8} {'items/s':>9} {'first ms':>9} {'upstream':>9} {'errors':>7} {'rss MB':>8}")
+    with httpx.Client(
+        base_url=f"http://127.0.0.1:{APP_PORT}", timeout=None, headers={"X-API-Key": os.environ["API_KEYS"].split(",")[0]}
+    ) as client:
+        base = 1_000_000
+
+        n = min(args.items, 200)
+        before = stub.REQUESTS["lookups"]
+        t0 = time.perf_counter()
+        for i in range(n):
+            client.post("/carriers/verify", json={"mc_number": str(base + i)})
+        wall = time.perf_counter() - t0
+        print(
+            f"{'sequential':<12} {n:>6} {wall:>8.2f} {n / wall:>9.1f} {'':>9} "
+            f"{stub.REQUESTS['lookups'] - before:>9} {0:>7} {_rss_mb():>8.1f}"
+        )
+        base += n
+
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            body = "".join(f"{base + i}\n" for i in range(args.items)).encode()
+            base += args.items
+            before = stub.REQUESTS["lookups"]
+            lines = errors = 0
+            first = None
+            t0 = time.perf_counter()
+            with client.stream(
+                "POST",
+                f"/carriers/verify/batch?concurrency={concurrency}",
+                content=body,
+                headers={"content-type": "application/x-ndjson"},
+            ) as resp:
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    if first is None:
+                        first = time.perf_counter() - t0
+                    lines += 1
+                    errors += '"error"' in line
+            wall = time.perf_counter() - t0
+            assert lines == args.items, (lines, args.items)
+            print(
+                f"{'batch x' + str(concurrency):<12} {lines:>6} {wall:>8.2f} {lines / wall:>9.1f} {first * 1e3:>9.1f} "
+                f"{stub.REQUESTS['lookups'] - before:>9} {errors:>7} {_rss_mb():>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Local stand-in for the FMCSA QCMobile carrier lookup.
+
+    python -m benchmarks.fmcsa_stub [--port 8081] [--latency-ms 150]
+    FMCSA_BASE_URL=http://127.0.0.1:8081 FMCSA_WEBKEY=stub uvicorn app.main:app
+
+Answers GET /carriers/docket-number/{mc} deterministically from the MC number:
+multiples of 10 are a 404, other multiples of 7 return no content, even numbers
+are allowed to operate and odd ones are not. Non-numeric MCs get a 500.
+GET /stats returns the number of lookups served. Setting FAULT to "error" makes
+every lookup a 503, and "hang" makes it take HANG_SECONDS.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+
+LATENCY_SECONDS = 0.15
+HANG_SECONDS = 30.0
+FAULT: Optional[str] = None
+REQUESTS = {"lookups": 0}
+
+app = FastAPI(title="FMCSA stub")
+
+
+@app.get("/carriers/docket-number/{mc_number}")
+async def docket(mc_number: str, webKey: str = ""):
+    REQUESTS["lookups"] += 1
+    await asyncio.sleep(HANG_SECONDS if FAULT == "hang" else LATENCY_SECONDS)
+    if FAULT == "error":
+        raise HTTPException(status_code=503, detail="stub: unavailable")
+
+    if not mc_number.isdigit():
+        raise HTTPException(status_code=500, detail="stub: bad docket number")
+    n = int(mc_number)
+    if n % 10 == 0:
+        raise HTTPException(status_code=404, detail="not found")
+    if n % 7 == 0:
+        return {"content": []}
+
+    return {
+        "content": [
+            {
+                "carrier": {
+                    "allowedToOperate": "Y" if n % 2 == 0 else "N",
+                    "dotNumber": 1000000 + n,
+                    "phyCity": "DALLAS",
+                    "phyState": "TX",
+                }
+            }
+        ]
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return dict(REQUESTS)
+
+
+def main() -> None:
+    import uvicorn
+
+    global LATENCY_SECONDS
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    LATENCY_SECONDS = args.latency_ms / 1e3
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Carrier verification with and without the FMCSA cache, against the local stub.
+
+    python -m benchmarks.fmcsa_verify [--calls 200] [--carriers 150] [--repeats 3] [--concurrency 100] [--budget-ms 1500]
+
+Each simulated call verifies one carrier --repeats times (the agent re-checks
+within a call); carriers are drawn with a skew so some call back often. All calls
+run concurrently up to --concurrency. Reports wall time, latency per
+verification, upstream requests and the cache counters.
+
+The "error" and "hang" rows repeat the cached run against a stub that answers
+503 or stops answering, with a --budget-ms deadline per verification, to show
+the circuit breaker failing fast with stale or unknown answers.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import threading
+import time
+from typing import List, Tuple
+
+PORT = 8093
+os.environ.setdefault("API_KEYS", "bench")
+os.environ.setdefault("FMCSA_WEBKEY", "stub")
+os.environ["FMCSA_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+
+import uvicorn  # noqa: E402
+
+from app.services import fmcsa  # noqa: E402
+from app.services.fmcsa import FmcsaError, new_deadline, verify_carrier  # noqa: E402
+from app.services.fmcsa_cache import VerificationCache  # noqa: E402
+from benchmarks import fmcsa_stub  # noqa: E402
+
+
+def _start_stub(latency_ms: float) -> uvicorn.Server:
+    fmcsa_stub.LATENCY_SECONDS = latency_ms / 1e3
+    server = uvicorn.Server(uvicorn.Config(fmcsa_stub.app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _run(verify, mcs: List[str], repeats: int, concurrency: int, budget: float) -> Tuple[List[float], int]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one_call(mc: str):
+        nonlocal errors
+        async with sem:
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                try:
+                    await verify(mc, new_deadline(budget))
+                except FmcsaError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+    await fmcsa.start_client()
+    try:
+        await asyncio.gather(*(one_call(mc) for mc in mcs))
+    finally:
+        # the shared client is bound to this event loop
+        await fmcsa.stop_client()
+    return latencies, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--carriers", type=int, default=150)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    _start_stub(args.latency_ms)
+    rng = random.Random(5)
+    carriers = [str(rng.randrange(100000, 999999)) for _ in range(args.carriers)]
+    weights = [1.0 / (i + 1) for i in range(len(carriers))]
+    mcs = rng.choices(carriers, weights=weights, k=args.calls)
+
+    budget = args.budget_ms / 1e3
+    # half the carriers were seen before the outage and expired since: they get stale answers
+    stale_cache = VerificationCache(verify_carrier, ttl_eligible=0, ttl_ineligible=0, ttl_not_found=0)
+    cache = VerificationCache(verify_carrier)
+    cases = (
+        ("uncached", None, verify_carrier),
+        ("cached", None, cache.verify),
+        ("warmup", None, lambda mc, deadline: stale_cache.verify(mc, deadline) if int(mc) % 2 else _noop()),
+        ("error", "error", stale_cache.verify),
+        ("hang", "hang", stale_cache.verify),
+    )
+
+    print(f"{'mode':<9} {'wall s':>8} {'p50 ms':>9} {'p99 ms':>9} {'upstream':>9} {'errors':>7} {'circuit':>10}")
+    for name, fault, verify in cases:
+        fmcsa_stub.FAULT = fault
+        fmcsa.BREAKER.record_success()
+        before = fmcsa_stub.REQUESTS["lookups"]
+        t0 = time.perf_counter()
+        latencies, errors = asyncio.run(_run(verify, mcs, args.repeats, args.concurrency, budget))
+        wall = time.perf_counter() - t0
+        latencies.sort()
+        print(
+            f"{name:<9} {wall:>8.2f} {statistics.median(latencies) * 1e3:>9.2f} "
+            f"{latencies[int(len(latencies) * 0.99) - 1] * 1e3:>9.2f} {fmcsa_stub.REQUESTS['lookups'] - before:>9} "
+            f"{errors:>7} {fmcsa.BREAKER.state:>10}"
+        )
+    print(cache.status())
+    print(stale_cache.status())
+    print(fmcsa.upstream_status())
+
+
+async def _noop() -> None:
+    return None
+
+
+if __name__ == "__main__":
+    main()
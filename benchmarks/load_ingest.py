@@ -0,0 +1,117 @@
+"""
+Delta ingestion throughput, publish (swap) pause and reader latency during ingest.
+
+    python -m benchmarks.load_ingest [--sizes 100000,1000000] [--batches 10,1000,5000]
+
+For each board size and batch size, applies a mix of 60% updates, 20% adds and
+20% removes through ingest.apply_deltas while a reader thread searches the live
+board continuously, and reports deltas/s, per-batch apply time, the swap pause
+and the reader's p99/max search latency.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import threading
+import time
+from typing import List
+
+os.environ.setdefault("API_KEYS", "bench")
+
+from app.core import state  # noqa: E402
+from app.schemas.loads import LoadDelta  # noqa: E402
+from app.services import ingest  # noqa: E402
+from app.services.load_board import LoadBoard  # noqa: E402
+from benchmarks.synthetic import EQUIPMENT, board_cities, make_loads  # noqa: E402
+
+
+def _deltas(rng: random.Random, live: List[str], next_id: List[int], n: int, cities: List[str]) -> List[LoadDelta]:
+    out = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.2 and live:
+            out.append(LoadDelta(op="remove", load_id=live.pop(rng.randrange(len(live)))))
+            continue
+        if roll < 0.4 or not live:
+            load_id = f"NEW-{next_id[0]:08d}"
+            next_id[0] += 1
+            live.append(load_id)
+            op = "add"
+        else:
+            load_id = live[rng.randrange(len(live))]
+            op = "update"
+        origin, destination = rng.sample(cities, 2)
+        out.append(LoadDelta(op=op, load=dict(
+            load_id=load_id,
+            origin=origin,
+            destination=destination,
+            pickup_datetime="2026-01-27T09:00:00-05:00",
+            delivery_datetime="2026-01-28T17:00:00-06:00",
+            equipment_type=rng.choice(EQUIPMENT),
+            loadboard_rate=float(rng.randrange(400, 6000, 25)),
+        )))
+    return out
+
+
+def _reader(stop: threading.Event, samples: List[float], cities: List[str]) -> None:
+    rng = random.Random(5)
+    while not stop.is_set():
+        origin = rng.choice(cities)
+        t0 = time.perf_counter()
+        state.BOARD.search(origin, None, None, 5)
+        samples.append(time.perf_counter() - t0)
+        time.sleep(0.0005)
+
+
+def run(sizes: List[int], batches: List[int], rounds: int) -> None:
+    rng = random.Random(3)
+    cities = board_cities()
+
+    print(f"{'loads':>9} {'batch':>6} {'deltas/s':>10} {'apply ms':>10} {'swap us':>8} {'read p99 us':>12} {'read max us':>12}")
+    for size in sizes:
+        loads = make_loads(size)
+        live = [l.load_id for l in loads]
+        next_id = [0]
+        for batch in batches:
+            state.BOARD = LoadBoard.build(loads)
+            work = [_deltas(rng, live, next_id, batch, cities) for _ in range(rounds)]
+
+            stop = threading.Event()
+            samples: List[float] = []
+            reader = threading.Thread(target=_reader, args=(stop, samples, cities))
+            reader.start()
+
+            applied, apply_ms, swap_us = 0, [], []
+            t0 = time.perf_counter()
+            for deltas in work:
+                res = ingest.apply_deltas(deltas)
+                applied += res.received
+                apply_ms.append(res.apply_ms)
+                swap_us.append(res.swap_us)
+            elapsed = time.perf_counter() - t0
+
+            stop.set()
+            reader.join()
+            samples.sort()
+            p99 = samples[int(len(samples) * 0.99) - 1] * 1e6 if samples else 0.0
+            mx = samples[-1] * 1e6 if samples else 0.0
+
+            print(
+                f"{size:>9} {batch:>6} {applied / elapsed:>10.0f} {statistics.median(apply_ms):>10.2f} "
+                f"{max(swap_us):>8.2f} {p99:>12.1f} {mx:>12.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--batches", default="10,1000,5000")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], [int(b) for b in args.batches.split(",")], args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Resident memory per load for each LoadStore.
+
+    python -m benchmarks.load_memory [--sizes 100000,1000000] [--stores objects,compact]
+
+Each (store, size) pair runs in a fresh interpreter that parses synthetic loads
+from JSON (as the seed file / delta feed would), builds a LoadBoard, and reports
+the RSS growth divided by the number of loads. Linux only (reads /proc).
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+
+PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+def _rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE
+
+
+def child(store: str, size: int) -> None:
+    from app.schemas.domain import Load
+    from app.services.load_board import LoadBoard
+    from app.services.load_store import STORES
+    from benchmarks.synthetic import iter_load_dicts
+
+    lines = (json.dumps(d) for d in iter_load_dicts(size))
+    gc.collect()
+    before = _rss()
+    board = LoadBoard.build((Load.model_validate_json(line) for line in lines), store_cls=STORES[store])
+    gc.collect()
+    after = _rss()
+    print(json.dumps({"store": store, "loads": len(board), "bytes_per_load": (after - before) / size}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--stores", default="objects,compact")
+    parser.add_argument("--child", nargs=2, metavar=("STORE", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'store':<8} {'loads':>9} {'bytes/load':>11} {'MB total':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        for store in args.stores.split(","):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.load_memory", "--child", store, str(size)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            res = json.loads(out.strip().splitlines()[-1])
+            bpl = res["bytes_per_load"]
+            print(f"{store:<8} {size:>9} {bpl:>11.0f} {bpl * size / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
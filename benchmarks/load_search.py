@@ -0,0 +1,163 @@
+"""
+Load search latency vs board size.
+
+    python -m benchmarks.load_search [--sizes 30,1000,100000,1000000] [--queries 2000] [--store compact]
+
+Reports median / p99 per call for full-lane, origin-only and open searches plus
+get_by_id, on LoadBoard and (for boards up to --linear-max) the old linear scan,
+and for radius searches (100 mi origin, and 100 mi origin + 150 mi destination).
+
+Fuzzy cases spell the terms the way callers do: "fuzzy_origin" has one typo in the
+origin city, "fuzzy_lane" typos in both cities plus an equipment synonym, and
+"spoken_lane" state names instead of codes ("Dallas Texas"). The share of fuzzy
+searches that resolved to the intended place is printed with them.
+
+Window cases add a pickup window to a search: "morning_*" a 6-hour window on one
+of the board's 14 pickup days (full lane, origin only, open), "upcoming_lane" only
+loads picking up in the board's second week, as when past pickups are hidden.
+"morning_radius" and "upcoming_radius" are the 100 mi origin radius search with
+those windows, "empty_radius" with a window after the board's last pickup.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, List, Optional, Sequence
+
+from app.schemas.domain import Load
+from app.services.load_board import LoadBoard, TimeWindow, norm
+from app.services.load_store import STORES
+from app.services.matching import STATES
+from benchmarks.synthetic import EQUIPMENT, PICKUP_DAYS, PICKUP_START, board_cities, make_loads
+
+EQUIPMENT_SPOKEN = {"dry_van": "van", "dry van": "dry-van", "reefer": "refrigerated", "flatbed": "flat bed"}
+STATE_NAMES = {code: name for name, code in STATES.items()}
+
+
+def typo(place: str, rng: random.Random) -> str:
+    """One substituted, dropped or doubled letter in the city part of "City, ST"."""
+    city, sep, state = place.rpartition(", ")
+    i = rng.randrange(1, len(city))
+    if not city[i].isalpha():
+        return place
+    edit = rng.choice(("sub", "drop", "double"))
+    if edit == "sub":
+        city = city[:i] + rng.choice("aeiourstnl") + city[i + 1:]
+    elif edit == "drop":
+        city = city[:i] + city[i + 1:]
+    else:
+        city = city[:i] + city[i] + city[i:]
+    return city + sep + state
+
+
+def spoken(place: str) -> str:
+    city, _, state = place.rpartition(", ")
+    return f"{city} {STATE_NAMES[state.lower()].title()}"
+
+
+def linear_search(loads: Sequence[Load], origin: Optional[str], destination: Optional[str], equipment: Optional[str], limit: int) -> List[Load]:
+    results = [
+        l for l in loads
+        if (not origin or norm(l.origin) == norm(origin))
+        and (not destination or norm(l.destination) == norm(destination))
+        and (not equipment or norm(l.equipment_type) == norm(equipment))
+    ]
+    results.sort(key=lambda l: float(l.loadboard_rate), reverse=True)
+    return results[:limit]
+
+
+def _time(fn: Callable[[int], object], n: int) -> tuple[float, float]:
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return statistics.median(samples) * 1e6, samples[int(len(samples) * 0.99) - 1] * 1e6
+
+
+def run(sizes: List[int], queries: int, linear_max: int, store: str) -> None:
+    rng = random.Random(11)
+    cities = board_cities()
+
+    print(f"{'loads':>9}  {'case':<14} {'impl':<7} {'p50 us':>10} {'p99 us':>10}")
+    for size in sizes:
+        loads = make_loads(size)
+        t0 = time.perf_counter()
+        board = LoadBoard.build(loads, store_cls=STORES[store])
+        print(f"{size:>9}  {'build':<14} {'board':<7} {(time.perf_counter() - t0) * 1e6:>10.0f}")
+
+        lanes = [(rng.choice(cities), rng.choice(cities), rng.choice(EQUIPMENT)) for _ in range(queries)]
+        ids = [rng.choice(loads).load_id for _ in range(queries)]
+
+        cases = {
+            "full_lane": lambda i: (lanes[i][0], lanes[i][1], lanes[i][2]),
+            "origin_only": lambda i: (lanes[i][0], None, None),
+            "open": lambda i: (None, None, None),
+        }
+        for name, q in cases.items():
+            p50, p99 = _time(lambda i: board.search(*q(i), 5), queries)
+            print(f"{size:>9}  {name:<14} {'board':<7} {p50:>10.2f} {p99:>10.2f}")
+            if size <= linear_max:
+                n = min(queries, 50)
+                p50, p99 = _time(lambda i: linear_search(loads, *q(i), 5), n)
+                print(f"{size:>9}  {name:<14} {'linear':<7} {p50:>10.2f} {p99:>10.2f}")
+
+        radius_cases = {
+            "radius_origin": lambda i: board.search_nearby(lanes[i][0], None, lanes[i][2], 100, None, 5, 2.0),
+            "radius_lane": lambda i: board.search_nearby(lanes[i][0], lanes[i][1], None, 100, 150, 5, 2.0),
+        }
+        for name, fn in radius_cases.items():
+            p50, p99 = _time(fn, queries)
+            print(f"{size:>9}  {name:<14} {'board':<7} {p50:>10.2f} {p99:>10.2f}")
+
+        typos = [(typo(o, rng), typo(d, rng), EQUIPMENT_SPOKEN[e]) for o, d, e in lanes]
+        fuzzy_cases = {
+            "fuzzy_origin": lambda i: (typos[i][0], None, None),
+            "fuzzy_lane": lambda i: typos[i],
+            "spoken_lane": lambda i: (spoken(lanes[i][0]), spoken(lanes[i][1]), EQUIPMENT_SPOKEN[lanes[i][2]]),
+        }
+        for name, q in fuzzy_cases.items():
+            p50, p99 = _time(lambda i: board.search(*q(i), 5), queries)
+            resolved = [board.resolve(*q(i)) for i in range(queries)]
+            hits = sum(r.origin == norm(lanes[i][0]) for i, r in enumerate(resolved))
+            print(f"{size:>9}  {name:<14} {'board':<7} {p50:>10.2f} {p99:>10.2f}   origin resolved {hits / queries:.1%}")
+
+        start = int(PICKUP_START.timestamp())
+        mornings = [start + rng.randrange(PICKUP_DAYS) * 86400 + 6 * 3600 for _ in range(queries)]
+        # what a search with no window asks for when past pickups are hidden
+        week_two = TimeWindow(pickup_from=start + 7 * 86400, untimed=True)
+        after_board = TimeWindow(pickup_from=start + PICKUP_DAYS * 86400)
+        window_cases = {
+            "morning_lane": lambda i: board.search(*lanes[i], 5, TimeWindow(mornings[i], mornings[i] + 6 * 3600)),
+            "morning_origin": lambda i: board.search(lanes[i][0], None, None, 5, TimeWindow(mornings[i], mornings[i] + 6 * 3600)),
+            "morning_open": lambda i: board.search(None, None, None, 5, TimeWindow(mornings[i], mornings[i] + 6 * 3600)),
+            "upcoming_lane": lambda i: board.search(*lanes[i], 5, week_two),
+            "morning_radius": lambda i: board.search_nearby(
+                lanes[i][0], None, lanes[i][2], 100, None, 5, 2.0, TimeWindow(mornings[i], mornings[i] + 6 * 3600)
+            ),
+            "upcoming_radius": lambda i: board.search_nearby(lanes[i][0], None, lanes[i][2], 100, None, 5, 2.0, week_two),
+            "empty_radius": lambda i: board.search_nearby(lanes[i][0], None, lanes[i][2], 100, None, 5, 2.0, after_board),
+        }
+        for name, fn in window_cases.items():
+            p50, p99 = _time(fn, queries)
+            print(f"{size:>9}  {name:<14} {'board':<7} {p50:>10.2f} {p99:>10.2f}")
+
+        p50, p99 = _time(lambda i: board.get(ids[i]), queries)
+        print(f"{size:>9}  {'get_by_id':<14} {'board':<7} {p50:>10.2f} {p99:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="30,1000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--linear-max", type=int, default=100000)
+    parser.add_argument("--store", choices=sorted(STORES), default="compact")
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.queries, args.linear_max, args.store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Cross-process metrics: correctness across worker exits and kills, and cost per update.
+
+    python -m benchmarks.metrics_multiprocess [--workers 4] [--threads 4] [--ops 20000]
+
+With METRICS_DIR pointing at a fresh directory, three generations of worker
+processes each bump the counters and a latency histogram from --threads threads:
+the first exits normally, the second is SIGKILLed after finishing, and the third
+stays up while a reader polls totals (folding the dead workers' files into the
+archive on start-up). The totals must equal exactly what was written, and never
+go down while being read. Exits non-zero on any mismatch.
+
+Also reports the cost of one add() / observe() for the in-process and mmap backends.
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("API_KEYS", "bench")
+if "METRICS_DIR" not in os.environ:
+    # inherited by the spawned workers, which re-import this module
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="bench-metrics-")
+
+COUNTER = "calls_started"
+HISTOGRAM = "negotiation_step_seconds"
+LATENCY = 0.0125
+
+
+def _work(threads: int, ops: int) -> None:
+    from app.core.state import METRICS
+
+    def run():
+        for _ in range(ops):
+            METRICS.add(COUNTER)
+            METRICS.observe(HISTOGRAM, LATENCY)
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+def _worker(threads: int, ops: int, done, linger) -> None:
+    _work(threads, ops)
+    done.set()
+    if linger:
+        time.sleep(3600)
+
+
+def _generation(ctx, workers: int, threads: int, ops: int, linger: bool):
+    procs = []
+    for _ in range(workers):
+        done = ctx.Event()
+        p = ctx.Process(target=_worker, args=(threads, ops, done, linger))
+        p.start()
+        procs.append((p, done))
+    for _, done in procs:
+        done.wait()
+    return [p for p, _ in procs]
+
+
+def _timing() -> None:
+    from app.core.metrics_store import LocalMetrics, MmapMetrics
+    from app.core.state import HISTOGRAMS
+    from app.schemas.domain import MetricsState
+
+    n = 200_000
+    backends = (
+        ("local", LocalMetrics(MetricsState.model_fields, HISTOGRAMS)),
+        ("mmap", MmapMetrics(MetricsState.model_fields, HISTOGRAMS, tempfile.mkdtemp(prefix="bench-metrics-"))),
+    )
+    print(f"{'backend':<8} {'add ns':>8} {'observe ns':>11} {'totals us':>10}")
+    for name, m in backends:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            m.add(COUNTER)
+        t1 = time.perf_counter()
+        for _ in range(n):
+            m.observe(HISTOGRAM, LATENCY)
+        t2 = time.perf_counter()
+        for _ in range(100):
+            m.totals()
+        t3 = time.perf_counter()
+        print(f"{name:<8} {(t1 - t0) / n * 1e9:>8.0f} {(t2 - t1) / n * 1e9:>11.0f} {(t3 - t2) / 100 * 1e6:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=20000)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    per_generation = args.workers * args.threads * args.ops
+    print(f"metrics dir {os.environ['METRICS_DIR']}; {per_generation} updates per generation")
+
+    # 1: workers that exit normally
+    for p in _generation(ctx, args.workers, args.threads, args.ops, linger=False):
+        p.join()
+
+    # 2: workers killed after their work is done
+    for p in _generation(ctx, args.workers, args.threads, args.ops, linger=True):
+        os.kill(p.pid, signal.SIGKILL)
+        p.join()
+
+    # 3: a live worker that compacts on start, read while it writes
+    from app.core.state import METRICS
+
+    live_done = ctx.Event()
+    live = ctx.Process(target=_worker, args=(args.threads, args.ops, live_done, True))
+    live.start()
+    expected = 2 * per_generation + args.threads * args.ops
+    last, reads, t0 = 0, 0, time.perf_counter()
+    failures = []
+    while True:
+        total = METRICS.totals()[COUNTER]
+        reads += 1
+        if total < last:
+            failures.append(f"total went down: {last} -> {total}")
+        last = total
+        if total >= expected or time.perf_counter() - t0 > 120:
+            break
+    read_s = time.perf_counter() - t0
+    os.kill(live.pid, signal.SIGKILL)
+    live.join()
+
+    totals = METRICS.totals()
+    hist = METRICS.histogram(HISTOGRAM)
+    files = sorted(os.listdir(os.environ["METRICS_DIR"]))
+    print(f"{reads} reads while the live worker wrote ({read_s / max(reads, 1) * 1e3:.2f} ms each)")
+    print(f"files now: {len([f for f in files if f.startswith('metrics-')])} process, {len([f for f in files if f.startswith('archive-')])} archive")
+
+    checks = {
+        COUNTER: (totals[COUNTER], expected),
+        f"{HISTOGRAM}.count": (hist["count"], expected),
+        f"{HISTOGRAM}.sum_seconds": (round(hist["sum_seconds"], 3), round(expected * LATENCY, 3)),
+    }
+    for name, (got, want) in checks.items():
+        status = "ok" if got == want else "MISMATCH"
+        print(f"{name:<40} {got:>14} {want:>14} {status}")
+        if got != want:
+            failures.append(name)
+
+    _timing()
+    if failures:
+        print("FAILED:", ", ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
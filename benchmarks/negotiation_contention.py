@@ -0,0 +1,154 @@
+"""
+Negotiation and webhook throughput under concurrency: global RLock vs striped locks.
+
+    python -m benchmarks.negotiation_contention [--calls 5000] [--workers 40] [--hold-us 0,200]
+
+Each simulated call runs three /v1/negotiations/step transitions (counter, counter,
+accept) and then the call-ended bookkeeping, with every call a task on a thread pool
+sized like FastAPI's (40). A reader thread polls the metrics overview throughout.
+--hold-us adds blocking work (I/O, a slow log write) inside each call-ended
+critical section; it is what turns lock scope into lost throughput.
+
+"legacy" is the previous design: one process-wide RLock taken separately by
+exists / start or counter / accept, and shared MetricsState fields. "striped" is
+the in-memory state backend, whose compare-and-set holds a call's lock stripe
+only for the swap itself.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+os.environ.setdefault("API_KEYS", "bench")
+
+from app.core import state  # noqa: E402
+from app.schemas.domain import CallState, MetricsState, NegotiationState  # noqa: E402
+from app.services import negotiation, state_store  # noqa: E402
+from benchmarks.synthetic import make_loads  # noqa: E402
+
+OFFER_FACTORS = (1.30, 1.20, 1.05)
+
+
+class Legacy:
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.negotiations: Dict[str, NegotiationState] = {}
+        self.calls: Dict[str, CallState] = {}
+        self.metrics = MetricsState()
+
+    def step(self, call_id, load, offer):
+        with self.lock:
+            exists = call_id in self.negotiations
+        if not exists:
+            st, decision, counter = negotiation._new_state(call_id, load, None, offer)
+            with self.lock:
+                self.negotiations[call_id] = st
+                self.metrics.negotiations_started += 1
+        else:
+            with self.lock:
+                st = self.negotiations[call_id]
+                st.round += 1
+                st.last_carrier_offer = offer
+                decision, counter = negotiation.decide(st.policy, offer, st.round)
+                st.last_counter_offer = counter
+        if decision == "accept":
+            with self.lock:
+                st.status = "accepted"
+                st.final_rate = offer
+                self.metrics.negotiations_accepted += 1
+                self.metrics.completed_rounds_total += st.round
+                self.metrics.completed_count += 1
+        return decision
+
+    def call_ended(self, call_id, hold):
+        with self.lock:
+            st = self.calls.setdefault(call_id, CallState(call_id=call_id))
+            self.metrics.calls_started += 1
+            st.ended_at = time.time()
+            if hold:
+                time.sleep(hold)
+            self.metrics.calls_ended += 1
+
+    def read_metrics(self):
+        with self.lock:
+            return self.metrics.avg_rounds()
+
+
+class Striped:
+    def step(self, call_id, load, offer):
+        return negotiation.step(call_id, load, None, offer)[1]
+
+    def call_ended(self, call_id, hold):
+        st = state_store.STORE.get_call(call_id) or CallState(call_id=call_id)
+        st.ended_at = time.time()
+        if hold:
+            time.sleep(hold)
+        if state_store.STORE.end_call(st):
+            state.METRICS.add("calls_started")
+            state.METRICS.add("calls_ended")
+
+    def read_metrics(self):
+        return state.metrics_snapshot().avg_rounds()
+
+
+def run_one(impl, calls: int, workers: int, hold: float, prefix: str) -> None:
+    loads = make_loads(256)
+    latencies: List[float] = []
+    stop = threading.Event()
+    reads = [0]
+
+    def reader():
+        while not stop.is_set():
+            impl.read_metrics()
+            reads[0] += 1
+            time.sleep(0.001)
+
+    def one_call(i: int):
+        call_id = f"{prefix}-{i}"
+        load = loads[i % len(loads)]
+        for f in OFFER_FACTORS:
+            t0 = time.perf_counter()
+            impl.step(call_id, load, round(load.loadboard_rate * f, 2))
+            latencies.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        impl.call_ended(call_id, hold)
+        latencies.append(time.perf_counter() - t0)
+
+    r = threading.Thread(target=reader, daemon=True)
+    r.start()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(one_call, range(calls)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    r.join()
+
+    latencies.sort()
+    ops = len(latencies)
+    print(
+        f"{type(impl).__name__.lower():<8} {hold * 1e6:>8.0f} {calls:>7} {ops / elapsed:>10.0f} "
+        f"{statistics.median(latencies) * 1e6:>9.1f} {latencies[int(ops * 0.99) - 1] * 1e6:>10.1f} {reads[0]:>7}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=40)
+    parser.add_argument("--hold-us", default="0,200")
+    args = parser.parse_args()
+
+    impls: List[Callable[[], object]] = [Legacy, Striped]
+    print(f"{'impl':<8} {'hold us':>8} {'calls':>7} {'ops/s':>10} {'p50 us':>9} {'p99 us':>10} {'reads':>7}")
+    for n, hold_us in enumerate(int(h) for h in args.hold_us.split(",")):
+        for impl in impls:
+            run_one(impl(), args.calls, args.workers, hold_us / 1e6, f"{impl.__name__}-{n}")
+
+
+if __name__ == "__main__":
+    main()
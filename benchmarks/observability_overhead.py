@@ -0,0 +1,160 @@
+"""
+What the request and span instrumentation costs.
+
+    python -m benchmarks.observability_overhead [--requests 5000] [--spans 200000]
+
+Drives the app's ASGI stack in-process (no sockets, no server) for GET /health and
+POST /v1/loads/search, built with and without RequestMetricsMiddleware, in
+alternating rounds; the difference in time per request is the middleware. Also
+times span() around an empty block, and a CPU-bound loop with the slow-request
+profiler off and sampling every 5 ms and 1 ms. Set METRICS_DIR to measure the
+shared-memory metrics store instead of the per-process one.
+
+Checks that the route histograms counted every instrumented request. Exits
+non-zero if not.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("API_KEYS", "bench")
+
+ROUNDS = 5
+
+
+def _scope(method: str, path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"x-api-key", os.environ["API_KEYS"].split(",")[0].encode()), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def _drive(stack, method: str, path: str, body: bytes, n: int) -> float:
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    base = _scope(method, path)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await stack(dict(base), receive, send)
+    elapsed = time.perf_counter() - t0
+    if any(s != 200 for s in statuses):
+        raise SystemExit(f"{method} {path}: unexpected statuses {sorted(set(statuses))}")
+    return elapsed / n
+
+
+def _stacks():
+    from app.core.observability import RequestMetricsMiddleware
+    from app.main import app
+
+    instrumented = app.build_middleware_stack()
+    kept = app.user_middleware
+    app.user_middleware = [m for m in kept if m.cls is not RequestMetricsMiddleware]
+    plain = app.build_middleware_stack()
+    app.user_middleware = kept
+    return plain, instrumented
+
+
+def _requests(n: int) -> list:
+    from app.core import observability
+
+    plain, instrumented = _stacks()
+    cases = [
+        ("GET", "/health", b""),
+        ("POST", "/v1/loads/search", json.dumps({"origin": "Dallas", "limit": 3}).encode()),
+    ]
+    failures = []
+    print(f"{'request':<26} {'plain us':>9} {'instr. us':>9} {'overhead us':>11}")
+    for method, path, body in cases:
+        before = observability.request_latency().get(f"{method} {path} 2xx", {}).get("count", 0)
+        best = {"plain": float("inf"), "instrumented": float("inf")}
+        for _ in range(ROUNDS):
+            best["plain"] = min(best["plain"], asyncio.run(_drive(plain, method, path, body, n)))
+            best["instrumented"] = min(best["instrumented"], asyncio.run(_drive(instrumented, method, path, body, n)))
+        print(f"{method + ' ' + path:<26} {best['plain'] * 1e6:>9.1f} {best['instrumented'] * 1e6:>9.1f} {(best['instrumented'] - best['plain']) * 1e6:>11.2f}")
+
+        counted = observability.request_latency()[f"{method} {path} 2xx"]["count"] - before
+        if counted != ROUNDS * n:
+            failures.append(f"{method} {path}: histogram counted {counted} of {ROUNDS * n} requests")
+    return failures
+
+
+def _spans(n: int) -> None:
+    from app.core.observability import span
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        pass
+    empty = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with span("load_search_seconds"):
+            pass
+    spanned = time.perf_counter() - t0
+    print(f"{'span() around nothing':<26} {(spanned - empty) / n * 1e9:>9.0f} ns")
+
+
+def _busy(iterations: int = 10_000_000) -> float:
+    t0 = time.perf_counter()
+    total = 0
+    for i in range(iterations):
+        total += i & 7
+    return time.perf_counter() - t0
+
+
+def _profiler() -> None:
+    from app.core import profiler
+
+    base = min(_busy() for _ in range(3))
+    print(f"{'profiler':<26} {'loop s':>9} {'slowdown':>9} {'per sample us':>13}")
+    print(f"{'off':<26} {base:>9.3f}")
+    for interval_ms in (5.0, 1.0):
+        profiler.start_profiler(interval_ms / 1e3, 1.0)
+        p = profiler.PROFILER
+        took = min(_busy() for _ in range(3))
+        cost = p.sample_seconds / max(p.sweeps, 1)
+        profiler.stop_profiler()
+        print(f"{f'sampling every {interval_ms:g} ms':<26} {took:>9.3f} {took / base - 1:>9.1%} {cost * 1e6:>13.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000, help="per round, per case")
+    parser.add_argument("--spans", type=int, default=200000)
+    args = parser.parse_args()
+
+    from app.core.state import METRICS
+
+    print(f"metrics store: {type(METRICS).__name__}")
+    failures = _requests(args.requests)
+    _spans(args.spans)
+    _profiler()
+    if failures:
+        print("FAILED:", "; ".join(failures))
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Policy backtest: a grid of negotiation policies over a large synthetic call history.
+
+    python -m benchmarks.policy_backtest [--calls 1000000] [--check-calls 20000]
+
+Times backtest.evaluate() on --calls calls against a 1000-policy grid
+(5 x 5 bands, 5 x 4 concession schedules, 2 round limits), next to a plain
+per-policy numpy pass timed on a few policies and extrapolated.
+
+Checks, on the first --check-calls calls: evaluate() agrees with the per-policy pass
+for every policy in the grid, and with replay() (the live decide(), which rounds
+to cents) for a handful of them. Exits non-zero on any mismatch.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("API_KEYS", "bench")
+
+GRID = dict(
+    band_low=[0.02, 0.05, 0.08, 0.10, 0.15],
+    band_high=[0.02, 0.05, 0.08, 0.10, 0.15],
+    concession_start=[0.1, 0.2, 0.25, 0.3, 0.4],
+    concession_step=[0.1, 0.2, 0.25, 0.3],
+    max_rounds=[2, 3],
+)
+
+
+def synthetic_history(n: int, seed: int = 11):
+    from app.services.backtest import History
+
+    rng = np.random.default_rng(seed)
+    L = rng.integers(16, 240, n) * 25.0
+    ask = np.round(L * rng.lognormal(np.log(1.12), 0.12, n), 0)
+    # what they would settle for: somewhere below the ask, occasionally under the loadboard rate
+    reservation = np.round(ask - L * rng.uniform(0.0, 0.2, n), 0)
+    return History(L, ask, reservation)
+
+
+def _per_policy(h, p):
+    """The same carrier model as one numpy pass over every call, for a single policy."""
+    floor, ceiling = 1 - p.band_low, 1 + p.band_high
+    done = (h.x >= floor) & (h.x <= ceiling)
+    rate = np.where(done, h.x, 0.0)
+    rounds = done.astype(np.float64)
+    for k in range(1, p.max_rounds + 1):
+        c = min(1.0, p.concession_start + p.concession_step * (k - 1))
+        counter = np.clip(1 + c * (h.x - 1), floor, ceiling)
+        take = ~done & (counter >= h.y - 1e-12)
+        rate[take] = counter[take]
+        rounds[take] = k + 1
+        done |= take
+    rounds[~done] = p.max_rounds + 1
+    booked = (h.L * done).sum()
+    margin = booked - (h.L * rate).sum()
+    return int(done.sum()), margin, rounds.sum()
+
+
+def _subset(h, n):
+    from app.services.backtest import History
+
+    out = History.__new__(History)
+    out.L, out.x, out.y = h.L[:n], h.x[:n], h.y[:n]
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--check-calls", type=int, default=20000)
+    parser.add_argument("--replay-policies", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.schemas.negotiation import BacktestRequest
+    from app.services.backtest import evaluate, policy_grid, replay
+
+    history = synthetic_history(args.calls)
+    grid = policy_grid(BacktestRequest(**GRID))
+    n = len(history)
+
+    t0 = time.perf_counter()
+    results = evaluate(history, grid)
+    swept = time.perf_counter() - t0
+
+    sample = grid[:: len(grid) // 8][:8]
+    t0 = time.perf_counter()
+    for p in sample:
+        _per_policy(history, p)
+    per_policy = (time.perf_counter() - t0) / len(sample)
+
+    print(f"{n} calls x {len(grid)} policies")
+    print(f"{'evaluate (whole grid)':<32} {swept:>8.2f} s  {n * len(grid) / swept / 1e6:>9.0f} M call-policies/s")
+    print(f"{'per-policy numpy pass (est.)':<32} {per_policy * len(grid):>8.2f} s  {n / per_policy / 1e6:>9.0f} M call-policies/s")
+    best = max(results, key=lambda r: r.margin_total)
+    print(f"best margin: {best.params.model_dump()} -> accept {best.acceptance_rate:.1%}, margin {best.margin_pct:.2%}")
+
+    failures = []
+    small = _subset(history, min(args.check_calls, n))
+    for p, r in zip(grid, evaluate(small, grid)):
+        accepted, margin, rounds = _per_policy(small, p)
+        if accepted != r.accepted or abs(margin - r.margin_total) > 1.0 or abs(rounds / len(small) - r.avg_rounds) > 1e-3:
+            failures.append(f"per-policy {p.model_dump()}: {(accepted, margin, rounds / len(small))} vs {r}")
+
+    # replay() goes through the live decide(), which rounds band edges and counters to
+    # cents; allow a call or two per thousand to land on the other side of an edge
+    for p in grid[:: len(grid) // args.replay_policies][: args.replay_policies]:
+        r = evaluate(small, [p])[0]
+        outcomes = [replay(p, L, x * L, y * L) for L, x, y in zip(small.L, small.x, small.y)]
+        accepted = sum(1 for ok, _, _ in outcomes if ok)
+        if abs(accepted - r.accepted) > len(small) * 0.002:
+            failures.append(f"replay {p.model_dump()}: {accepted} accepted vs {r.accepted}")
+    print(f"checked {len(grid)} policies against the per-policy pass and {args.replay_policies} against replay() on {len(small)} calls")
+
+    if failures:
+        print("FAILED:")
+        for f in failures[:10]:
+            print(" ", f)
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
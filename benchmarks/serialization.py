@@ -0,0 +1,103 @@
+"""
+Load search response encoding, before and after the pre-encoded fast path.
+
+    python -m benchmarks.serialization [--loads 5000] [--store compact|objects] [--iterations 2000]
+
+For 3, 50 and 500 matches, times the search handler's work after the request is
+parsed:
+
+  before  board.search() -> LoadSearchResponse -> FastAPI's response_model pass
+          (serialize_response: dump, validate, jsonable_encoder) -> JSONResponse
+  after   board.search_json() -> byte join, with each load's JSON cached per row
+  cold    the same with the row cache cleared before every search
+
+Checks that both produce byte-identical bodies. Exits non-zero if not.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("API_KEYS", "bench")
+
+SIZES = (3, 50, 500)
+
+
+def _timed(fn, iterations: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / iterations)
+    return best
+
+
+async def _timed_async(fn, iterations: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            await fn()
+        best = min(best, (time.perf_counter() - t0) / iterations)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loads", type=int, default=5000)
+    parser.add_argument("--store", default="compact", choices=["compact", "objects"])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import APIRoute, serialize_response
+
+    from app.core.fastjson import BACKEND
+    from app.main import app
+    from app.routers.loads import _search_response
+    from app.schemas.loads import LoadSearchResponse
+    from app.services.load_board import LoadBoard
+    from app.services.load_store import STORES
+    from benchmarks.synthetic import make_loads
+
+    field = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == "/v1/loads/search").response_field
+    board = LoadBoard.build(make_loads(args.loads), store_cls=STORES[args.store])
+    encoded = board._store.json
+
+    async def before(limit: int) -> bytes:
+        content = await serialize_response(field=field, response_content=LoadSearchResponse(matches=board.search(None, None, None, limit)))
+        return JSONResponse(content).body
+
+    def after(limit: int) -> bytes:
+        return _search_response(*board.search_json(None, None, None, limit)).body
+
+    def cold(limit: int) -> bytes:
+        encoded.cache_clear()
+        return after(limit)
+
+    print(f"{args.loads} loads, {args.store} store, encoder: {BACKEND}")
+    print(f"{'matches':>7} {'bytes':>8} {'before us':>10} {'after us':>9} {'cold us':>9} {'speedup':>8}")
+    failures = []
+    for limit in SIZES:
+        # fewer rounds for the big responses, so each size takes about as long
+        n = max(20, args.iterations * 3 // limit)
+        old, new = asyncio.run(before(limit)), after(limit)
+        if old != new:
+            failures.append(f"{limit} matches: bodies differ")
+        t_before = asyncio.run(_timed_async(lambda: before(limit), n))
+        t_after = _timed(lambda: after(limit), n)
+        t_cold = _timed(lambda: cold(limit), n)
+        print(f"{limit:>7} {len(new):>8} {t_before * 1e6:>10.1f} {t_after * 1e6:>9.1f} {t_cold * 1e6:>9.1f} {t_before / t_after:>7.1f}x")
+
+    if failures:
+        print("FAILED:", "; ".join(failures))
+        sys.exit(1)
+    print("bodies identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Negotiation steps from several worker processes against one state backend.
+
+    python -m benchmarks.state_backends [--calls 2000] [--procs 1,2,4] [--threads 8] [--postgres URL]
+
+Every process walks the same call_ids (offset so they collide mid-negotiation) with
+offers above the policy band, so each call counters until it is declined at round 4.
+A successful step advances a call by exactly one round, so the total of final
+rounds must equal the successful steps across all processes: any lost update or
+double-applied step shows up as a mismatch. Reports aggregate steps/s, steps
+rejected because the negotiation had already ended (409), and CAS give-ups.
+
+Backends: memory (single process only), sql on an SQLite file, and sql on
+Postgres when --postgres or BENCH_POSTGRES_URL is given.
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+os.environ.setdefault("API_KEYS", "bench")
+
+
+def _configure(backend: str, url: str) -> None:
+    from app.core.config import settings
+    from app.services import state_store
+
+    settings.state_backend = backend
+    settings.state_database_url = url or None
+    state_store.init_store()
+
+
+def _worker(args: Tuple[str, str, int, int, int, int]) -> Tuple[int, int, int, float]:
+    backend, url, calls, threads, offset, run = args
+    _configure(backend, url)
+
+    from fastapi import HTTPException
+
+    from app.services import negotiation
+    from benchmarks.synthetic import make_loads
+
+    loads = make_loads(64)
+    ok = rejected = conflicts = 0
+
+    def one_call(i: int) -> Tuple[int, int, int]:
+        i = (i + offset) % calls
+        load = loads[i % len(loads)]
+        counts = [0, 0, 0]
+        for _ in range(4):
+            try:
+                negotiation.step(f"r{run}-{i}", load, None, round(load.loadboard_rate * 1.5, 2))
+                counts[0] += 1
+            except HTTPException as e:
+                counts[1 if "already" in str(e.detail) else 2] += 1
+        return counts[0], counts[1], counts[2]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for a, b, c in pool.map(one_call, range(calls)):
+            ok, rejected, conflicts = ok + a, rejected + b, conflicts + c
+    return ok, rejected, conflicts, time.perf_counter() - t0
+
+
+def _final_rounds(backend: str, url: str, calls: int, run: int) -> int:
+    if backend != "memory":
+        _configure(backend, url)
+    from app.services import state_store
+
+    return sum(state_store.STORE.get_negotiation(f"r{run}-{i}").round for i in range(calls))
+
+
+def run_case(backend: str, url: str, calls: int, procs: int, threads: int, run: int) -> None:
+    jobs = [(backend, url, calls, threads, p * calls // procs // 2, run) for p in range(procs)]
+    if procs == 1:
+        results: List[Tuple[int, int, int, float]] = [_worker(jobs[0])]
+    else:
+        with multiprocessing.get_context("spawn").Pool(procs) as pool:
+            results = pool.map(_worker, jobs)
+    # timed inside the workers, so process start-up and imports are left out
+    wall = max(r[3] for r in results)
+
+    ok = sum(r[0] for r in results)
+    rejected = sum(r[1] for r in results)
+    conflicts = sum(r[2] for r in results)
+    # a single worker runs in this process, so the memory backend can be checked too
+    rounds = _final_rounds(backend, url, calls, run)
+    label = backend if backend == "memory" else f"sql/{url.split(':', 1)[0]}"
+    print(
+        f"{label:<16} {procs:>5} {ok:>8} {ok / wall:>9.0f} {rejected:>9} {conflicts:>9} "
+        f"{'ok' if rounds == ok else f'MISMATCH {rounds}':>10}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--procs", default="1,2,4")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--postgres", default=os.getenv("BENCH_POSTGRES_URL"))
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-state-")
+    backends = [("memory", ""), ("sql", f"sqlite:///{tmp}/state.db")]
+    if args.postgres:
+        backends.append(("sql", args.postgres))
+
+    print(f"{'backend':<16} {'procs':>5} {'steps':>8} {'steps/s':>9} {'rejected':>9} {'conflicts':>9} {'rounds':>10}")
+    run = int(time.time())
+    for backend, url in backends:
+        for procs in [int(p) for p in args.procs.split(",")]:
+            if backend == "memory" and procs > 1:
+                continue
+            run += 1
+            run_case(backend, url, args.calls, procs, args.threads, run)
+
+
+if __name__ == "__main__":
+    main()
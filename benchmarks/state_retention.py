@@ -0,0 +1,123 @@
+"""
+Memory held by call and negotiation state over a long run, with and without retention.
+
+    python -m benchmarks.state_retention [--calls 5000] [--transcript-kb 8] [--budget-mb 8]
+
+Each simulated call takes two negotiation steps and ends with a call-ended webhook
+carrying a transcript of --transcript-kb. With retention, the sweeper runs every
+500 calls against a --budget-mb memory budget (the TTLs are left long, so it is the
+budget that evicts). Reports the Python heap held by the state store (tracemalloc)
+and the store's gauges.
+
+Then checks that eviction kept the behaviour: a retried webhook for the first call
+is still idempotent, a further step on its negotiation still gets 409, and every
+call has its row in the calls table, including ones whose row was deleted on
+purpose before the sweep (the archive step writes them again). Exits non-zero on
+any failure.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("API_KEYS", "bench")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-retention-')}/calls.db")
+
+SWEEP_EVERY = 500
+
+
+def _run(calls: int, transcript_kb: int, budget: int, sweep: bool, run: str):
+    from fastapi import HTTPException
+    from sqlalchemy import delete, func, select
+
+    import app.db as db
+    from app.core.config import settings
+    from app.models import CallRecord
+    from app.routers.webhooks import call_ended
+    from app.schemas.api import WebhookCallEnded
+    from app.services import negotiation, retention, state_store
+    from benchmarks.synthetic import make_loads
+
+    settings.state_max_bytes = budget
+    state_store.init_store()
+    sweeper = retention.StateSweeper(interval=0)
+    loads = make_loads(64)
+    transcript = "carrier: sounds good. " * (transcript_kb * 1024 // 22)
+    failures = []
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    for i in range(calls):
+        call_id = f"{run}-{i}"
+        load = loads[i % len(loads)]
+        negotiation.step(call_id, load, None, round(load.loadboard_rate * 1.3, 2))
+        negotiation.step(call_id, load, None, load.loadboard_rate)
+        call_ended(WebhookCallEnded(call_id=call_id, outcome="accepted", summary={"summary": f"{call_id} {transcript}", "sentiment": "positive"}))
+        if i == 10:
+            # lose a few rows, as if their write had failed; archiving must bring them back
+            with db.SessionLocal() as session:
+                session.execute(delete(CallRecord).where(CallRecord.call_id.in_([f"{run}-{j}" for j in range(5)])))
+                session.commit()
+        if sweep and (i + 1) % SWEEP_EVERY == 0:
+            sweeper.sweep_once()
+    elapsed = time.perf_counter() - t0
+    held = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    gauges = state_store.STORE.gauges()
+    print(
+        f"{'retention' if sweep else 'none':<10} {calls / elapsed:>8.0f} {held / 2**20:>9.1f} "
+        f"{gauges['calls']:>7} {gauges['negotiations']:>7} {gauges['tombstones']:>10} {sweeper.totals['evicted']:>8}"
+    )
+
+    if sweep:
+        first = f"{run}-0"
+        reply = call_ended(WebhookCallEnded(call_id=first, outcome="declined"))
+        if not reply.get("idempotent"):
+            failures.append("retried webhook for an evicted call was not idempotent")
+        try:
+            negotiation.step(first, loads[0], None, loads[0].loadboard_rate)
+            failures.append("step on an evicted negotiation was accepted")
+        except HTTPException as e:
+            if e.status_code != 409:
+                failures.append(f"step on an evicted negotiation: {e.status_code}")
+        if gauges["bytes"] > budget:
+            failures.append(f"estimated bytes {gauges['bytes']} over budget {budget}")
+
+    with db.SessionLocal() as session:
+        stored = session.execute(select(func.count()).where(CallRecord.call_id.like(f"{run}-%"))).scalar()
+    if sweep and stored != calls:
+        failures.append(f"calls table has {stored} of {calls} calls")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--transcript-kb", type=int, default=8)
+    parser.add_argument("--budget-mb", type=float, default=8)
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    from app.db import init_db
+
+    settings.call_write_behind = False
+    init_db()
+
+    print(f"{'state':<10} {'calls/s':>8} {'held MiB':>9} {'calls':>7} {'negs':>7} {'tombstones':>10} {'evicted':>8}")
+    budget = int(args.budget_mb * 2**20)
+    failures = _run(args.calls, args.transcript_kb, budget, sweep=False, run=f"n{int(time.time())}")
+    failures += _run(args.calls, args.transcript_kb, budget, sweep=True, run=f"r{int(time.time())}")
+    if failures:
+        print("FAILED:", "; ".join(failures))
+        sys.exit(1)
+    print("retention checks ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Call persistence and dashboard query latency per storage backend.
+
+    python -m benchmarks.storage_backends [--rows 100000] [--sqlite /tmp/bench_calls.db]
+                                          [--postgres postgresql://...]
+
+The SQLite file is recreated on each run. Against Postgres (also read from
+BENCH_POSTGRES_URL), rows are appended under a fresh call_id prefix and left in
+place, so point it at a scratch database. Per backend it reports:
+- single-call upsert latency on the insert and update paths;
+- batched write-behind flush throughput;
+- the dashboard reads.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import secrets
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+os.environ.setdefault("API_KEYS", "bench")
+
+import app.db as db  # noqa: E402
+from app.services import call_store, dashboard, rollups  # noqa: E402
+from benchmarks.synthetic import iter_call_records  # noqa: E402
+
+
+def _latency(fn: Callable[[int], object], n: int) -> str:
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return f"p50 {statistics.median(samples) * 1e3:8.3f} ms   p99 {samples[int(n * 0.99) - 1] * 1e3:8.3f} ms"
+
+
+def _rows(n: int, prefix: str, seed: int) -> List[dict]:
+    return [dict(r, call_id=f"{prefix}-{r['call_id']}") for r in iter_call_records(n, seed=seed)]
+
+
+def run(name: str, url: str, rows: int, batch_size: int, singles: int) -> None:
+    os.environ["DATABASE_URL"] = url
+    db.init_db()
+    prefix = secrets.token_hex(3)
+    print(f"== {name}: {url.split('@')[-1]}")
+
+    bulk = _rows(rows, prefix, seed=13)
+    t0 = time.perf_counter()
+    it = iter(bulk)
+    while True:
+        chunk = list(itertools.islice(it, batch_size))
+        if not chunk:
+            break
+        call_store.write_rows(chunk)
+    elapsed = time.perf_counter() - t0
+    print(f"  batched flush ({batch_size}/txn)   {rows / elapsed:10.0f} calls/s")
+
+    fresh = _rows(singles, prefix + "s", seed=17)
+    print(f"  single upsert, insert    {_latency(lambda i: call_store.write_rows([fresh[i]]), singles)}")
+    print(f"  single upsert, update    {_latency(lambda i: call_store.write_rows([dict(fresh[i], outcome='OTHER')]), singles)}")
+
+    t0 = time.perf_counter()
+    rollups.rebuild()
+    print(f"  rollups rebuild          {(time.perf_counter() - t0) * 1e3:10.1f} ms")
+
+    cursor = (bulk[100]["ended_at"], bulk[100]["call_id"])
+    reads = {
+        "snapshot (uncached)": lambda i: (dashboard.bump_version(), dashboard.snapshot(20)),
+        "overview": lambda i: dashboard.overview(),
+        "calls page, deep": lambda i: dashboard.list_calls(50, cursor=cursor),
+        "calls page, filtered": lambda i: dashboard.list_calls(50, cursor=cursor, outcome="ACCEPTED"),
+    }
+    for label, fn in reads.items():
+        print(f"  {label:<24} {_latency(fn, 200)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--singles", type=int, default=500)
+    parser.add_argument("--sqlite", default="/tmp/bench_calls.db")
+    parser.add_argument("--postgres", default=os.getenv("BENCH_POSTGRES_URL"))
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        Path(args.sqlite + suffix).unlink(missing_ok=True)
+    run("sqlite (WAL)", f"sqlite:///{args.sqlite}", args.rows, args.batch_size, args.singles)
+
+    postgres: Optional[str] = args.postgres
+    if postgres:
+        run("postgres", postgres, args.rows, args.batch_size, args.singles)
+    else:
+        print("== postgres: skipped (pass --postgres or set BENCH_POSTGRES_URL)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Service-layer microbenchmarks on synthetic boards and call histories, with
+machine-readable results and a regression check against a stored baseline.
+
+    python -m benchmarks.suite [--scales 1k,100k,1M] [--skew 1.1] [--cases loads.,negotiation.] [--out results.json]
+    python -m benchmarks.suite --compare baseline.json [--threshold 0.2] [--out current.json]
+    python -m benchmarks.suite --list
+
+For each scale, a board of that many loads (lanes and equipment skewed with --skew,
+see synthetic.Lanes) is published as state.BOARD. A call history of the same size
+(capped at --history-max) is written to a fresh SQLite file, with rollups.
+Searches are drawn from the same skewed lanes, so they hit the hot lanes the way
+real traffic does. Cases that do not depend on the board or the history run once,
+under scale 0.
+
+Each case calls one service function --iterations times (fewer for the database
+cases, see SLOW), after a short warm-up, timing every call. Results hold p50 /
+p99 / mean per call in microseconds.
+
+--compare matches cases by (case, scale) and flags a regression when p50 grew by
+more than --threshold and by more than --min-delta-us. Exits 1 if any case
+regressed, so the suite can gate CI.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+os.environ.setdefault("API_KEYS", "bench")
+
+# iterations for cases that commit or query the database, instead of --iterations
+SLOW = {
+    "call_store.upsert_call_record.insert": 300,
+    "call_store.upsert_call_record.update": 300,
+    "dashboard.overview": 200,
+    "dashboard.outcome_counts": 200,
+    "dashboard.daily": 100,
+    "dashboard.list_calls": 200,
+    "dashboard.list_calls.outcome": 200,
+}
+SCALE_INDEPENDENT = ("negotiation.", "webhooks.")
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000, "1M": 1000000}
+
+
+class Context:
+    """Fixtures for one scale, built on first use."""
+
+    def __init__(self, scale: int, skew: float, history_max: int, workdir: str) -> None:
+        self.scale = scale
+        self.skew = skew
+        self.history_max = history_max
+        self.workdir = workdir
+        self.rng = random.Random(scale)
+        self._loads = None
+        self._history: Optional[int] = None
+
+    def loads(self):
+        if self._loads is None:
+            from app.core import state
+            from app.services.load_board import LoadBoard
+            from benchmarks.synthetic import make_loads
+
+            self._loads = make_loads(self.scale, skew=self.skew)
+            board = LoadBoard.build(self._loads)
+            board.version = state.BOARD.version + 1
+            state.BOARD = board
+        return self._loads
+
+    def lanes(self, n: int) -> List[Tuple[str, str, str]]:
+        from benchmarks.synthetic import Lanes
+
+        lanes = Lanes(self.skew, seed=self.scale + 1)
+        return [(*lanes.lane(), lanes.equipment()) for _ in range(n)]
+
+    def history(self) -> int:
+        """Rows in a fresh calls table of min(scale, history_max) synthetic calls."""
+        if self._history is None:
+            from sqlalchemy import insert
+
+            import app.db as db
+            from app.models import CallRecord
+            from app.services import rollups
+            from benchmarks.synthetic import iter_call_records
+
+            os.environ["DATABASE_URL"] = f"sqlite:///{self.workdir}/calls-{self.scale}.db"
+            db.init_db()
+            self._history = min(self.scale, self.history_max)
+            rows = iter_call_records(self._history, skew=self.skew, loads=self.scale)
+            with db.engine.begin() as conn:
+                while True:
+                    chunk = list(itertools.islice(rows, 10000))
+                    if not chunk:
+                        break
+                    conn.execute(insert(CallRecord), chunk)
+            rollups.rebuild()
+        return self._history
+
+
+# a case: setup(ctx, n) -> (fn(i), rows it runs against)
+Case = Callable[[Context, int], Tuple[Callable[[int], object], int]]
+
+
+def _search(kind: str) -> Case:
+    def setup(ctx: Context, n: int):
+        from app.services import loads as load_service
+
+        ctx.loads()
+        lanes = ctx.lanes(n)
+        if kind == "lane":
+            return (lambda i: load_service.search(*lanes[i], 20)), ctx.scale
+        if kind == "origin":
+            return (lambda i: load_service.search(lanes[i][0], None, None, 20)), ctx.scale
+        return (lambda i: load_service.search(None, None, None, 20)), ctx.scale
+
+    return setup
+
+
+def _get_by_id(ctx: Context, n: int):
+    from app.services import loads as load_service
+
+    ids = [ctx.rng.choice(ctx.loads()).load_id for _ in range(n)]
+    return (lambda i: load_service.get_by_id(ids[i])), ctx.scale
+
+
+def _offers(ctx: Context, n: int):
+    from benchmarks.synthetic import make_loads
+
+    loads = make_loads(64, skew=ctx.skew)
+    return [(loads[i % 64], round(loads[i % 64].loadboard_rate * ctx.rng.uniform(0.85, 1.4), 2)) for i in range(n)]
+
+
+def _decide(ctx: Context, n: int):
+    from app.services import negotiation
+
+    offers = _offers(ctx, n)
+    policies = [negotiation.make_policy(load.loadboard_rate) for load, _ in offers]
+    return (lambda i: negotiation.decide(policies[i], offers[i][1], 1 + i % 3)), 0
+
+
+def _fresh_store():
+    from app.services import state_store
+
+    state_store.STORE = state_store.MemoryStateStore()
+
+
+def _start(ctx: Context, n: int):
+    from app.services import negotiation
+
+    _fresh_store()
+    offers = _offers(ctx, n)
+    return (lambda i: negotiation.start(f"start-{i}", offers[i][0], None, offers[i][1])), 0
+
+
+def _counter(ctx: Context, n: int):
+    from app.services import negotiation
+
+    _fresh_store()
+    offers = _offers(ctx, n)
+    for i, (load, _) in enumerate(offers):
+        # far above the band, so each call stays open for its counter
+        negotiation.start(f"counter-{i}", load, None, round(load.loadboard_rate * 1.5, 2))
+    return (lambda i: negotiation.counter(f"counter-{i}", round(offers[i][0].loadboard_rate * 1.3, 2))), 0
+
+
+def _dashboard_record(ctx: Context, n: int):
+    from app.routers.webhooks import _build_dashboard_record
+    from app.schemas.api import WebhookCallEnded
+    from app.services import negotiation
+
+    _fresh_store()
+    payloads = []
+    for i, (load, offer) in enumerate(_offers(ctx, n)):
+        negotiation.step(f"call-{i}", load, None, offer)
+        summary = {"summary": "Carrier asked about detention and lumper fees. " * 8, "sentiment": "Positive", "verified": True}
+        payloads.append(WebhookCallEnded(call_id=f"call-{i}", outcome="accepted", summary=summary))
+    return (lambda i: _build_dashboard_record(payloads[i].call_id, payloads[i])), 0
+
+
+def _upsert(update: bool) -> Case:
+    def setup(ctx: Context, n: int):
+        from app.services.call_store import upsert_call_record
+        from benchmarks.synthetic import iter_call_records
+
+        rows = ctx.history()
+        tag = "u" if update else "i"
+        records = [dict(r, call_id=f"bench-{tag}-{i}") for i, r in enumerate(iter_call_records(n, seed=99, skew=ctx.skew))]
+        if update:
+            for r in records:
+                upsert_call_record(r, None)
+        return (lambda i: upsert_call_record(records[i], "Carrier confirmed pickup window.")), rows
+
+    return setup
+
+
+def _dashboard(name: str) -> Case:
+    def setup(ctx: Context, n: int):
+        from app.services import dashboard
+
+        rows = ctx.history()
+        fns = {
+            "overview": dashboard.overview,
+            "outcome_counts": dashboard.outcome_counts,
+            "daily": lambda: dashboard.daily(30),
+            "list_calls": lambda: dashboard.list_calls(50),
+            "list_calls.outcome": lambda: dashboard.list_calls(50, outcome="ACCEPTED"),
+        }
+        fn = fns[name]
+        return (lambda i: fn()), rows
+
+    return setup
+
+
+CASES: Dict[str, Case] = {
+    "loads.search.lane": _search("lane"),
+    "loads.search.origin": _search("origin"),
+    "loads.search.open": _search("open"),
+    "loads.get_by_id": _get_by_id,
+    "negotiation.decide": _decide,
+    "negotiation.start": _start,
+    "negotiation.counter": _counter,
+    "webhooks.build_dashboard_record": _dashboard_record,
+    "call_store.upsert_call_record.insert": _upsert(update=False),
+    "call_store.upsert_call_record.update": _upsert(update=True),
+    "dashboard.overview": _dashboard("overview"),
+    "dashboard.outcome_counts": _dashboard("outcome_counts"),
+    "dashboard.daily": _dashboard("daily"),
+    "dashboard.list_calls": _dashboard("list_calls"),
+    "dashboard.list_calls.outcome": _dashboard("list_calls.outcome"),
+}
+
+
+def _measure(fn: Callable[[int], object], n: int, warmup: int) -> Dict[str, float]:
+    for i in range(warmup):
+        fn(n + i)
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "n": n,
+        "p50_us": round(statistics.median(samples) * 1e6, 3),
+        "p99_us": round(samples[max(0, int(len(samples) * 0.99) - 1)] * 1e6, 3),
+        "mean_us": round(mean * 1e6, 3),
+        "ops_per_s": round(1 / mean, 1) if mean else 0.0,
+    }
+
+
+def run(scales: List[int], names: List[str], iterations: int, skew: float, history_max: int) -> List[dict]:
+    results = []
+    workdir = tempfile.mkdtemp(prefix="bench-suite-")
+    for scale in scales:
+        ctx = Context(scale, skew, history_max, workdir)
+        for name in names:
+            if name.startswith(SCALE_INDEPENDENT) and scale != scales[0]:
+                continue
+            n = min(iterations, SLOW.get(name, iterations))
+            warmup = max(1, n // 20)
+            fn, rows = CASES[name](ctx, n + warmup)
+            result = {"case": name, "scale": 0 if name.startswith(SCALE_INDEPENDENT) else scale, "rows": rows}
+            result.update(_measure(fn, n, warmup))
+            results.append(result)
+            print(
+                f"{name:<40} {result['scale']:>8} {rows:>8} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f} {result['ops_per_s']:>10.0f}",
+                flush=True,
+            )
+    return results
+
+
+def _meta(args) -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        rev = ""
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "skew": args.skew,
+        "iterations": args.iterations,
+        "history_max": args.history_max,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_us: float) -> int:
+    """Print current vs baseline p50 per case; returns how many cases regressed."""
+    base = {(r["case"], r["scale"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\n{'case':<40} {'scale':>8} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for r in current["results"]:
+        b = base.pop((r["case"], r["scale"]), None)
+        if b is None:
+            print(f"{r['case']:<40} {r['scale']:>8} {'':>10} {r['p50_us']:>10.1f} {'':>8}  new")
+            continue
+        change = r["p50_us"] / b["p50_us"] - 1 if b["p50_us"] else 0.0
+        flag = ""
+        if change > threshold and r["p50_us"] - b["p50_us"] > min_delta_us:
+            flag = "REGRESSION"
+            regressions += 1
+        elif change < -threshold and b["p50_us"] - r["p50_us"] > min_delta_us:
+            flag = "faster"
+        print(f"{r['case']:<40} {r['scale']:>8} {b['p50_us']:>10.1f} {r['p50_us']:>10.1f} {change:>+8.1%}  {flag}")
+    if base:
+        print(f"({len(base)} baseline results not covered by this run)")
+    return regressions
+
+
+def _scale(text: str) -> int:
+    return SCALES.get(text) or int(float(text))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1k,100k")
+    parser.add_argument("--cases", default="", help="comma-separated case name prefixes")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--history-max", type=int, default=100000)
+    parser.add_argument("--out")
+    parser.add_argument("--compare", help="baseline results file")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--min-delta-us", type=float, default=2.0)
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(CASES))
+        return
+
+    prefixes = [p for p in args.cases.split(",") if p]
+    names = [name for name in CASES if not prefixes or name.startswith(tuple(prefixes))]
+    scales = [_scale(s) for s in args.scales.split(",") if s]
+
+    print(f"{'case':<40} {'scale':>8} {'rows':>8} {'p50 us':>10} {'p99 us':>10} {'ops/s':>10}")
+    current = {"meta": _meta(args), "results": run(scales, names, args.iterations, args.skew, args.history_max)}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.min_delta_us)
+        if regressions:
+            print(f"{regressions} case(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
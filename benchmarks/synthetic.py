@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import csv
+import itertools
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+from app.schemas.domain import Load
+from app.services.geo import GAZETTEER_FILE
+
+EQUIPMENT = ["dry_van", "dry van", "reefer", "flatbed"]
+
+# pickups fall on the hour across the PICKUP_DAYS days from PICKUP_START
+PICKUP_START = datetime(2026, 1, 26, tzinfo=timezone.utc)
+PICKUP_DAYS = 14
+
+
+def board_cities() -> List[str]:
+    with open(GAZETTEER_FILE, "r", encoding="utf-8", newline="") as f:
+        return [f"{r['city']}, {r['state']}" for r in csv.DictReader(f)]
+
+
+# share of loads by equipment on a skewed board (spellings of one type split its share)
+EQUIPMENT_WEIGHTS = [0.35, 0.2, 0.3, 0.15]
+
+
+def zipf_weights(n: int, s: float) -> List[float]:
+    """Cumulative weights for rank r ~ 1 / r**s, for random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(1.0 / (r + 1) ** s for r in range(n)))
+
+
+class Lanes:
+    """
+    Origin, destination and equipment draws. With skew > 0, cities follow a Zipf law
+    (a few hub markets carry most freight, as on a real board) and equipment is mostly
+    dry van; skew 0 is uniform. Searches drawn from the same Lanes hit the hot lanes.
+    """
+
+    def __init__(self, skew: float = 0.0, seed: int = 7) -> None:
+        self.rng = random.Random(seed)
+        self.cities = board_cities()
+        self.skew = skew
+        if skew:
+            # origins and destinations rank the markets differently, so hubs are not all round trips
+            self.origins = list(self.cities)
+            self.destinations = list(self.cities)
+            random.Random(seed + 1).shuffle(self.destinations)
+            self.weights = zipf_weights(len(self.cities), skew)
+
+    def lane(self) -> tuple:
+        if not self.skew:
+            return tuple(self.rng.sample(self.cities, 2))
+        while True:
+            origin = self.rng.choices(self.origins, cum_weights=self.weights)[0]
+            destination = self.rng.choices(self.destinations, cum_weights=self.weights)[0]
+            if origin != destination:
+                return origin, destination
+
+    def equipment(self) -> str:
+        if not self.skew:
+            return self.rng.choice(EQUIPMENT)
+        return self.rng.choices(EQUIPMENT, weights=EQUIPMENT_WEIGHTS)[0]
+
+
+def iter_load_dicts(n: int, seed: int = 7, skew: float = 0.0) -> Iterator[dict]:
+    lanes = Lanes(skew, seed)
+    rng = lanes.rng
+    # its own stream, so the other fields are the same as before times were drawn
+    times = random.Random(seed + 2)
+
+    for i in range(n):
+        origin, destination = lanes.lane()
+        pickup = PICKUP_START + timedelta(hours=times.randrange(PICKUP_DAYS * 24))
+        delivery = pickup + timedelta(hours=times.randrange(6, 96))
+        yield dict(
+            load_id=f"SYN-{i:07d}",
+            origin=origin,
+            destination=destination,
+            pickup_datetime=pickup.isoformat(),
+            delivery_datetime=delivery.isoformat(),
+            equipment_type=lanes.equipment(),
+            loadboard_rate=float(rng.randrange(400, 6000, 25)),
+            notes=None,
+            weight=float(rng.randrange(5000, 45000, 500)),
+            commodity_type="general_freight",
+            num_of_pieces=rng.randrange(1, 30),
+            miles=float(rng.randrange(100, 2500)),
+            dimensions=None,
+        )
+
+
+def make_loads(n: int, seed: int = 7, skew: float = 0.0) -> List[Load]:
+    return [Load.model_construct(**d) for d in iter_load_dicts(n, seed, skew)]
+
+
+OUTCOMES = ["ACCEPTED", "DECLINED", "NO_MATCHING_LOAD", "FAILED_VERIFICATION", "CALL_DROPPED", "OTHER"]
+SENTIMENTS = ["Positive", "Neutral", "Negative", None]
+
+
+# roughly what an inbound desk sees: most calls negotiate, a few never find a load
+OUTCOME_WEIGHTS = [0.35, 0.25, 0.15, 0.08, 0.1, 0.07]
+
+
+def iter_call_records(n: int, seed: int = 13, start_ts: int = 1767225600, skew: float = 0.0, loads: int = 100000) -> Iterator[dict]:
+    """
+    Rows shaped like the `calls` table, one call every ~30s from start_ts. With
+    skew > 0, outcomes follow OUTCOME_WEIGHTS and calls concentrate on the first
+    load_ids (Zipf over `loads`), the way hot lanes draw most calls.
+    """
+    rng = random.Random(seed)
+    load_weights = zipf_weights(loads, skew) if skew else None
+    ts = start_ts
+    for i in range(n):
+        ts += rng.randrange(1, 60)
+        outcome = rng.choices(OUTCOMES, weights=OUTCOME_WEIGHTS)[0] if skew else rng.choice(OUTCOMES)
+        rate = float(rng.randrange(400, 6000, 25))
+        negotiated = outcome in ("ACCEPTED", "DECLINED")
+        rounds = rng.randrange(1, 4) if negotiated else None
+        last_offer = round(rate * rng.uniform(0.95, 1.3), 2) if negotiated else None
+        final_offer = round(rate * rng.uniform(0.95, 1.1), 2) if outcome == "ACCEPTED" else None
+        yield {
+            "call_id": f"call-{i:08d}",
+            "ended_at": ts,
+            "outcome": outcome,
+            "sentiment": rng.choice(SENTIMENTS),
+            "verified": outcome != "FAILED_VERIFICATION",
+            "load_id": f"SYN-{_load_index(rng, loads, load_weights):07d}" if negotiated else None,
+            "loadboard_rate": rate if negotiated else None,
+            "rounds": rounds,
+            "carrier_last_offer": last_offer,
+            "final_offer": final_offer,
+            "agreed": outcome == "ACCEPTED",
+            "transfer_to_rep": outcome == "ACCEPTED",
+            "summary": "Carrier asked about detention and lumper fees. " * 8,
+        }
+
+
+def _load_index(rng: random.Random, loads: int, cum_weights: Optional[List[float]]) -> int:
+    if cum_weights is None:
+        return rng.randrange(loads)
+    return rng.choices(range(loads), cum_weights=cum_weights)[0]
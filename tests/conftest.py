@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+# Settings() requires API_KEYS at import time
+os.environ.setdefault("API_KEYS", "test-key")
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh SQLite database behind app.db, set up the way init_db() does at startup."""
+    import app.db as db
+
+    for name in ("engine", "SessionLocal", "write_engine", "WriteSessionLocal"):
+        monkeypatch.setattr(db, name, None)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    db.init_db()
+    yield db
+    for eng in {db.engine, db.write_engine} - {None}:
+        eng.dispose()
@@ -0,0 +1,147 @@
+"""AdmissionMiddleware: per-key throttling, load shedding, Retry-After, and how long a request holds its slot."""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import admission, security
+from app.core.config import settings
+from app.core.state import METRICS
+
+
+class StuckProbe:
+    def __init__(self, latency: float) -> None:
+        self._latency = latency
+
+    def latency(self) -> float:
+        return self._latency
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    def configure(keys="k1,k2", rate=0.0, burst=0.0, concurrency=32, overrides=None, shed_ms=1000.0, latency=0.0):
+        monkeypatch.setattr(settings, "api_keys", keys)
+        monkeypatch.setattr(settings, "api_key_rate_per_second", rate)
+        monkeypatch.setattr(settings, "api_key_burst", burst)
+        monkeypatch.setattr(settings, "api_key_max_concurrency", concurrency)
+        monkeypatch.setattr(settings, "api_key_limits", json.dumps(overrides) if overrides else None)
+        monkeypatch.setattr(settings, "shed_queue_ms", shed_ms)
+        monkeypatch.setattr(admission, "PROBE", StuckProbe(latency))
+        monkeypatch.setattr(admission, "_KEYS", None)
+    return configure
+
+
+def scope(key=None):
+    headers = [(b"x-api-key", key.encode())] if key is not None else []
+    return {"type": "http", "method": "GET", "path": "/", "headers": headers}
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def call(key, app=endpoint):
+    """Status, headers and body of one request through the middleware."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(admission.AdmissionMiddleware(app)(scope(key), receive, send))
+    headers = {name.decode(): value.decode() for name, value in sent[0].get("headers", [])}
+    return sent[0]["status"], headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_requests_without_a_known_key_pass_through_uncounted(limits):
+    limits(concurrency=1, shed_ms=1.0, latency=5.0)
+    before = METRICS.totals()
+    assert call(None)[0] == 200 and call("nope")[0] == 200
+    assert METRICS.totals()["requests_admitted"] == before["requests_admitted"]
+
+
+def test_rate_limit_throttles_with_retry_after(limits):
+    limits(rate=0.1, burst=2)
+    before = METRICS.totals()["requests_throttled"]
+    assert [call("k1")[0] for _ in range(2)] == [200, 200]
+    status, headers, body = call("k1")
+    assert status == 429 and headers["retry-after"] == "10"
+    assert json.loads(body) == {"detail": "Rate limit exceeded for this API key"}
+    # buckets are per key
+    assert call("k2")[0] == 200
+    assert admission.lookup("k1").counts == {"admitted": 2, "throttled": 1, "shed": 0}
+    assert METRICS.totals()["requests_throttled"] == before + 1
+
+
+def test_limits_override_by_fingerprint(limits):
+    limits(rate=0.1, burst=1, overrides={admission.fingerprint("k2"): {"rate": 0, "concurrency": 0}})
+    assert [call("k1")[0] for _ in range(2)] == [200, 429]
+    assert [call("k2")[0] for _ in range(5)] == [200] * 5
+
+
+@pytest.mark.parametrize("latency, retry_after", [(1.5, "2"), (0.2, "1")])
+def test_backed_up_pool_sheds_every_key(limits, latency, retry_after):
+    limits(shed_ms=100.0, latency=latency)
+    status, headers, body = call("k1")
+    assert status == 429 and headers["retry-after"] == retry_after
+    assert json.loads(body) == {"detail": "Server overloaded, retry later"}
+    assert admission.lookup("k1").counts["shed"] == 1
+    assert admission.status().shedding
+
+
+def test_shedding_is_off_at_zero(limits):
+    limits(shed_ms=0.0, latency=60.0)
+    assert call("k1")[0] == 200 and not admission.status().shedding
+
+
+def test_a_streaming_response_holds_its_slot_until_the_last_chunk(limits):
+    limits(concurrency=1)
+    key = admission.lookup("k1")
+    seen = []
+
+    async def stream(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for chunk in (b"a", b"b"):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            seen.append((key.in_flight, call_in_thread()))
+        await send({"type": "http.response.body", "body": b""})
+        seen.append((key.in_flight, None))  # background work after the body
+
+    def call_in_thread():
+        # the stream owns this event loop; the second request gets its own
+        with ThreadPoolExecutor(1) as pool:
+            return pool.submit(call, "k1").result()[0]
+
+    assert call("k1", stream)[0] == 200
+    assert seen == [(1, 429), (1, 429), (0, None)]
+    assert key.in_flight == 0 and call("k1")[0] == 200
+
+
+def test_the_slot_is_released_when_the_app_fails(limits):
+    limits(concurrency=1)
+
+    async def broken(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        call("k1", broken)
+    assert admission.lookup("k1").in_flight == 0 and call("k1")[0] == 200
+
+
+def test_admin_digests_are_built_once_per_setting(monkeypatch):
+    monkeypatch.setattr(settings, "admin_api_keys", "root, ops")
+    digests = security._admin_digests()
+    assert security._admin_digests() is digests and len(digests) == 2
+    asyncio.run(security.require_admin_key("ops"))
+
+    monkeypatch.setattr(settings, "admin_api_keys", None)
+    assert security._admin_digests() == frozenset()
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(security.require_admin_key("ops"))
+    assert err.value.status_code == 401
@@ -0,0 +1,104 @@
+"""Keyset pages of the dashboard call list: every row exactly once, ties and untimed calls included."""
+import random
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import metrics
+from app.services import call_store, dashboard
+
+HEADERS = {"X-API-Key": "test-key"}
+T0 = 1_790_000_000
+
+
+@pytest.fixture
+def calls(database):
+    rng = random.Random(5)
+    rows = []
+    for i in range(150):
+        # few distinct times, so most pages break inside a run of equal ended_at
+        ended_at = rng.choice([None, T0, T0 + 60, T0 + 120, T0 + 3600])
+        rows.append(
+            {
+                "call_id": f"c{rng.randrange(10 ** 6):06d}-{i}",
+                "ended_at": ended_at,
+                "outcome": rng.choice(["ACCEPTED", "DECLINED"]),
+                "sentiment": rng.choice(["Positive", "Negative"]),
+                "verified": rng.choice([True, False]),
+                "load_id": rng.choice(["L1", "L2"]),
+            }
+        )
+    call_store.write_rows([call_store._row(row, "a long summary") for row in rows])
+    return rows
+
+
+@pytest.fixture
+def client(database):
+    app = FastAPI()
+    app.include_router(metrics.router)
+    return TestClient(app)
+
+
+def newest_first(rows):
+    timed = sorted((r for r in rows if r["ended_at"] is not None), key=lambda r: (r["ended_at"], r["call_id"]), reverse=True)
+    untimed = sorted((r["call_id"] for r in rows if r["ended_at"] is None), reverse=True)
+    return [r["call_id"] for r in timed] + untimed
+
+
+def walk(client, limit, **params):
+    seen, cursor, pages = [], None, 0
+    while True:
+        query = {"limit": limit, **params, **({"cursor": cursor} if cursor else {})}
+        resp = client.get("/v1/metrics/dashboard/calls", params=query, headers=HEADERS)
+        assert resp.status_code == 200
+        page = resp.json()
+        assert len(page) <= limit
+        # the list projection: no summary
+        assert all(tuple(row) == dashboard.LIST_KEYS for row in page)
+        seen += [row["call_id"] for row in page]
+        pages += 1
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return seen, pages
+        assert len(page) == limit
+
+
+FILTERS = [
+    ({}, lambda r: True),
+    ({"outcome": "ACCEPTED"}, lambda r: r["outcome"] == "ACCEPTED"),
+    ({"sentiment": "Negative", "verified": "true"}, lambda r: r["sentiment"] == "Negative" and r["verified"]),
+    ({"load_id": "L2", "outcome": "DECLINED"}, lambda r: r["load_id"] == "L2" and r["outcome"] == "DECLINED"),
+    ({"since": T0 + 60}, lambda r: r["ended_at"] is not None and r["ended_at"] >= T0 + 60),
+    ({"until": T0 + 3600}, lambda r: r["ended_at"] is not None and r["ended_at"] < T0 + 3600),
+]
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 500])
+@pytest.mark.parametrize("params, keep", FILTERS)
+def test_walking_every_page_yields_each_row_once_in_order(calls, client, limit, params, keep):
+    want = newest_first([r for r in calls if keep(r)])
+    seen, pages = walk(client, limit, **params)
+    assert seen == want
+    assert pages == max(1, -(-len(want) // limit))
+
+
+def test_a_cursor_into_the_untimed_calls_continues_there(calls):
+    untimed = sorted((r["call_id"] for r in calls if r["ended_at"] is None), reverse=True)
+    rows, cursor = dashboard.list_calls(3, cursor=(None, untimed[0]))
+    assert [r["call_id"] for r in rows] == untimed[1:4]
+    assert cursor == (None, untimed[3])
+
+
+@pytest.mark.parametrize("cursor", [(T0, "c1"), (None, "c1"), (None, "")])
+def test_cursors_round_trip(cursor):
+    assert dashboard.decode_cursor(dashboard.encode_cursor(cursor)) == cursor
+
+
+@pytest.mark.parametrize("token", ["", "not-base64!", "WzEsMiwzXQ", "WyJ4IiwiYyJd"])
+def test_a_cursor_it_did_not_issue_is_refused(database, client, token):
+    with pytest.raises(ValueError):
+        dashboard.decode_cursor(token)
+    if token:
+        resp = client.get("/v1/metrics/dashboard/calls", params={"cursor": token}, headers=HEADERS)
+        assert resp.status_code == 400
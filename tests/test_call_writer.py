@@ -0,0 +1,153 @@
+"""CallWriter: spool replay after a crash, requeue on a failed flush, and workers sharing one spool directory."""
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select
+
+from app.models import CallRecord
+from app.services import call_store
+from app.services.call_store import CallWriter
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def record(call_id, outcome="ACCEPTED"):
+    return {"call_id": call_id, "ended_at": 1_790_000_000, "outcome": outcome}
+
+
+def stored(db) -> dict:
+    with db.SessionLocal() as session:
+        return dict(session.execute(select(CallRecord.call_id, CallRecord.outcome)).all())
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def segments(spool) -> list:
+    return sorted(p.name for p in Path(spool).glob("calls-*.ndjson"))
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return tmp_path / "spool"
+
+
+def crash_after_submitting(spool, call_ids) -> None:
+    """A worker that acknowledges `call_ids` and dies before flushing them."""
+    script = textwrap.dedent(
+        f"""
+        import os
+        from app.services.call_store import CallWriter
+        writer = CallWriter({str(spool)!r}, flush_interval=3600)
+        writer.start()
+        for call_id in {list(call_ids)!r}:
+            writer.submit({{"call_id": call_id, "outcome": "DECLINED"}}, "summary")
+        writer.submit({{"call_id": {call_ids[0]!r}, "outcome": "ACCEPTED"}}, None)
+        writer._spool.write(b'{{"call_id": "torn", "outc')
+        writer._spool.flush()
+        os._exit(1)
+        """
+    )
+    crashed = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env={"API_KEYS": "test-key"})
+    assert crashed.returncode == 1
+
+
+def test_a_crashed_workers_spool_is_replayed(database, spool):
+    crash_after_submitting(spool, ["a", "b", "c"])
+    assert len(segments(spool)) == 1
+
+    writer = CallWriter(str(spool), flush_interval=0.01)
+    writer.start()
+    try:
+        wait_for(lambda: writer.flushed == 3)
+    finally:
+        writer.stop()
+    # the later write of "a" wins, its summary carried over; the torn line was never acknowledged
+    assert stored(database) == {"a": "ACCEPTED", "b": "DECLINED", "c": "DECLINED"}
+    with database.SessionLocal() as session:
+        assert session.get(CallRecord, "a").summary == "summary"
+    assert writer.replayed == 4
+    assert segments(spool) == []
+
+
+def test_a_failed_flush_is_requeued_under_newer_writes(database, spool, monkeypatch):
+    healthy = threading.Event()
+    attempts = []
+    write_rows = call_store.write_rows
+
+    def flaky(rows):
+        attempts.append([row["call_id"] for row in rows])
+        if not healthy.is_set():
+            raise RuntimeError("database unavailable")
+        write_rows(rows)
+
+    monkeypatch.setattr(call_store, "write_rows", flaky)
+    writer = CallWriter(str(spool), flush_interval=0.01)
+    writer.start()
+    try:
+        writer.submit(record("a", "DECLINED"), None)
+        writer.submit(record("b"), None)
+        wait_for(lambda: writer.flush_errors >= 1)
+        writer.submit(record("a", "ACCEPTED"), None)
+        assert writer.status().queue_depth == 2 and writer.flushed == 0
+        # the failed batch's spool segment is kept until it commits
+        assert len(segments(spool)) >= 2
+
+        healthy.set()
+        wait_for(lambda: writer.flushed == 2)
+    finally:
+        writer.stop()
+    assert stored(database) == {"a": "ACCEPTED", "b": "ACCEPTED"}
+    assert sorted(attempts[-1]) == ["a", "b"]
+    assert segments(spool) == []
+
+
+def test_workers_sharing_a_spool_leave_each_others_segments_alone(database, spool):
+    first = CallWriter(str(spool), flush_interval=3600)
+    first.start()
+    second = None
+    try:
+        first.submit(record("a"), None)
+        first.submit(record("b"), None)
+
+        # a second worker starting up must not replay a live writer's segment
+        second = CallWriter(str(spool), flush_interval=0.01)
+        second.start()
+        second.submit(record("c"), None)
+        wait_for(lambda: second.flushed == 1)
+        assert second.replayed == 0
+        assert stored(database) == {"c": "ACCEPTED"}
+        assert first.status().queue_depth == 2
+    finally:
+        first.stop()
+        if second is not None:
+            second.stop()
+    assert stored(database) == {"a": "ACCEPTED", "b": "ACCEPTED", "c": "ACCEPTED"}
+    assert segments(spool) == []
+
+
+def test_unflushed_segments_outlive_a_stop_for_the_next_writer(database, spool, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(call_store, "write_rows", lambda rows: 1 / 0)
+        writer = CallWriter(str(spool), flush_interval=3600)
+        writer.start()
+        writer.submit(record("a"), None)
+        writer.stop()
+    assert stored(database) == {} and segments(spool)
+
+    writer = CallWriter(str(spool), flush_interval=0.01)
+    writer.start()
+    try:
+        wait_for(lambda: writer.flushed == 1)
+    finally:
+        writer.stop()
+    assert stored(database) == {"a": "ACCEPTED"} and segments(spool) == []
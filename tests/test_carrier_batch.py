@@ -0,0 +1,82 @@
+"""Reading a batch upload: NDJSON lines split across chunks, the item cap, oversized lines, bad MC numbers."""
+import asyncio
+import json
+
+import pytest
+
+from app.services import fmcsa
+from app.services.carrier_batch import MAX_LINE_BYTES, iter_list, iter_ndjson
+from app.services.fmcsa import MC_NUMBER_ERROR, FmcsaError
+
+
+def read(chunks, max_items=100):
+    consumed = []
+
+    async def upload():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    async def collect():
+        return [item async for item in iter_ndjson(upload(), max_items)]
+
+    return asyncio.run(collect()), len(consumed)
+
+
+def test_lines_split_across_chunks():
+    items, _ = read([b"10", b'01\n"1002"\n\n{"mc_number": 1003}\n', b"nope\n10", b"04"])
+    assert items == [
+        (0, "1001", None),
+        (1, "1002", None),
+        (2, "1003", None),
+        (3, None, "expected an mc_number"),
+        (4, "1004", None),
+    ]
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_cap_ends_with_an_error_and_stops_reading(trailing_newline):
+    # without the newline, the extra item is only seen once the upload ends
+    rest = [b"1006\n", b"1007\n"] if trailing_newline else [b"1006"]
+    items, consumed = read([b"1001\n1002\n", b"1003\n", *rest], max_items=3)
+    assert [mc for _, mc, _ in items[:3]] == ["1001", "1002", "1003"]
+    assert items[3][:2] == (3, None) and "limited to 3" in items[3][2]
+    assert consumed == 3
+
+
+def test_oversized_line_is_refused_without_waiting_for_its_end():
+    items, consumed = read([b"1001\n", b"9" * (MAX_LINE_BYTES + 1), b"9" * 10_000, b"\n1002\n"])
+    assert items[0] == (0, "1001", None)
+    assert items[1][:2] == (1, None) and "longer than" in items[1][2]
+    assert consumed == 2
+
+
+BAD_MC_NUMBERS = ["1/../../x", "12 34", "-5", "1e3", "\u0661\u0662", "1" * 9, "MC123"]
+
+
+@pytest.mark.parametrize("mc", BAD_MC_NUMBERS)
+def test_bad_mc_numbers_are_item_errors(mc):
+    items, _ = read([json.dumps(mc).encode() + b"\n", json.dumps({"mc_number": mc}).encode(), b"\n 12345678 \n"])
+    assert items == [(0, None, MC_NUMBER_ERROR), (1, None, MC_NUMBER_ERROR), (2, "12345678", None)]
+
+
+def test_a_json_batch_reports_bad_mc_numbers_per_item():
+    async def collect():
+        return [item async for item in iter_list([" 0042 ", 1001, True, "", {"mc_number": "1/2"}, -7])]
+
+    assert asyncio.run(collect()) == [
+        (0, "0042", None),
+        (1, "1001", None),
+        (2, None, "empty mc_number"),
+        (3, None, "empty mc_number"),
+        (4, None, MC_NUMBER_ERROR),
+        (5, None, MC_NUMBER_ERROR),
+    ]
+
+
+@pytest.mark.parametrize("mc", BAD_MC_NUMBERS)
+def test_the_lookup_never_puts_a_bad_mc_number_in_its_url(monkeypatch, mc):
+    monkeypatch.setenv("FMCSA_WEBKEY", "key")
+    monkeypatch.setattr(fmcsa, "_get_client", lambda: pytest.fail("FMCSA was called"))
+    with pytest.raises(FmcsaError, match="digits"):
+        asyncio.run(fmcsa.fetch_carrier_by_mc(mc))
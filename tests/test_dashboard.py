@@ -0,0 +1,86 @@
+"""Dashboard snapshot caching: the shared data version, ETag/304, and writes from another worker."""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.routers import metrics
+from app.services import call_store, dashboard
+
+HEADERS = {"X-API-Key": "test-key"}
+
+
+def call(call_id, ended_at=1_790_000_000, outcome="ACCEPTED", **kw):
+    return call_store._row({"call_id": call_id, "ended_at": ended_at, "outcome": outcome, "sentiment": "Positive", **kw}, None)
+
+
+@pytest.fixture
+def snapshots(database, monkeypatch):
+    monkeypatch.setattr(dashboard, "_snapshots", {})
+    return database
+
+
+@pytest.fixture
+def client(snapshots):
+    app = FastAPI()
+    app.include_router(metrics.router)
+    return TestClient(app)
+
+
+def test_every_write_advances_the_version(snapshots):
+    assert dashboard.current_version() == 0
+    call_store.write_rows([call("a"), call("b")])
+    assert dashboard.current_version() == 1
+    # a re-upsert counts too: the row changed
+    call_store.write_rows([call("a", outcome="DECLINED")])
+    assert dashboard.current_version() == 2
+    assert dashboard.bump_version() == 3 == dashboard.current_version()
+
+
+def test_a_snapshot_is_rendered_once_per_version(snapshots):
+    call_store.write_rows([call("a")])
+    etag, body = dashboard.snapshot(20)
+    assert dashboard.snapshot(20)[1] is body
+    assert json.loads(body)["version"] == 1 and etag == '"1-20"'
+
+    call_store.write_rows([call("b", ended_at=1_790_000_100)])
+    etag, body = dashboard.snapshot(20)
+    doc = json.loads(body)
+    assert etag == '"2-20"' and doc["totals"]["calls"] == 2
+    assert [c["call_id"] for c in doc["calls"]] == ["b", "a"]
+
+
+def test_if_none_match_answers_304_until_the_data_changes(client):
+    call_store.write_rows([call("a")])
+    first = client.get("/v1/metrics/dashboard/snapshot", headers=HEADERS)
+    assert first.status_code == 200 and first.headers["ETag"] == '"1-20"'
+
+    etag = first.headers["ETag"]
+    again = client.get("/v1/metrics/dashboard/snapshot", headers={**HEADERS, "If-None-Match": f'"0-20", {etag}'})
+    assert again.status_code == 304 and again.headers["ETag"] == etag and again.content == b""
+    # the ETag is per limit
+    other = client.get("/v1/metrics/dashboard/snapshot?limit=5", headers={**HEADERS, "If-None-Match": etag})
+    assert other.status_code == 200
+
+    call_store.write_rows([call("b")])
+    stale = client.get("/v1/metrics/dashboard/snapshot", headers={**HEADERS, "If-None-Match": etag})
+    assert stale.status_code == 200 and stale.headers["ETag"] == '"2-20"'
+    assert stale.json()["totals"]["calls"] == 2
+
+
+def test_a_write_by_another_worker_invalidates_this_workers_snapshot(snapshots, monkeypatch):
+    call_store.write_rows([call("a")])
+    etag, _ = dashboard.snapshot(20)
+
+    # another worker: its own engine and write session on the same database
+    other = snapshots._sqlite_engine(str(snapshots.engine.url), pool_size=1)
+    with monkeypatch.context() as m:
+        m.setattr(snapshots, "WriteSessionLocal", sessionmaker(bind=other, autoflush=False, future=True))
+        call_store.write_rows([call("b", outcome="DECLINED")])
+    other.dispose()
+
+    new_etag, body = dashboard.snapshot(20)
+    assert new_etag != etag
+    assert json.loads(body)["outcomes"] == {"ACCEPTED": 1, "DECLINED": 1}
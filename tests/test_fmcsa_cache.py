@@ -0,0 +1,135 @@
+"""VerificationCache against an in-process FMCSA stand-in (same answers as benchmarks/fmcsa_stub.py)."""
+import asyncio
+import time
+
+import pytest
+
+from app.services import fmcsa_cache
+from app.services.fmcsa import FmcsaUnavailable
+from app.services.fmcsa_cache import VerificationCache
+
+
+class StandIn:
+    """Multiples of 10 are not found, even MCs may operate, odd ones may not."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.lookups = 0
+        self.fail = False
+
+    async def __call__(self, mc_number: str, deadline):
+        self.lookups += 1
+        # like the real client, give up at the deadline it was handed
+        if deadline is not None and deadline - time.monotonic() < self.latency:
+            await asyncio.sleep(max(deadline - time.monotonic(), 0.0))
+            raise FmcsaUnavailable("stand-in: deadline exceeded")
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise FmcsaUnavailable("stand-in: unavailable")
+        n = int(mc_number)
+        allowed = None if n % 10 == 0 else ("Y" if n % 2 == 0 else "N")
+        return {"eligible": allowed == "Y", "mc_number": mc_number, "allowed_to_operate": allowed}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(fmcsa_cache.time, "time", lambda: now[0])
+    return now
+
+
+def _cache(fetch, **ttls) -> VerificationCache:
+    return VerificationCache(fetch, ttl_eligible=600, ttl_ineligible=60, ttl_not_found=10, **ttls)
+
+
+def test_ttl_depends_on_outcome(clock):
+    fetch = StandIn()
+    cache = _cache(fetch)
+
+    async def run():
+        for mc in ("2", "3", "10"):
+            assert (await cache.verify(mc))["verification"] == "live"
+            assert (await cache.verify(mc))["verification"] == "cached"
+        assert fetch.lookups == 3
+
+        clock[0] += 30  # past the not-found TTL only
+        assert (await cache.verify("10"))["verification"] == "live"
+        assert (await cache.verify("3"))["verification"] == "cached"
+
+        clock[0] += 60  # past the ineligible TTL too
+        assert (await cache.verify("3"))["verification"] == "live"
+        assert (await cache.verify("2"))["verification"] == "cached"
+
+    asyncio.run(run())
+    assert fetch.lookups == 5
+    assert cache.expired == 2
+
+
+def test_negative_results_are_cached(clock):
+    fetch = StandIn()
+    cache = _cache(fetch)
+
+    async def run():
+        first = await cache.verify("3")
+        second = await cache.verify("3")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert not first["eligible"] and not second["eligible"]
+    assert second["verification"] == "cached"
+    assert fetch.lookups == 1
+    assert cache.negative_hits == 1
+
+
+def test_upstream_errors_are_not_cached_and_stale_is_served(clock):
+    fetch = StandIn()
+    cache = _cache(fetch)
+
+    async def run():
+        await cache.verify("4")
+        clock[0] += 700
+        fetch.fail = True
+        stale = await cache.verify("4")
+        unknown = await cache.verify("6")
+        fetch.fail = False
+        live = await cache.verify("6")
+        return stale, unknown, live
+
+    stale, unknown, live = asyncio.run(run())
+    assert stale["verification"] == "stale" and stale["eligible"]
+    assert unknown["verification"] == "unknown"
+    assert live["verification"] == "live"
+    assert cache.upstream_errors == 2
+
+
+def test_concurrent_lookups_share_one_request(clock):
+    fetch = StandIn(latency=0.05)
+    cache = _cache(fetch)
+
+    async def run():
+        return await asyncio.gather(*(cache.verify("8") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert [r["verification"] for r in results] == ["live"] * 5
+    assert fetch.lookups == 1
+    assert cache.coalesced == 4
+
+
+@pytest.mark.parametrize("first_budget, joiner_budget", [(0.02, 1.0), (1.0, 0.02)])
+def test_each_caller_waits_on_its_own_deadline(clock, first_budget, joiner_budget):
+    fetch = StandIn(latency=0.1)
+    cache = _cache(fetch)
+
+    async def call(budget, delay):
+        await asyncio.sleep(delay)
+        return await cache.verify("12", deadline=time.monotonic() + budget)
+
+    async def run():
+        return await asyncio.gather(call(first_budget, 0.0), call(joiner_budget, 0.01))
+
+    first, joiner = asyncio.run(run())
+    expected = {0.02: "unknown", 1.0: "live"}
+    assert first["verification"] == expected[first_budget]
+    assert joiner["verification"] == expected[joiner_budget]
+    assert fetch.lookups == 1
+    assert cache.deadline_exceeded == 1
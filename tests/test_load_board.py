@@ -0,0 +1,161 @@
+"""LoadBoard snapshots: posting order, copy-on-write apply(), and the pieces it is built from."""
+import random
+from array import array
+
+import pytest
+
+from app.schemas.domain import Load
+from app.services.load_board import _DELETED, LoadBoard, _Overlay, _patch
+from app.services.load_store import STORES
+
+CITIES = ["Atlanta, GA", "Dallas, TX", "Chicago, IL", "Denver, CO"]
+EQUIPMENT = ["Dry Van", "Reefer", "Flatbed"]
+
+
+def make_load(load_id, origin="Atlanta, GA", destination="Dallas, TX", equipment="Dry Van", rate=1000.0, **kw):
+    return Load(
+        load_id=load_id,
+        origin=origin,
+        destination=destination,
+        pickup_datetime=kw.pop("pickup", "2026-11-02T08:00:00"),
+        delivery_datetime=kw.pop("delivery", "2026-11-03T08:00:00"),
+        equipment_type=equipment,
+        loadboard_rate=rate,
+        **kw,
+    )
+
+
+def ids(loads):
+    return [load.load_id for load in loads]
+
+
+@pytest.fixture(params=sorted(STORES))
+def store_cls(request):
+    return STORES[request.param]
+
+
+def test_postings_are_rate_ordered_with_file_order_for_ties(store_cls):
+    board = LoadBoard.build(
+        [
+            make_load("a", rate=900),
+            make_load("b", rate=1500),
+            make_load("c", rate=900),
+            make_load("d", destination="Denver, CO", rate=2000),
+        ],
+        store_cls=store_cls,
+    )
+    assert ids(board.search("Atlanta, GA", "Dallas, TX", "Dry Van", 10)) == ["b", "a", "c"]
+    # partial lanes are posted too, in the same order
+    assert ids(board.search("Atlanta, GA", None, None, 10)) == ["d", "b", "a", "c"]
+    assert ids(board.search(None, None, None, 2)) == ["d", "b"]
+
+
+def test_first_occurrence_of_a_load_id_wins(store_cls):
+    board = LoadBoard.build([make_load("a", rate=1), make_load("a", rate=2)], store_cls=store_cls)
+    assert len(board) == 1
+    assert board.get("a").loadboard_rate == 1
+    assert board.get("missing") is None
+
+
+def test_get_round_trips_every_field(store_cls):
+    load = make_load("a", notes="tarps", weight=42000.0, commodity_type="steel", num_of_pieces=3, miles=780.0)
+    board = LoadBoard.build([load, make_load("b")], store_cls=store_cls)
+    assert board.get("a") == load
+    assert board.get("b").weight is None
+
+
+def test_apply_leaves_the_old_snapshot_alone(store_cls):
+    before = LoadBoard.build([make_load("a", rate=1000), make_load("b", rate=900)], store_cls=store_cls)
+    after = before.apply([make_load("b", rate=1100), make_load("c", rate=500)], ["a"])
+
+    assert after.version == before.version + 1
+    assert ids(after.search("Atlanta", "Dallas", None, 10)) == ["b", "c"]
+    assert after.get("a") is None and after.get("b").loadboard_rate == 1100
+
+    assert ids(before.search("Atlanta", "Dallas", None, 10)) == ["a", "b"]
+    assert before.get("b").loadboard_rate == 900 and before.get("c") is None
+    assert len(before) == 2 and len(after) == 2
+
+
+def test_apply_drops_emptied_lanes(store_cls):
+    board = LoadBoard.build([make_load("a"), make_load("b", origin="Denver, CO")], store_cls=store_cls)
+    board = board.apply([], ["b"])
+    assert board.search("Denver, CO", None, None, 10) == []
+    assert ids(board.search(None, None, None, 10)) == ["a"]
+
+
+def test_apply_agrees_with_a_fresh_build(store_cls):
+    rng = random.Random(7)
+
+    def random_load(i):
+        return make_load(
+            f"L{i}",
+            rng.choice(CITIES),
+            rng.choice(CITIES),
+            rng.choice(EQUIPMENT),
+            float(rng.randrange(500, 3000, 100)),
+        )
+
+    live = {f"L{i}": random_load(i) for i in range(300)}
+    board = LoadBoard.build(live.values(), store_cls=store_cls)
+    for _ in range(5):
+        upserts = {load.load_id: load for load in (random_load(rng.randrange(400)) for _ in range(40))}
+        removals = [i for i in rng.sample(sorted(live), 20) if i not in upserts]
+        board = board.apply(list(upserts.values()), removals)
+        for load_id in removals:
+            del live[load_id]
+        live.update(upserts)
+
+        fresh = LoadBoard.build(live.values(), store_cls=store_cls)
+        assert len(board) == len(fresh) == len(live)
+        for origin in CITIES + [None]:
+            for equipment in EQUIPMENT + [None]:
+                got = board.search(origin, None, equipment, 500)
+                want = fresh.search(origin, None, equipment, 500)
+                # ties may differ in order (a fresh build renumbers rows), the rates may not
+                assert [load.loadboard_rate for load in got] == [load.loadboard_rate for load in want]
+                assert sorted(ids(got)) == sorted(ids(want))
+        assert all(board.get(load_id) == load for load_id, load in live.items())
+
+
+def test_overlay_updates_copy_on_write():
+    base = {"a": 1, "b": 2}
+    first = _Overlay(base)
+    second = first.updated({"b": _DELETED, "c": 3})
+    third = second.updated({"a": 10, "b": 20})
+
+    assert base == {"a": 1, "b": 2}
+    assert dict(first.items()) == {"a": 1, "b": 2}
+    assert dict(second.items()) == {"a": 1, "c": 3} and len(second) == 2
+    assert "b" not in second and second.get("b", "gone") == "gone"
+    assert dict(third.items()) == {"a": 10, "b": 20, "c": 3} and len(third) == 3
+
+
+def test_overlay_deleting_a_missing_key_keeps_the_length():
+    overlay = _Overlay({"a": 1}).updated({"zz": _DELETED})
+    assert len(overlay) == 1 and list(overlay) == ["a"]
+
+
+def test_overlay_folds_into_a_new_base_when_the_top_outgrows_it(monkeypatch):
+    from app.services import load_board
+
+    monkeypatch.setattr(load_board, "_FLATTEN_MIN", 2)
+    base = {"a": 1, "b": 2}
+    overlay = _Overlay(base).updated({"c": 3}).updated({"a": _DELETED, "d": 4})
+    assert overlay._top == {} and overlay._base is not base
+    assert dict(overlay.items()) == {"b": 2, "c": 3, "d": 4}
+    assert base == {"a": 1, "b": 2}
+
+
+def test_patch_inserts_and_removes_in_rank_order():
+    rates = {0: 5.0, 1: 4.0, 2: 4.0, 3: 1.0, 4: 4.0, 5: 9.0, 6: 0.5}
+
+    def rank(r):
+        return -rates[r], r
+
+    posting = array("i", [0, 1, 2, 3])
+    patched = _patch(posting, [6, 4, 5], [2, 3], rank)
+    assert list(patched) == [5, 0, 1, 4, 6]
+    assert list(posting) == [0, 1, 2, 3]
+    # a dropped row that is not in the posting is ignored
+    assert list(_patch(posting, [], [6], rank)) == [0, 1, 2, 3]
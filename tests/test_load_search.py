@@ -0,0 +1,215 @@
+"""Pickup/delivery windows: time_window() from a request, and both board paths that answer them."""
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.schemas.domain import Load
+from app.services import load_board, loads
+from app.services.load_board import LoadBoard, TimeWindow
+from app.services.load_store import NO_TIME, epoch
+from app.services.matching import canonical_place
+
+NOW = datetime(2026, 11, 1, 12, tzinfo=timezone.utc)
+T0 = int(NOW.timestamp())
+CITIES = ["Atlanta, GA", "Dallas, TX", "Chicago, IL", "Denver, CO"]
+EQUIPMENT = ["Dry Van", "Reefer", "Flatbed"]
+
+
+def at(t: int) -> str:
+    return datetime.fromtimestamp(t, timezone.utc).isoformat()
+
+
+def make_load(load_id, origin="Atlanta, GA", destination="Dallas, TX", equipment="Dry Van", rate=1000.0, pickup=at(T0), delivery=at(T0 + 86400)):
+    return Load(
+        load_id=load_id,
+        origin=origin,
+        destination=destination,
+        pickup_datetime=pickup,
+        delivery_datetime=delivery,
+        equipment_type=equipment,
+        loadboard_rate=rate,
+    )
+
+
+@pytest.fixture
+def hide_past(monkeypatch):
+    monkeypatch.setattr(loads.time, "time", lambda: T0 + 0.5)
+
+    def set_hide(on: bool) -> None:
+        monkeypatch.setattr(loads.settings, "hide_past_pickups", on)
+
+    return set_hide
+
+
+def test_no_window_and_past_pickups_shown(hide_past):
+    hide_past(False)
+    assert loads.time_window() is None
+
+
+def test_no_window_hides_past_pickups_but_keeps_untimed_loads(hide_past):
+    hide_past(True)
+    assert loads.time_window() == TimeWindow(pickup_from=T0, untimed=True)
+
+
+def test_a_window_in_the_past_is_clamped_to_now(hide_past):
+    hide_past(True)
+    window = loads.time_window(pickup_after=NOW - timedelta(days=2), pickup_before=NOW + timedelta(hours=3))
+    assert window == TimeWindow(T0, T0 + 3 * 3600)
+
+
+def test_a_future_window_is_kept(hide_past):
+    hide_past(True)
+    window = loads.time_window(pickup_after=NOW + timedelta(days=1))
+    assert window == TimeWindow(pickup_from=T0 + 86400)
+
+
+def test_a_delivery_window_still_hides_past_pickups_and_untimed_loads(hide_past):
+    hide_past(True)
+    window = loads.time_window(delivery_before=NOW + timedelta(days=1))
+    assert window == TimeWindow(pickup_from=T0, delivery_to=T0 + 86400)
+
+
+def test_bounds_round_inward_and_naive_times_are_utc(hide_past):
+    hide_past(False)
+    naive = NOW.replace(tzinfo=None)
+    window = loads.time_window(
+        pickup_after=naive + timedelta(seconds=0.25),
+        pickup_before=NOW.astimezone(timezone(timedelta(hours=-5))) + timedelta(seconds=9.75),
+    )
+    assert window == TimeWindow(T0 + 1, T0 + 9)
+
+
+def random_board(seed: int, n: int = 400, untimed_share: float = 0.05):
+    rng = random.Random(seed)
+    live = []
+    for i in range(n):
+        pickup = T0 + rng.randrange(14 * 24) * 3600
+        delivery = pickup + rng.randrange(4, 72) * 3600
+        live.append(
+            make_load(
+                f"L{i}",
+                rng.choice(CITIES),
+                rng.choice(CITIES),
+                rng.choice(EQUIPMENT),
+                float(rng.randrange(500, 3000, 50)),
+                pickup="TBD" if rng.random() < untimed_share else at(pickup),
+                delivery=at(delivery),
+            )
+        )
+    return LoadBoard.build(live), live
+
+
+def in_window(load, window: TimeWindow) -> bool:
+    pickup, delivery = epoch(load.pickup_datetime), epoch(load.delivery_datetime)
+    picks_up = window.pickup_from <= pickup <= window.pickup_to or (window.untimed and pickup == NO_TIME)
+    return picks_up and window.delivery_from <= delivery <= window.delivery_to
+
+
+def expected_rates(live, window, origin=None, equipment=None, limit=10):
+    found = [
+        load
+        for load in live
+        if in_window(load, window)
+        and (origin is None or canonical_place(load.origin) == canonical_place(origin))
+        and (equipment is None or load.equipment_type == equipment)
+    ]
+    return sorted((load.loadboard_rate for load in found), reverse=True)[:limit]
+
+
+def test_window_bounds_are_inclusive():
+    board = LoadBoard.build(
+        [make_load(f"p{h}", pickup=at(T0 + h * 3600), delivery=at(T0 + h * 3600 + 86400)) for h in range(5)]
+    )
+    got = board.search(None, None, None, 10, TimeWindow(T0 + 3600, T0 + 3 * 3600))
+    assert sorted(load.load_id for load in got) == ["p1", "p2", "p3"]
+    got = board.search(None, None, None, 10, TimeWindow(T0 + 3601, T0 + 3 * 3600 - 1))
+    assert [load.load_id for load in got] == ["p2"]
+    assert board.search(None, None, None, 10, TimeWindow(T0 + 10 * 3600)) == []
+
+
+def test_time_range_takes_the_narrower_schedule():
+    board, live = random_board(1)
+    pickups_only = TimeWindow(T0, T0 + 10 * 86400)
+    n, rows = board._time_range(pickups_only)
+    assert n == sum(T0 <= epoch(load.pickup_datetime) <= T0 + 10 * 86400 for load in live) == len(list(rows()))
+
+    narrow_delivery = pickups_only._replace(delivery_from=T0 + 86400, delivery_to=T0 + 86400 + 6 * 3600)
+    n, rows = board._time_range(narrow_delivery)
+    assert n == sum(narrow_delivery.delivery_from <= epoch(load.delivery_datetime) <= narrow_delivery.delivery_to for load in live)
+    assert sorted(rows()) == sorted(
+        i for i in range(len(live)) if narrow_delivery.delivery_from <= board._store.delivery_ts[i] <= narrow_delivery.delivery_to
+    )
+
+
+def test_time_range_leads_with_untimed_rows():
+    board, live = random_board(2, untimed_share=0.2)
+    untimed = {i for i, load in enumerate(live) if epoch(load.pickup_datetime) == NO_TIME}
+    assert untimed
+    n, rows = board._time_range(TimeWindow(pickup_from=T0 + 86400, untimed=True))
+    rows = list(rows())
+    assert set(rows[: len(untimed)]) == untimed and len(rows) == n
+    n, rows = board._time_range(TimeWindow(pickup_from=T0 + 86400))
+    assert not untimed & set(rows())
+
+
+WINDOWS = [
+    TimeWindow(T0 + 30 * 3600, T0 + 36 * 3600),
+    TimeWindow(T0 + 3 * 86400, T0 + 5 * 86400, T0 + 4 * 86400, T0 + 4 * 86400 + 12 * 3600),
+    TimeWindow(pickup_from=T0 + 7 * 86400, untimed=True),
+    TimeWindow(pickup_from=T0 + 7 * 86400),
+    TimeWindow(T0 + 15 * 86400),
+]
+
+
+@pytest.mark.parametrize("walk", ["posting", "time_range"])
+@pytest.mark.parametrize("window", WINDOWS)
+def test_both_search_paths_match_a_scan(monkeypatch, walk, window):
+    board, live = random_board(3, untimed_share=0.1)
+    # the posting walk whenever it is possible, or never
+    monkeypatch.setattr(load_board, "_LANE_CHECK_COST", 10 ** 9 if walk == "posting" else 0)
+    lane_checks = []
+    on_lane = board._on_lane
+    monkeypatch.setattr(board, "_on_lane", lambda res: lane_checks.append(res) or on_lane(res))
+
+    for origin in CITIES + [None]:
+        for equipment in EQUIPMENT[:2] + [None]:
+            for limit in (1, 5, 50):
+                got = board.search(origin, None, equipment, limit, window)
+                assert [load.loadboard_rate for load in got] == expected_rates(live, window, origin, equipment, limit)
+                assert all(in_window(load, window) for load in got)
+    # an empty time range returns before either walk
+    assert bool(lane_checks) == (walk == "time_range" and board._time_range(window)[0] > 0)
+
+
+@pytest.mark.parametrize("walk", ["merge", "time_range"])
+@pytest.mark.parametrize("window", WINDOWS)
+def test_both_radius_paths_match_a_scan(monkeypatch, walk, window):
+    board, live = random_board(4, untimed_share=0.1)
+    monkeypatch.setattr(load_board, "_LANE_CHECK_COST", 10 ** 9 if walk == "merge" else 0)
+    time_walks = []
+    in_range = board._nearby_in_window
+    monkeypatch.setattr(board, "_nearby_in_window", lambda *a: time_walks.append(a) or in_range(*a))
+
+    for origin in CITIES:
+        for equipment in EQUIPMENT[:2] + [None]:
+            for limit in (1, 5, 50):
+                got = board.search_nearby(origin, None, equipment, 2000, None, limit, 0.0, window)
+                # the board cities are within 2000 mi of each other: every lane is in reach
+                assert [load.loadboard_rate for load, _ in got] == expected_rates(live, window, None, equipment, limit)
+    assert bool(time_walks) == (walk == "time_range" and board._time_range(window)[0] > 0)
+
+
+@pytest.mark.parametrize("lane_check_cost", [10 ** 9, 0])
+def test_radius_window_ranks_by_rate_less_deadhead(monkeypatch, lane_check_cost):
+    monkeypatch.setattr(load_board, "_LANE_CHECK_COST", lane_check_cost)
+    board = LoadBoard.build(
+        [
+            make_load("near", "Atlanta, GA", rate=1000, pickup=at(T0 + 2 * 3600)),
+            make_load("far", "Macon, GA", rate=1100, pickup=at(T0 + 2 * 3600)),
+            make_load("late", "Atlanta, GA", rate=5000, pickup=at(T0 + 30 * 3600)),
+        ]
+    )
+    got = board.search_nearby("Atlanta, GA", None, None, 150, None, 5, 2.0, TimeWindow(T0, T0 + 6 * 3600))
+    assert [load.load_id for load, _ in got] == ["near", "far"]
+    assert got[0][1] == 0.0 and got[1][1] > 50
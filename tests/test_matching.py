@@ -0,0 +1,107 @@
+"""Search terms to board keys: canonical places and equipment, and trigram matching of typos."""
+import pytest
+
+from app.services import geo
+from app.services.matching import EquipmentIndex, PlaceIndex, canonical_equipment, canonical_place, split_place
+
+BOARD_PLACES = ["atlanta, ga", "dallas, tx", "new orleans, la", "los angeles, ca", "portland, or", "portland, me"]
+
+
+def loads_at(counts):
+    return lambda place: counts.get(place, 0)
+
+
+@pytest.mark.parametrize(
+    "raw",
+    ["Atlanta, GA", "atlanta ga", "Atlanta Georgia", "Atlanta, Georgia", "  ATLANTA,   ga. ", "ATL", "atl"],
+)
+def test_spellings_of_atlanta(raw):
+    assert canonical_place(raw) == "atlanta, ga"
+
+
+@pytest.mark.parametrize(
+    "raw, key",
+    [
+        ("LA", "los angeles, ca"),
+        ("la", "los angeles, ca"),
+        ("New Orleans, LA", "new orleans, la"),
+        ("New Orleans LA", "new orleans, la"),
+        ("new orleans louisiana", "new orleans, la"),
+        ("Baton Rouge, Louisiana", "baton rouge, la"),
+    ],
+)
+def test_la_alias_only_when_it_is_the_whole_term(raw, key):
+    assert canonical_place(raw) == key
+
+
+@pytest.mark.parametrize(
+    "raw, parts",
+    [
+        ("Kansas City, MO", ("kansas city", "mo")),
+        ("Salt Lake City Utah", ("salt lake city", "ut")),
+        ("Charleston West Virginia", ("charleston", "wv")),
+        ("Saint Louis MO", ("st. louis", "mo")),
+        ("Ft Worth, TX", ("fort worth", "tx")),
+        ("Denver", ("denver", "")),
+        ("", ("", "")),
+    ],
+)
+def test_split_place(raw, parts):
+    assert split_place(raw) == parts
+
+
+def test_canonical_places_are_gazetteer_keys():
+    for raw in ["Saint Louis, Missouri", "ATL", "Portland OR", "st paul mn"]:
+        assert geo.resolve(canonical_place(raw)) is not None, raw
+
+
+@pytest.mark.parametrize(
+    "raw",
+    ["dry van", "Dry Van", "dry-van", "dry_van", "DRY/VAN", "dryvan", "van", "dry van trailer", "DV"],
+)
+def test_dry_van_spellings_are_equivalent(raw):
+    assert canonical_equipment(raw) == "dry van"
+
+
+def test_equipment_synonyms():
+    assert canonical_equipment("refrigerated") == canonical_equipment("reefer") == "reefer"
+    assert canonical_equipment("flat bed") == "flatbed"
+    assert canonical_equipment(None) == ""
+
+
+def test_place_on_the_board_scores_one():
+    index = PlaceIndex(BOARD_PLACES)
+    assert index.match("Atlanta Georgia", 0.5, loads_at({})) == ("atlanta, ga", 1.0)
+    assert index.match("ATL", 0.5, loads_at({})) == ("atlanta, ga", 1.0)
+    assert index.match(None, 0.5, loads_at({})) == ("", 1.0)
+
+
+def test_place_typos_score_below_one():
+    index = PlaceIndex(BOARD_PLACES)
+    key, score = index.match("Atlnta, GA", 0.5, loads_at({}))
+    assert key == "atlanta, ga" and 0.5 <= score < 1.0
+    # a closer misspelling scores higher
+    assert index.match("Atlantaa", 0.5, loads_at({})).score > score
+
+
+def test_place_typo_keeps_the_state():
+    index = PlaceIndex(BOARD_PLACES)
+    assert index.match("Portlnd, ME", 0.5, loads_at({"portland, or": 100})).key == "portland, me"
+
+
+def test_bare_city_ties_go_to_the_place_with_more_loads():
+    index = PlaceIndex(BOARD_PLACES)
+    assert index.match("portlnd", 0.5, loads_at({"portland, me": 3, "portland, or": 9})).key == "portland, or"
+    assert index.match("portlnd", 0.5, loads_at({"portland, me": 9, "portland, or": 3})).key == "portland, me"
+
+
+def test_unknown_place_scores_zero():
+    assert PlaceIndex(BOARD_PLACES).match("Zzyzx, CA", 0.5, loads_at({})) == ("zzyzx, ca", 0.0)
+
+
+def test_equipment_typos():
+    index = EquipmentIndex(["dry van", "reefer", "flatbed"])
+    assert index.match("dry-van", 0.5) == ("dry van", 1.0)
+    key, score = index.match("reefr", 0.5)
+    assert key == "reefer" and 0.5 <= score < 1.0
+    assert index.match("hopper", 0.5) == ("hopper", 0.0)
@@ -0,0 +1,65 @@
+"""MmapMetrics: one row per live writer thread, recycled as threads come and go."""
+import struct
+import threading
+
+from app.core import metrics_store
+from app.core.metrics_store import MAX_THREAD_ROWS, MmapMetrics
+
+BOUNDS = {"latency": [0.01, 0.1, 1.0]}
+
+
+def rows_used(metrics: MmapMetrics) -> int:
+    return struct.unpack_from("<I", metrics._mm, 12)[0]
+
+
+def run_threads(n: int, target, together: bool = False) -> None:
+    barrier = threading.Barrier(n) if together else None
+
+    def body():
+        target()
+        if barrier is not None:
+            barrier.wait()  # every thread stays alive until all have written
+
+    threads = [threading.Thread(target=body) for _ in range(n)]
+    if together:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    else:
+        for t in threads:
+            t.start()
+            t.join()
+
+
+def write(metrics: MmapMetrics) -> None:
+    metrics.add("requests")
+    metrics.add("errors", 2)
+    metrics.observe("latency", 0.05)
+
+
+def test_exited_threads_hand_their_rows_on(tmp_path):
+    metrics = MmapMetrics(["requests", "errors"], BOUNDS, str(tmp_path))
+    run_threads(3 * MAX_THREAD_ROWS, lambda: write(metrics))
+
+    assert rows_used(metrics) <= 2
+    assert metrics.totals() == {"requests": 3 * MAX_THREAD_ROWS, "errors": 6 * MAX_THREAD_ROWS}
+    assert metrics.histogram("latency")["count"] == 3 * MAX_THREAD_ROWS
+
+
+def test_threads_past_the_row_limit_share_the_last_row_without_losing_counts(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_store, "MAX_THREAD_ROWS", 8)
+    metrics = MmapMetrics(["requests", "errors"], BOUNDS, str(tmp_path))
+
+    def hammer():
+        for _ in range(2000):
+            metrics.add("requests")
+
+    run_threads(32, hammer, together=True)
+    assert rows_used(metrics) == 8
+    assert metrics.totals()["requests"] == 32 * 2000
+
+    # once those threads are gone their private rows are reused, the shared one too
+    run_threads(20, lambda: write(metrics), together=True)
+    assert rows_used(metrics) == 8
+    assert metrics.totals() == {"requests": 32 * 2000 + 20, "errors": 40}
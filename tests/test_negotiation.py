@@ -0,0 +1,166 @@
+"""negotiation.step(): start, counter, accept and decline as one transition, alone and raced, on both state stores."""
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+import app.db as db
+from app.core.state import METRICS
+from app.schemas.domain import Load
+from app.services import negotiation, state_store
+from app.services.state_store import MemoryStateStore, SqlStateStore
+
+LOAD = Load(
+    load_id="L1",
+    origin="Atlanta, GA",
+    destination="Dallas, TX",
+    pickup_datetime="2026-11-02T08:00:00",
+    delivery_datetime="2026-11-03T08:00:00",
+    equipment_type="Dry Van",
+    loadboard_rate=1000.0,
+)
+COUNTS = ("negotiations_started", "negotiations_accepted", "negotiations_declined", "completed_count")
+
+
+@pytest.fixture(params=["memory", "sql"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "sql":
+        engine = db._sqlite_engine(f"sqlite:///{tmp_path / 'state.db'}", pool_size=5)
+        request.addfinalizer(engine.dispose)
+        store = SqlStateStore(engine)
+    else:
+        store = MemoryStateStore()
+    monkeypatch.setattr(state_store, "STORE", store)
+    return store
+
+
+@pytest.fixture
+def counted():
+    before = METRICS.totals()
+
+    def delta():
+        after = METRICS.totals()
+        return {name: after[name] - before[name] for name in COUNTS}
+
+    return delta
+
+
+def test_an_in_band_first_offer_starts_and_accepts(store, counted):
+    st, decision, counter = negotiation.step("c1", LOAD, "1001", 1050.0)
+    assert (decision, counter, st.status, st.final_rate, st.round) == ("accept", None, "accepted", 1050.0, 1)
+    assert store.get_negotiation("c1") == st
+    assert counted() == {"negotiations_started": 1, "negotiations_accepted": 1, "negotiations_declined": 0, "completed_count": 1}
+
+
+def test_counters_until_the_rounds_run_out(store, counted):
+    steps = [negotiation.step("c1", LOAD, "1001", 2000.0) for _ in range(4)]
+    assert [(d, c) for _, d, c in steps] == [("counter", 1100.0)] * 3 + [("decline", None)]
+    assert [st.round for st, _, _ in steps] == [1, 2, 3, 4]
+    assert store.get_negotiation("c1").status == "declined"
+    assert counted()["negotiations_declined"] == 1 and counted()["negotiations_started"] == 1
+
+    with pytest.raises(HTTPException) as err:
+        negotiation.step("c1", LOAD, "1001", 1000.0)
+    assert err.value.status_code == 409
+
+
+def test_a_later_in_band_offer_accepts_at_that_rate(store, counted):
+    negotiation.step("c1", LOAD, "1001", 1500.0)
+    st, decision, _ = negotiation.step("c1", LOAD, "1001", 1090.0)
+    assert (decision, st.status, st.final_rate, st.round) == ("accept", "accepted", 1090.0, 2)
+    assert counted()["negotiations_accepted"] == 1
+
+
+def test_a_lost_compare_and_set_retries_then_gives_up(store, monkeypatch):
+    negotiation.step("c1", LOAD, "1001", 2000.0)
+    attempts = []
+    monkeypatch.setattr(store, "cas_negotiation", lambda st, expected: attempts.append(expected) or False)
+    with pytest.raises(HTTPException) as err:
+        negotiation.step("c1", LOAD, "1001", 2000.0)
+    assert err.value.status_code == 409 and attempts == [1] * negotiation.CAS_RETRIES
+    assert store.get_negotiation("c1").round == 1
+
+
+def test_racing_steps_on_one_call_serialize(store, counted):
+    n = 16
+    barrier = threading.Barrier(n)
+    won, refused = [], []
+
+    def offer():
+        barrier.wait()
+        try:
+            won.append(negotiation.step("c1", LOAD, "1001", 2000.0)[0].round)
+        except HTTPException as e:
+            refused.append(e.status_code)
+
+    threads = [threading.Thread(target=offer) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    final = store.get_negotiation("c1")
+    # every winner advanced the call by exactly one round, and the losers saw a 409
+    assert sorted(won) == list(range(1, final.round + 1))
+    assert len(won) + len(refused) == n and set(refused) <= {409}
+    assert counted()["negotiations_started"] == 1
+    assert counted()["negotiations_declined"] == (final.status == "declined")
+
+
+def test_create_and_compare_and_set_refuse_stale_writes(store):
+    st, _, _ = negotiation.step("c1", LOAD, "1001", 2000.0)
+    assert not store.create_negotiation(st)
+
+    ahead = st.model_copy(update={"round": 2})
+    assert not store.cas_negotiation(ahead, expected_round=2)
+    assert store.cas_negotiation(ahead, expected_round=1)
+    assert not store.cas_negotiation(ahead.model_copy(update={"round": 3}), expected_round=1)
+
+    done = ahead.model_copy(update={"round": 3, "status": "accepted"})
+    assert store.cas_negotiation(done, expected_round=2)
+    # a finished negotiation takes no further transition
+    assert not store.cas_negotiation(done.model_copy(update={"round": 4}), expected_round=3)
+    assert store.get_negotiation("c1") == done
+
+
+def interleave(monkeypatch, store, offer):
+    """Land another worker's step between this step's read and its write, once."""
+    read = store.get_negotiation
+    raced = []
+
+    def racing_read(call_id):
+        st = read(call_id)
+        if not raced:
+            raced.append(None)  # the other step reads through here too
+            raced[0] = negotiation.step(call_id, LOAD, "1001", offer)
+        return st
+
+    monkeypatch.setattr(store, "get_negotiation", racing_read)
+    return raced
+
+
+def test_a_step_that_loses_the_race_retries_on_the_new_round(store, monkeypatch, counted):
+    negotiation.step("c1", LOAD, "1001", 2000.0)
+    raced = interleave(monkeypatch, store, 2000.0)
+    st, decision, _ = negotiation.step("c1", LOAD, "1001", 2000.0)
+    assert raced[0][0].round == 2
+    assert (st.round, decision) == (3, "counter")
+    assert store.get_negotiation("c1").round == 3
+
+
+def test_two_first_offers_start_once(store, monkeypatch, counted):
+    raced = interleave(monkeypatch, store, 2000.0)
+    st, decision, _ = negotiation.step("c1", LOAD, "1001", 1050.0)
+    # the other offer started the call; this one lost the create and counters in round 2
+    assert raced[0][0].round == 1
+    assert (st.round, st.status, decision) == (2, "accepted", "accept")
+    assert counted() == {"negotiations_started": 1, "negotiations_accepted": 1, "negotiations_declined": 0, "completed_count": 1}
+
+
+def test_a_step_raced_into_a_finished_call_is_refused(store, monkeypatch, counted):
+    negotiation.step("c1", LOAD, "1001", 2000.0)
+    interleave(monkeypatch, store, 1000.0)
+    with pytest.raises(HTTPException) as err:
+        negotiation.step("c1", LOAD, "1001", 2000.0)
+    assert err.value.status_code == 409 and "accepted" in err.value.detail
+    assert counted()["completed_count"] == 1
@@ -0,0 +1,176 @@
+"""State retention: TTL expiry, tombstones, the LRU memory budget, archiving, and the sweeper around them."""
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import CallRecord
+from app.schemas.domain import CallState, NegotiationPolicy, NegotiationState
+from app.services import retention, state_store
+from app.services.state_store import MemoryStateStore, SqlStateStore, _Entries
+
+T0 = 1_790_000_000.0
+TTLS = {"finished_ttl": 60.0, "idle_ttl": 600.0, "tombstone_ttl": 3600.0}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [T0]
+    monkeypatch.setattr(state_store.time, "time", lambda: now[0])
+    return now
+
+
+def negotiation(call_id, status="in_progress", round=1):
+    return NegotiationState(
+        call_id=call_id,
+        load_id="L1",
+        loadboard_rate=1000.0,
+        status=status,
+        round=round,
+        policy=NegotiationPolicy(target=1000.0, min=900.0, max=1100.0),
+        last_carrier_offer=1200.0,
+        created_at=T0,
+    )
+
+
+def ended_call(call_id, record=None):
+    summary = {"summary": "x" * 2000, "dashboard": record or {"call_id": call_id, "ended_at": int(T0), "outcome": "ACCEPTED"}}
+    return CallState(call_id=call_id, ended_at=T0, metadata={"transcript": "y" * 2000}, outcome="ACCEPTED", summary=summary)
+
+
+def sweep(store, now, max_bytes=0, archive=None):
+    return store.sweep(now, max_bytes=max_bytes, archive=archive, **TTLS)
+
+
+def test_entries_read_a_copy_and_fall_back_to_the_tombstone(clock):
+    entries = _Entries(NegotiationState)
+    st = negotiation("a")
+    entries.put(st)
+    copy = entries.get("a")
+    assert copy == st and copy is not st
+
+    clock[0] += 5
+    entries.get("a")
+    assert entries.touched["a"] == T0 + 5
+    assert entries.size("a", st) == len(st.model_dump_json())
+
+    entries.remove("a")
+    entries.tombstones["a"] = (T0 + 100, st.model_dump_json())
+    assert entries.get("a") == st and "a" not in entries.touched and "a" not in entries.sizes
+
+
+def test_finished_state_becomes_a_tombstone_then_goes(clock):
+    store = MemoryStateStore()
+    store.create_negotiation(negotiation("a", status="accepted", round=2))
+
+    assert sweep(store, T0 + 59)["expired"] == 0
+    assert sweep(store, T0 + 61)["expired"] == 1
+    assert store.gauges()["negotiations"] == 0 and store.gauges()["tombstones"] == 1
+    # a retry after eviction gets the same answer, and cannot start the call over
+    assert store.get_negotiation("a").status == "accepted"
+    assert not store.create_negotiation(negotiation("a"))
+
+    counts = sweep(store, T0 + 61 + 3601)
+    assert counts["tombstones_expired"] == 1
+    assert store.get_negotiation("a") is None and store.gauges() == {"negotiations": 0, "calls": 0, "tombstones": 0, "bytes": 0}
+
+
+def test_a_live_negotiation_is_dropped_only_when_idle(clock):
+    store = MemoryStateStore()
+    store.create_negotiation(negotiation("a"))
+    clock[0] = T0 + 500
+    store.get_negotiation("a")  # still in use
+
+    assert sweep(store, T0 + 700)["expired"] == 0
+    assert sweep(store, T0 + 1101)["expired"] == 1
+    # no tombstone: it never finished
+    assert store.get_negotiation("a") is None and store.gauges()["tombstones"] == 0
+
+
+def test_over_budget_evicts_least_recently_used_finished_state(clock):
+    store = MemoryStateStore()
+    for i in range(6):
+        clock[0] = T0 + i
+        store.end_call(ended_call(f"c{i}"))
+    store.create_negotiation(negotiation("live"))
+    clock[0] = T0 + 10
+    store.get_call("c0")  # read last: evicted last
+
+    size = len(ended_call("c0").model_dump_json())
+    saved = size - len(state_store._tombstone(ended_call("c0")))
+    live = len(negotiation("live").model_dump_json())
+    # two evictions short of the budget
+    budget = 6 * size + live - 2 * saved
+    counts = sweep(store, T0 + 20, max_bytes=budget)
+    assert counts == {"expired": 0, "evicted": 2, "archived": 0, "tombstones_expired": 0}
+    assert store._calls.tombstones.keys() == {"c1", "c2"}
+    assert "live" in store._negotiations.live
+    assert store.gauges()["bytes"] == budget
+
+    # an unfinished negotiation is never evicted, however tight the budget
+    counts = sweep(store, T0 + 30, max_bytes=1)
+    assert counts["evicted"] == 4 and store.gauges()["negotiations"] == 1 and store.gauges()["calls"] == 0
+
+
+def test_ended_calls_are_archived_before_they_go(clock):
+    store = MemoryStateStore()
+    store.end_call(ended_call("a"))
+    archived = []
+
+    counts = sweep(store, T0 + 61, archive=archived.extend)
+    assert counts == {"expired": 1, "evicted": 0, "archived": 1, "tombstones_expired": 0}
+    assert [c.call_id for c in archived] == ["a"]
+    # the tombstone drops the bulky parts; the calls table keeps them
+    dead = store.get_call("a")
+    assert dead.outcome == "ACCEPTED" and dead.summary == {} and dead.metadata == {}
+    assert not store.end_call(ended_call("a"))
+
+
+def test_a_failed_archive_keeps_the_calls(clock):
+    store = MemoryStateStore()
+    store.end_call(ended_call("a"))
+    store.create_negotiation(negotiation("n", status="accepted"))
+
+    def broken(calls):
+        raise RuntimeError("database down")
+
+    counts = sweep(store, T0 + 61, archive=broken)
+    assert counts["archived"] == 0 and counts["expired"] == 1
+    assert "a" in store._calls.live and "n" not in store._negotiations.live
+
+
+def test_sql_rows_outlive_both_ttls_before_they_go(database, clock):
+    store = SqlStateStore(database.engine)
+    store.create_negotiation(negotiation("done", status="declined"))
+    store.create_negotiation(negotiation("idle"))
+    store.end_call(ended_call("a"))
+    archived = []
+
+    assert sweep(store, T0 + 601, archive=archived.extend)["expired"] == 1
+    assert store.get_negotiation("idle") is None and store.get_negotiation("done") is not None
+    # no separate tombstone: the whole row stays for finished_ttl + tombstone_ttl
+    assert sweep(store, T0 + 3660, archive=archived.extend)["expired"] == 0
+    counts = sweep(store, T0 + 3661, archive=archived.extend)
+    assert counts["expired"] == 2 and counts["archived"] == 1 and [c.call_id for c in archived] == ["a"]
+    assert store.gauges() == {"negotiations": 0, "calls": 0, "tombstones": 0, "bytes": 0}
+
+
+def test_the_sweeper_archives_missing_rows_and_keeps_totals(database, clock, monkeypatch):
+    store = MemoryStateStore()
+    monkeypatch.setattr(state_store, "STORE", store)
+    for name, value in (("state_finished_ttl_seconds", 60.0), ("state_tombstone_ttl_seconds", 3600.0), ("state_max_bytes", 0)):
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(retention.time, "time", lambda: clock[0])
+
+    store.end_call(ended_call("a"))
+    store.end_call(ended_call("b"))
+    sweeper = retention.StateSweeper(interval=60)
+    assert sweeper.sweep_once()["expired"] == 0
+
+    clock[0] = T0 + 61
+    assert sweeper.sweep_once()["archived"] == 2
+    with database.SessionLocal() as session:
+        assert sorted(session.execute(select(CallRecord.call_id)).scalars()) == ["a", "b"]
+
+    status = sweeper.status()
+    assert (status.sweeps, status.expired, status.archived, status.calls, status.tombstones) == (2, 2, 2, 0, 2)
+    assert status.backend == "memory" and status.max_bytes == 0
@@ -0,0 +1,82 @@
+"""Incremental rollups: retract-and-apply on every upsert must land where `rollups rebuild` does."""
+import random
+
+import pytest
+from sqlalchemy import select
+
+from app.models import CallRollup
+from app.services import call_store, rollups
+
+OUTCOMES = ["ACCEPTED", "DECLINED", "NO_MATCH", "", None]
+SENTIMENTS = ["Positive", "Neutral", "Negative", "", None]
+DAY = 86400
+T0 = 1_790_000_000
+
+
+def rollup_table(db) -> dict:
+    """Rollup rows by key, leaving out rows every count retracted back to zero."""
+    with db.SessionLocal() as session:
+        rows = session.execute(select(CallRollup)).scalars().all()
+    return {
+        (r.day, r.outcome, r.sentiment): tuple(getattr(r, f) for f in rollups.FIELDS)
+        for r in rows
+        if any(getattr(r, f) for f in rollups.FIELDS)
+    }
+
+
+def assert_same(got: dict, want: dict) -> None:
+    assert got.keys() == want.keys()
+    for key in want:
+        assert got[key] == pytest.approx(want[key]), key
+
+
+def random_call(rng, call_id):
+    final_offer = rng.choice([None, float(rng.randrange(800, 1300))])
+    return {
+        "call_id": call_id,
+        "ended_at": rng.choice([None, T0 + rng.randrange(5 * DAY)]),
+        "outcome": rng.choice(OUTCOMES),
+        "sentiment": rng.choice(SENTIMENTS),
+        "verified": rng.choice([None, True, False]),
+        "loadboard_rate": rng.choice([None, 1000.0]),
+        "rounds": rng.choice([None, 0, 1, 3]),
+        "final_offer": final_offer,
+        "agreed": rng.choice([None, True, False]),
+        "transfer_to_rep": rng.choice([None, True, False]),
+    }
+
+
+def test_net_change_retracts_what_it_applied():
+    rng = random.Random(1)
+    old, new = random_call(rng, "a"), random_call(rng, "a")
+    there = rollups.net_change([(old, new)])
+    back = rollups.net_change([(new, old)])
+    assert not any(any(vec) for vec in rollups.combine([there, back]).values())
+    assert not any(any(vec) for vec in rollups.net_change([(old, old)]).values())
+
+
+def test_a_changed_outcome_moves_the_call_between_rows(database):
+    row = {"call_id": "a", "ended_at": T0, "outcome": "DECLINED", "sentiment": "Neutral"}
+    call_store.upsert_call_record(row, None)
+    call_store.upsert_call_record({**row, "outcome": "ACCEPTED", "agreed": True}, None)
+    table = rollup_table(database)
+    day = T0 // DAY
+    assert set(table) == {(rollups.ALL_DAYS, "ACCEPTED", "Neutral"), (day, "ACCEPTED", "Neutral")}
+    assert table[(day, "ACCEPTED", "Neutral")][:4] == (1, 0, 0, 1)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_replays_and_updates_agree_with_a_rebuild(database, seed):
+    rng = random.Random(seed)
+    ids = [f"call-{i}" for i in range(60)]
+    for _ in range(40):
+        # a batch as the writer flushes it: unique call_ids, many of them seen before
+        batch = {call_id: random_call(rng, call_id) for call_id in rng.sample(ids, rng.randrange(1, 15))}
+        call_store.write_rows([call_store._row(rec, None) for rec in batch.values()])
+        # a webhook delivered twice
+        replay = rng.choice(list(batch.values()))
+        call_store.upsert_call_record(replay, "again")
+
+    incremental = rollup_table(database)
+    rollups.rebuild()
+    assert_same(incremental, rollup_table(database))
@@ -0,0 +1,27 @@
+"""Startup: the seed board is built once, by the startup hook, not on import."""
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.core import state
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_importing_the_app_loads_nothing():
+    script = "from app.main import app; from app.core import state; print(state.BOARD.version, len(state.BOARD))"
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env={"API_KEYS": "test-key"}, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["0", "0"]
+
+
+def test_startup_builds_the_board_once(monkeypatch, caplog):
+    from app.main import app
+
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(state, "BOARD", state.BOARD)  # put back afterwards
+    before = state.BOARD.version
+    with caplog.at_level("INFO", logger="app.core.state"), TestClient(app):
+        assert state.BOARD.version == before + 1 and len(state.BOARD) > 0
+    assert [r.getMessage().split()[0] for r in caplog.records if r.name == "app.core.state"] == ["loaded"]